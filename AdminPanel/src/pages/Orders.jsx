@@ -100,16 +100,33 @@ export default function AdminOrders() {
   // 🟩 Update order status
   const updateStatus = async (id, status) => {
     try {
-      await api.patch(`/catalog/orders/${id}`, { status });
+      const current = orders.find((o) => o.id === id);
+      const res = await api.patch(`/catalog/orders/${id}`, {
+        status,
+        version: current?.version,
+      });
       setOrders((prev) =>
-        prev.map((o) => (o.id === id ? { ...o, status } : o))
+        prev.map((o) =>
+          o.id === id ? { ...o, status: res.data.status, version: res.data.version } : o
+        )
       );
       toast.success(`Order marked as ${status}`, {
         position: "bottom-right",
       });
     } catch (e) {
       console.warn("Failed to update status", e);
-      toast.error("Failed to update order status");
+      const detail = e.response?.status === 409 ? e.response.data?.detail : null;
+      if (detail && typeof detail === "object") {
+        // Someone else changed the order first: show what it is now
+        setOrders((prev) =>
+          prev.map((o) =>
+            o.id === id ? { ...o, status: detail.status, version: detail.version } : o
+          )
+        );
+        toast.error(`Order was already ${detail.status}`);
+      } else {
+        toast.error(detail || "Failed to update order status");
+      }
     }
   };
 
@@ -33,6 +33,7 @@ superadminApi.interceptors.response.use(
 );
 
 export const getUsersWithStores = () => superadminApi.get("superadmin/users-with-stores");
+export const getUsers = (params) => superadminApi.get("superadmin/users", { params });
 export const getStores = () => superadminApi.get("superadmin/stores");
 export const getCategories = () => superadminApi.get("superadmin/categories");
 export const createCategory = (data) => superadminApi.post("superadmin/categories", data);
@@ -43,7 +44,7 @@ export const deleteCategory = (id) =>
 export const getDeliverySettings = () => superadminApi.get("superadmin/delivery-settings");
 export const updateDeliverySettings = (data) =>
   superadminApi.put("superadmin/delivery-settings", data);
-export const getOrders = () => superadminApi.get("superadmin/orders");
+export const getOrders = (params) => superadminApi.get("superadmin/orders", { params });
 export const patchOrder = (id, data) =>
   superadminApi.patch(`superadmin/orders/${id}`, data);
 export const deleteOrder = (id) => superadminApi.delete(`superadmin/orders/${id}`);
@@ -1,16 +1,24 @@
 import { useEffect, useState } from "react";
 import { getOrders, patchOrder, deleteOrder } from "../api/superadminApi";
 
+const PAGE_SIZE = 50;
+
 export default function OrdersPage() {
   const [orders, setOrders] = useState([]);
+  const [page, setPage] = useState(1);
+  const [includeArchive, setIncludeArchive] = useState(false);
   const [loading, setLoading] = useState(true);
 
   useEffect(() => {
     fetchOrders();
-  }, []);
+  }, [page, includeArchive]);
 
   const fetchOrders = async () => {
-    const res = await getOrders();
+    const res = await getOrders({
+      limit: PAGE_SIZE,
+      offset: (page - 1) * PAGE_SIZE,
+      include_archive: includeArchive,
+    });
     setOrders(res.data);
     setLoading(false);
   };
@@ -30,6 +38,17 @@ export default function OrdersPage() {
   return (
     <div className="p-6">
       <h1 className="text-xl font-bold mb-4">Orders</h1>
+      <label className="mb-4 flex items-center gap-2">
+        <input
+          type="checkbox"
+          checked={includeArchive}
+          onChange={(e) => {
+            setIncludeArchive(e.target.checked);
+            setPage(1);
+          }}
+        />
+        Include archived orders
+      </label>
       <table className="w-full border">
         <thead className="bg-gray-200">
           <tr>
@@ -53,6 +72,23 @@ export default function OrdersPage() {
           ))}
         </tbody>
       </table>
+      <div className="mt-4 flex items-center gap-2">
+        <button
+          onClick={() => setPage(page - 1)}
+          disabled={page <= 1}
+          className="bg-blue-500 text-white px-4 py-2 rounded disabled:opacity-50"
+        >
+          Previous
+        </button>
+        <span>Page {page}</span>
+        <button
+          onClick={() => setPage(page + 1)}
+          disabled={orders.length < PAGE_SIZE}
+          className="bg-blue-500 text-white px-4 py-2 rounded disabled:opacity-50"
+        >
+          Next
+        </button>
+      </div>
     </div>
   );
 }
@@ -1,24 +1,49 @@
 import { useEffect, useState } from "react";
-import { getUsersWithStores } from "../api/superadminApi";
+import { getUsers } from "../api/superadminApi";
+
+const PAGE_SIZE = 50;
 
 export default function UsersPage() {
   const [users, setUsers] = useState([]);
+  const [total, setTotal] = useState(0);
+  const [page, setPage] = useState(1);
+  const [search, setSearch] = useState("");
+  const [query, setQuery] = useState("");
   const [loading, setLoading] = useState(true);
 
+  // Wait for a pause in typing before querying, and start over at page 1
+  useEffect(() => {
+    const timer = setTimeout(() => {
+      setQuery(search.trim());
+      setPage(1);
+    }, 300);
+    return () => clearTimeout(timer);
+  }, [search]);
+
   useEffect(() => {
+    let cancelled = false;
+
+    const fetchUsers = async () => {
+      try {
+        const params = { page, page_size: PAGE_SIZE };
+        if (query) params.q = query;
+        const res = await getUsers(params);
+        // A slower response for an older page or search must not overwrite this one
+        if (cancelled) return;
+        setUsers(res.data.items);
+        setTotal(res.data.total);
+      } catch (e) {
+        console.error("Failed to fetch users:", e);
+      } finally {
+        if (!cancelled) setLoading(false);
+      }
+    };
+
     fetchUsers();
-  }, []);
-
-  const fetchUsers = async () => {
-    try {
-      const res = await getUsersWithStores();
-      setUsers(res.data);
-    } catch (e) {
-      console.error("Failed to fetch users:", e);
-    } finally {
-      setLoading(false);
-    }
-  };
+    return () => {
+      cancelled = true;
+    };
+  }, [page, query]);
 
   const getRoleClass = (role) => {
     switch (role) {
@@ -35,9 +60,22 @@ export default function UsersPage() {
 
   if (loading) return <p>Loading users...</p>;
 
+  const pageCount = Math.max(1, Math.ceil(total / PAGE_SIZE));
+  const first = total ? (page - 1) * PAGE_SIZE + 1 : 0;
+  const last = Math.min(page * PAGE_SIZE, total);
+
   return (
     <div className="p-6">
       <h1 className="text-xl font-bold mb-4">Users</h1>
+      <div className="mb-4 flex gap-2">
+        <input
+          type="text"
+          placeholder="Search by name, email or phone"
+          value={search}
+          onChange={(e) => setSearch(e.target.value)}
+          className="border p-2 rounded w-80"
+        />
+      </div>
       <table className="w-full border">
         <thead className="bg-gray-200">
           <tr>
@@ -56,8 +94,32 @@ export default function UsersPage() {
               </td>
             </tr>
           ))}
+          {users.length === 0 && (
+            <tr>
+              <td colSpan={3} className="p-2 border text-center text-gray-500">No users found</td>
+            </tr>
+          )}
         </tbody>
       </table>
+      <div className="mt-4 flex items-center gap-2">
+        <button
+          onClick={() => setPage(page - 1)}
+          disabled={page <= 1}
+          className="bg-blue-500 text-white px-4 py-2 rounded disabled:opacity-50"
+        >
+          Previous
+        </button>
+        <span>
+          Page {page} of {pageCount} ({first}-{last} of {total})
+        </span>
+        <button
+          onClick={() => setPage(page + 1)}
+          disabled={page >= pageCount}
+          className="bg-blue-500 text-white px-4 py-2 rounded disabled:opacity-50"
+        >
+          Next
+        </button>
+      </div>
     </div>
   );
 }
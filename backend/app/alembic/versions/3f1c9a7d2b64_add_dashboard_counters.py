@@ -0,0 +1,64 @@
+"""add_dashboard_counters
+
+Revision ID: 3f1c9a7d2b64
+Revises: a86c5065a7ea
+Create Date: 2026-10-19 10:12:05.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f1c9a7d2b64'
+down_revision: Union[str, Sequence[str], None] = 'a86c5065a7ea'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('store_counters',
+    sa.Column('store_id', sa.Integer(), nullable=False),
+    sa.Column('product_count', sa.Integer(), nullable=False),
+    sa.Column('order_count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['store_id'], ['stores.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('store_id')
+    )
+    op.create_table('user_counters',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('order_count', sa.Integer(), nullable=False),
+    sa.Column('owned_product_count', sa.Integer(), nullable=False),
+    sa.Column('owned_order_count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+
+    # Backfill from the existing rows (same rules as counter_utils.reconcile_counters)
+    op.execute("""
+        INSERT INTO store_counters (store_id, product_count, order_count)
+        SELECT s.id,
+               (SELECT COUNT(*) FROM products p WHERE p.store_id = s.id),
+               (SELECT COUNT(*) FROM orders o
+                 WHERE o.store_id = s.id AND LOWER(COALESCE(o.status, '')) <> 'cancelled')
+        FROM stores s
+    """)
+    op.execute("""
+        INSERT INTO user_counters (user_id, order_count, owned_product_count, owned_order_count)
+        SELECT u.id,
+               (SELECT COUNT(*) FROM orders o
+                 WHERE o.user_id = u.id AND LOWER(COALESCE(o.status, '')) <> 'cancelled'),
+               (SELECT COALESCE(SUM(sc.product_count), 0) FROM store_counters sc
+                  JOIN stores s ON s.id = sc.store_id WHERE s.owner_id = u.id),
+               (SELECT COALESCE(SUM(sc.order_count), 0) FROM store_counters sc
+                  JOIN stores s ON s.id = sc.store_id WHERE s.owner_id = u.id)
+        FROM users u
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('user_counters')
+    op.drop_table('store_counters')
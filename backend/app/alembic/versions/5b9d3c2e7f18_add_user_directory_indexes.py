@@ -0,0 +1,30 @@
+"""add_user_directory_indexes
+
+Revision ID: 5b9d3c2e7f18
+Revises: c47a0e91d5f3
+Create Date: 2026-10-19 12:05:33.640127
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b9d3c2e7f18'
+down_revision: Union[str, Sequence[str], None] = 'c47a0e91d5f3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(op.f('ix_users_name'), 'users', ['name'], unique=False)
+    op.create_index(op.f('ix_users_phone'), 'users', ['phone'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_users_phone'), table_name='users')
+    op.drop_index(op.f('ix_users_name'), table_name='users')
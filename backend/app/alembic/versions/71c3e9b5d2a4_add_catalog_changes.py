@@ -0,0 +1,39 @@
+"""add_catalog_changes
+
+Revision ID: 71c3e9b5d2a4
+Revises: e2a7f4c81b3d
+Create Date: 2026-10-19 14:08:12.407791
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '71c3e9b5d2a4'
+down_revision: Union[str, Sequence[str], None] = 'e2a7f4c81b3d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('catalog_changes',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('entity', sa.String(length=20), nullable=False),
+    sa.Column('entity_id', sa.Integer(), nullable=False),
+    sa.Column('op', sa.String(length=10), nullable=False),
+    sa.Column('changed_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_catalog_changes_id'), 'catalog_changes', ['id'], unique=False)
+    op.create_index(op.f('ix_catalog_changes_changed_at'), 'catalog_changes', ['changed_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_catalog_changes_changed_at'), table_name='catalog_changes')
+    op.drop_index(op.f('ix_catalog_changes_id'), table_name='catalog_changes')
+    op.drop_table('catalog_changes')
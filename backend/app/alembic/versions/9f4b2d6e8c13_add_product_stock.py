@@ -0,0 +1,29 @@
+"""add_product_stock
+
+Revision ID: 9f4b2d6e8c13
+Revises: 71c3e9b5d2a4
+Create Date: 2026-10-19 15:01:37.228419
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9f4b2d6e8c13'
+down_revision: Union[str, Sequence[str], None] = '71c3e9b5d2a4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # NULL = stock not tracked, so existing products keep selling as before
+    op.add_column('products', sa.Column('stock', sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('products', 'stock')
@@ -0,0 +1,37 @@
+"""add_store_address_distances
+
+Revision ID: a9d5e3f7c2b8
+Revises: f4c8a2e6b9d1
+Create Date: 2026-10-19 18:21:54.670392
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a9d5e3f7c2b8'
+down_revision: Union[str, Sequence[str], None] = 'f4c8a2e6b9d1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('store_address_distances',
+    sa.Column('store_id', sa.Integer(), nullable=False),
+    sa.Column('address_id', sa.Integer(), nullable=False),
+    sa.Column('distance_km', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['address_id'], ['addresses.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['store_id'], ['stores.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('store_id', 'address_id')
+    )
+    op.create_index(op.f('ix_store_address_distances_address_id'), 'store_address_distances', ['address_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_store_address_distances_address_id'), table_name='store_address_distances')
+    op.drop_table('store_address_distances')
@@ -0,0 +1,31 @@
+"""add_order_version
+
+Revision ID: b8e1d4f7a2c6
+Revises: 9f4b2d6e8c13
+Create Date: 2026-10-19 15:48:12.603571
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8e1d4f7a2c6'
+down_revision: Union[str, Sequence[str], None] = '9f4b2d6e8c13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Existing orders start at version 1; every status / field change bumps it
+    op.add_column('orders', sa.Column('updated_at', sa.DateTime(), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=False))
+    op.add_column('orders', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('orders', 'version')
+    op.drop_column('orders', 'updated_at')
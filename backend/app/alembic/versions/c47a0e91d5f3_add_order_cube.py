@@ -0,0 +1,42 @@
+"""add_order_cube
+
+Revision ID: c47a0e91d5f3
+Revises: 8d2e4b6f1a90
+Create Date: 2026-10-19 11:41:19.227083
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c47a0e91d5f3'
+down_revision: Union[str, Sequence[str], None] = '8d2e4b6f1a90'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema.
+
+    Fill the new table afterwards with: python -m app.utils.rollup_utils
+    """
+    op.create_table('order_cube',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('category_id', sa.Integer(), nullable=False),
+    sa.Column('store_id', sa.Integer(), nullable=False),
+    sa.Column('payment_method', sa.String(length=50), nullable=False),
+    sa.Column('status', sa.String(length=50), nullable=False),
+    sa.Column('order_count', sa.Integer(), nullable=False),
+    sa.Column('gmv', sa.Float(), nullable=False),
+    sa.Column('delivery_fees', sa.Float(), nullable=False),
+    sa.Column('store_earnings', sa.Float(), nullable=False),
+    sa.PrimaryKeyConstraint('day', 'category_id', 'store_id', 'payment_method', 'status')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('order_cube')
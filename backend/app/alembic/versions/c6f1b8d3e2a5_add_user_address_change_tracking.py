@@ -0,0 +1,35 @@
+"""add_user_address_change_tracking
+
+Revision ID: c6f1b8d3e2a5
+Revises: a9d5e3f7c2b8
+Create Date: 2026-10-19 20:14:37.528104
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c6f1b8d3e2a5'
+down_revision: Union[str, Sequence[str], None] = 'a9d5e3f7c2b8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Order lists embed users and addresses: their versions feed the order ETags
+TABLES = ('users', 'addresses')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table in TABLES:
+        op.add_column(table, sa.Column('updated_at', sa.DateTime(), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=False))
+        op.add_column(table, sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in reversed(TABLES):
+        op.drop_column(table, 'version')
+        op.drop_column(table, 'updated_at')
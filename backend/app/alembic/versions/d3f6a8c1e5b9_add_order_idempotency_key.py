@@ -0,0 +1,31 @@
+"""add_order_idempotency_key
+
+Revision ID: d3f6a8c1e5b9
+Revises: b8e1d4f7a2c6
+Create Date: 2026-10-19 16:22:47.518904
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd3f6a8c1e5b9'
+down_revision: Union[str, Sequence[str], None] = 'b8e1d4f7a2c6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('orders', sa.Column('idempotency_key', sa.String(length=64), nullable=True))
+    # NULLs never collide, so orders placed without a key are unaffected
+    op.create_unique_constraint('uq_orders_user_idempotency_key', 'orders', ['user_id', 'idempotency_key'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('uq_orders_user_idempotency_key', 'orders', type_='unique')
+    op.drop_column('orders', 'idempotency_key')
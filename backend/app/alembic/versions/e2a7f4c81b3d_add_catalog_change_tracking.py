@@ -0,0 +1,34 @@
+"""add_catalog_change_tracking
+
+Revision ID: e2a7f4c81b3d
+Revises: 5b9d3c2e7f18
+Create Date: 2026-10-19 13:22:48.915036
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2a7f4c81b3d'
+down_revision: Union[str, Sequence[str], None] = '5b9d3c2e7f18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLES = ('categories', 'stores', 'products', 'product_subcategories')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table in TABLES:
+        op.add_column(table, sa.Column('updated_at', sa.DateTime(), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=False))
+        op.add_column(table, sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in reversed(TABLES):
+        op.drop_column(table, 'version')
+        op.drop_column(table, 'updated_at')
@@ -0,0 +1,66 @@
+"""add_order_archive
+
+Revision ID: e7b2c9d4a1f6
+Revises: d3f6a8c1e5b9
+Create Date: 2026-10-19 17:05:12.304817
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7b2c9d4a1f6'
+down_revision: Union[str, Sequence[str], None] = 'd3f6a8c1e5b9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('orders_archive',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('store_id', sa.Integer(), nullable=True),
+    sa.Column('address_id', sa.Integer(), nullable=False),
+    sa.Column('total_price', sa.Float(), nullable=False),
+    sa.Column('status', sa.String(length=50), nullable=True),
+    sa.Column('store_name', sa.String(length=100), nullable=True),
+    sa.Column('payment_method', sa.String(length=50), nullable=True),
+    sa.Column('order_title', sa.String(length=255), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('delivery_fee', sa.Float(), nullable=True),
+    sa.Column('store_earnings', sa.Float(), nullable=True),
+    sa.Column('contact_number', sa.String(length=20), nullable=True),
+    sa.Column('idempotency_key', sa.String(length=64), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.Column('archived_at', sa.DateTime(), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_orders_archive_user_id'), 'orders_archive', ['user_id'], unique=False)
+    op.create_index(op.f('ix_orders_archive_store_id'), 'orders_archive', ['store_id'], unique=False)
+    op.create_index(op.f('ix_orders_archive_created_at'), 'orders_archive', ['created_at'], unique=False)
+    op.create_table('order_items_archive',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('order_id', sa.Integer(), nullable=False),
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('quantity', sa.Integer(), nullable=False),
+    sa.Column('price', sa.Float(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_order_items_archive_order_id'), 'order_items_archive', ['order_id'], unique=False)
+    op.create_index(op.f('ix_order_items_archive_product_id'), 'order_items_archive', ['product_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_order_items_archive_product_id'), table_name='order_items_archive')
+    op.drop_index(op.f('ix_order_items_archive_order_id'), table_name='order_items_archive')
+    op.drop_table('order_items_archive')
+    op.drop_index(op.f('ix_orders_archive_created_at'), table_name='orders_archive')
+    op.drop_index(op.f('ix_orders_archive_store_id'), table_name='orders_archive')
+    op.drop_index(op.f('ix_orders_archive_user_id'), table_name='orders_archive')
+    op.drop_table('orders_archive')
@@ -0,0 +1,32 @@
+"""add_login_history_method
+
+Revision ID: f4c8a2e6b9d1
+Revises: e7b2c9d4a1f6
+Create Date: 2026-10-19 17:48:36.915240
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f4c8a2e6b9d1'
+down_revision: Union[str, Sequence[str], None] = 'e7b2c9d4a1f6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('login_history', sa.Column('method', sa.String(length=20), nullable=True))
+    op.create_index(op.f('ix_login_history_login_time'), 'login_history', ['login_time'], unique=False)
+    op.create_index('ix_login_history_user_time', 'login_history', ['user_id', 'login_time'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_login_history_user_time', table_name='login_history')
+    op.drop_index(op.f('ix_login_history_login_time'), table_name='login_history')
+    op.drop_column('login_history', 'method')
@@ -1,13 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException, Header, Response, Cookie, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, Header, Query, Request, Response, Cookie
 from sqlalchemy.orm import Session
 from passlib.hash import argon2
 from jose import jwt
 from datetime import datetime, timedelta
+from typing import List
 from fastapi.security import OAuth2PasswordRequestForm, OAuth2PasswordBearer
 
 from app.utils.email_utils import send_verification_email
+from app.utils.phone_otp_utils import exposes_otp, send_otp_sms
+from app.utils.rate_limit_utils import RateLimit, get_client_ip
+from app.utils.login_audit_utils import record_login, recent_logins
+from app.utils.otp_utils import issue_otp, verify_otp, discard_otp
 from app import models, schemas, database
-import random
 
 # ----------------------
 # Configurations
@@ -25,6 +29,15 @@ VALID_ROLES = ["superadmin", "store_owner", "user"]
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/token")
 router = APIRouter(prefix="/auth", tags=["Auth"])
 
+# ----------------------
+# Rate limits: (requests, per_seconds) per client IP / per email or phone
+# ----------------------
+register_limit = RateLimit("auth:register", ip=(10, 3600), identifier=(3, 3600))
+login_limit = RateLimit("auth:token", ip=(20, 60), identifier=(5, 60))
+email_otp_verify_limit = RateLimit("auth:verify-email-otp", ip=(20, 60), identifier=(5, 300))
+phone_otp_request_limit = RateLimit("auth:phone-request-otp", ip=(10, 600), identifier=(3, 600))
+phone_otp_verify_limit = RateLimit("auth:phone-verify-otp", ip=(20, 60), identifier=(5, 300))
+
 
 # ----------------------
 # Token generators
@@ -44,12 +57,12 @@ def create_refresh_token(data: dict):
 # ==========================================================
 # REGISTER USER + EMAIL OTP SEND
 # ==========================================================
-@router.post("/register")
+@router.post("/register", dependencies=[Depends(register_limit)])
 def register_user(
     data: schemas.RegisterUser,
-    background_tasks: BackgroundTasks,
     db: Session = Depends(database.get_db)
 ):
+    register_limit.check_identifier(data.email)
 
     # Check role validity
     if data.role not in VALID_ROLES:
@@ -63,9 +76,6 @@ def register_user(
     # Create hashed password
     hashed = argon2.hash(data.password)
 
-    # Generate OTP
-    otp = str(random.randint(100000, 999999))
-
     user = models.User(
         name=data.name,
         email=data.email,
@@ -73,17 +83,18 @@ def register_user(
         hashed_password=hashed,
         role=data.role,
         is_active=True,
-        is_verified=False,
-        otp=otp,
-        otp_expiry=datetime.utcnow() + timedelta(minutes=10)
+        is_verified=False
     )
 
     db.add(user)
     db.commit()
     db.refresh(user)
 
-    # Send OTP email
-    background_tasks.add_task(send_verification_email, user.email, user.name, otp)
+    # Generate OTP (kept in the OTP store, not on the user row)
+    otp = issue_otp("email", user.email)
+
+    # Queue OTP email (durable outbox, delivered by the email dispatcher)
+    send_verification_email(user.email, user.name, otp)
 
     return {
         "message": "OTP sent to your email for verification",
@@ -100,12 +111,14 @@ def register_user(
 # ==========================================================
 # LOGIN - EMAIL/PASSWORD
 # ==========================================================
-@router.post("/token")
+@router.post("/token", dependencies=[Depends(login_limit)])
 def login(
+    request: Request,
     response: Response,
     form_data: OAuth2PasswordRequestForm = Depends(),
     db: Session = Depends(database.get_db)
 ):
+    login_limit.check_identifier(form_data.username)
 
     db_user = db.query(models.User).filter(models.User.email == form_data.username).first()
 
@@ -115,6 +128,8 @@ def login(
     if not db_user.is_verified:
         raise HTTPException(status_code=403, detail="Email not verified")
 
+    record_login(db_user.id, get_client_ip(request), request.headers.get("user-agent"), "password")
+
     access_token = create_access_token({"sub": db_user.email, "role": db_user.role})
     refresh_token = create_refresh_token({"sub": db_user.email})
 
@@ -184,93 +199,94 @@ def get_current_user(
     return user
 
 
+# ==========================================================
+# LOGIN HISTORY
+# ==========================================================
+@router.get("/logins", response_model=List[schemas.LoginHistoryOut])
+def my_recent_logins(
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(database.get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """Recent sign-ins on this account, newest first."""
+    return recent_logins(db, current_user.id, limit)
+
+
 
 # ==========================================================
 # EMAIL OTP VERIFICATION
 # ==========================================================
-@router.post("/verify-email-otp")
+@router.post("/verify-email-otp", dependencies=[Depends(email_otp_verify_limit)])
 def verify_email_otp(data: schemas.VerifyOtp, db: Session = Depends(database.get_db)):
+    email_otp_verify_limit.check_identifier(data.email)
 
     user = db.query(models.User).filter(models.User.email == data.email).first()
 
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    if not user.otp or user.otp != data.otp:
-        raise HTTPException(status_code=400, detail="Invalid OTP")
-
-    if datetime.utcnow() > user.otp_expiry:
-        raise HTTPException(status_code=400, detail="OTP expired")
+    verify_otp("email", data.email, data.otp)
 
-    user.is_verified = True
-    user.otp = None
-    user.otp_expiry = None
-    db.commit()
+    if not user.is_verified:
+        user.is_verified = True
+        db.commit()
 
     return {"message": "Email verified successfully"}
 
 
 # ==========================================================
-# PHONE OTP (TESTING MODE: RETURNS OTP)
+# PHONE OTP
 # ==========================================================
-@router.post("/phone/request-otp")
-def phone_request_otp(data: schemas.PhoneOtpRequest, db: Session = Depends(database.get_db)):
+@router.post("/phone/request-otp", dependencies=[Depends(phone_otp_request_limit)])
+def phone_request_otp(data: schemas.PhoneOtpRequest):
 
     phone = data.phone.strip()
+    phone_otp_request_limit.check_identifier(phone)
 
     if len(phone) < 10:
         raise HTTPException(status_code=400, detail="Invalid phone number")
 
-    otp = str(random.randint(100000, 999999))
+    # No DB work here: the account is created on first successful verify
+    otp = issue_otp("phone", phone)
 
-    user = db.query(models.User).filter(models.User.phone == phone).first()
+    # Queued for the SMS dispatcher; the vendor's latency is not on this request
+    send_otp_sms(phone, otp)
 
-    if not user:
-        user = models.User(
-            name="User",
-            email=f"user_{phone}@auto.td",
-            phone=phone,
-            hashed_password=argon2.hash("default_temp"),
-            is_verified=True
-        )
-        db.add(user)
-        db.commit()
-        db.refresh(user)
-
-    user.otp = otp
-    user.otp_expiry = datetime.utcnow() + timedelta(minutes=10)
-    db.commit()
-
-    print("DEBUG OTP:", otp)
-
-    return {
+    result = {
         "message": "OTP generated successfully",
-        "otp": otp,
         "phone": phone
     }
+    if exposes_otp():
+        result["otp"] = otp
+    return result
 
 
 # ==========================================================
 # PHONE OTP VERIFY
 # ==========================================================
-@router.post("/phone/verify-otp")
-def phone_verify_otp(data: schemas.PhoneOtpVerify, db: Session = Depends(database.get_db)):
+@router.post("/phone/verify-otp", dependencies=[Depends(phone_otp_verify_limit)])
+def phone_verify_otp(data: schemas.PhoneOtpVerify, request: Request, db: Session = Depends(database.get_db)):
 
     phone = data.phone.strip()
-    user = db.query(models.User).filter(models.User.phone == phone).first()
+    phone_otp_verify_limit.check_identifier(phone)
 
-    if not user:
-        raise HTTPException(status_code=404, detail="Phone not registered")
+    verify_otp("phone", phone, data.otp)
 
-    if user.otp != data.otp:
-        raise HTTPException(status_code=400, detail="Invalid OTP")
+    user = db.query(models.User).filter(models.User.phone == phone).first()
 
-    if datetime.utcnow() > user.otp_expiry:
-        raise HTTPException(status_code=400, detail="OTP expired")
+    if not user:
+        user = models.User(
+            name="User",
+            email=f"user_{phone}@auto.td",
+            phone=phone,
+            hashed_password=argon2.hash("default_temp"),
+            is_verified=True
+        )
+        db.add(user)
+        db.commit()
+        db.refresh(user)
 
-    user.otp = None
-    user.otp_expiry = None
-    db.commit()
+    record_login(user.id, get_client_ip(request), request.headers.get("user-agent"), "phone_otp")
 
     access_token = create_access_token({"sub": user.email, "role": user.role})
     refresh_token = create_refresh_token({"sub": user.email})
@@ -314,9 +330,7 @@ def reset_password(data: schemas.ResetPassword, db: Session = Depends(database.g
     hashed = argon2.hash(data.password)
     user.hashed_password = hashed
 
-    user.otp = None
-    user.otp_expiry = None
-
     db.commit()
+    discard_otp("email", user.email)
 
     return {"message": "Password updated"}
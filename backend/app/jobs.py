@@ -0,0 +1,130 @@
+import os
+from datetime import date, datetime
+
+from dotenv import load_dotenv
+
+from app import models
+from app.database import SessionLocal
+from app.utils import archive_utils, change_log_utils, counter_utils, distance_utils, login_audit_utils, rollup_utils
+from app.utils.job_utils import HIGH, LOW, enqueue, job, job_queue
+
+# Load .env file
+load_dotenv()
+
+# Run a job worker inside each web process. Turn off when `python -m app.worker`
+# runs as its own process, so request workers only enqueue.
+JOBS_EMBEDDED_WORKER = os.getenv("JOBS_EMBEDDED_WORKER", "true").lower() == "true"
+
+DAY = 24 * 60 * 60
+
+
+# ----------------------
+# Handlers
+# ----------------------
+@job("notifications.send", priority=HIGH)
+def send_notifications(payload: dict):
+    """Fan one notification out to many users with a single executemany INSERT."""
+    now = datetime.utcnow()
+    db = SessionLocal()
+    try:
+        db.bulk_insert_mappings(models.Notification, [
+            {"user_id": user_id, "title": payload["title"], "message": payload["message"], "created_at": now}
+            for user_id in payload["user_ids"]
+        ])
+        db.commit()
+    finally:
+        db.close()
+
+
+@job("rollups.backfill", priority=LOW, max_attempts=3, lease_seconds=3600)
+def backfill_rollups(payload: dict):
+    start = date.fromisoformat(payload["start"]) if payload.get("start") else None
+    end = date.fromisoformat(payload["end"]) if payload.get("end") else None
+    db = SessionLocal()
+    try:
+        count = rollup_utils.backfill_rollups(db, start, end, payload.get("store_id"))
+        print(f"✅ Sales rollups rebuilt from {count} orders.")
+    finally:
+        db.close()
+
+
+@job("counters.reconcile", priority=LOW, max_attempts=3, lease_seconds=1800)
+def reconcile_counters(payload: dict):
+    db = SessionLocal()
+    try:
+        print(f"✅ Counters reconciled, {counter_utils.reconcile_counters(db)} rows fixed.")
+    finally:
+        db.close()
+
+
+@job("catalog.prune_changes", priority=LOW)
+def prune_catalog_changes(payload: dict):
+    db = SessionLocal()
+    try:
+        print(f"✅ Pruned {change_log_utils.prune_changes(db)} catalog change rows.")
+    finally:
+        db.close()
+
+
+@job("orders.archive", priority=LOW, max_attempts=3, lease_seconds=3600)
+def archive_orders(payload: dict):
+    """Move finished orders older than ARCHIVE_AFTER_DAYS to the archive tables."""
+    db = SessionLocal()
+    try:
+        count = archive_utils.archive_orders(db, payload.get("days", archive_utils.ARCHIVE_AFTER_DAYS))
+        print(f"✅ Archived {count} orders.")
+    finally:
+        db.close()
+
+
+@job("logins.prune", priority=LOW)
+def prune_login_history(payload: dict):
+    """Drop login history older than LOGIN_HISTORY_RETENTION_DAYS."""
+    db = SessionLocal()
+    try:
+        days = payload.get("days", login_audit_utils.LOGIN_HISTORY_RETENTION_DAYS)
+        print(f"✅ Pruned {login_audit_utils.prune_login_history(db, days)} login history rows.")
+    finally:
+        db.close()
+
+
+@job("distances.fill")
+def fill_distances(payload: dict):
+    """Cache store-address distances for a new address or a moved store."""
+    db = SessionLocal()
+    try:
+        if payload.get("address_id"):
+            distance_utils.fill_address(db, payload["address_id"])
+        if payload.get("store_id"):
+            distance_utils.fill_store(db, payload["store_id"])
+    finally:
+        db.close()
+
+
+@job("jobs.prune", priority=LOW)
+def prune_jobs(payload: dict):
+    print(f"✅ Pruned {job_queue.prune()} finished/dead jobs.")
+
+
+# (job name, every N seconds, payload)
+PERIODIC = [
+    ("counters.reconcile", DAY, {}),
+    ("catalog.prune_changes", DAY, {}),
+    ("jobs.prune", DAY, {}),
+    ("orders.archive", DAY, {}),
+    ("logins.prune", DAY, {}),
+]
+
+# Jobs the superadmin may trigger by hand
+MAINTENANCE_JOBS = {"rollups.backfill", "counters.reconcile", "catalog.prune_changes", "jobs.prune",
+                    "orders.archive", "logins.prune"}
+
+
+# ----------------------
+# Enqueue helpers
+# ----------------------
+def notify(user_ids, title: str, message: str):
+    """Queue in-app notifications; the request does not wait for the inserts."""
+    user_ids = [user_id for user_id in user_ids if user_id is not None]
+    if user_ids:
+        enqueue("notifications.send", {"user_ids": user_ids, "title": title, "message": message})
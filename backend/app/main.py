@@ -1,17 +1,27 @@
 from fastapi import FastAPI
-from app import models
+from app import jobs, models
 from app.auth import router as auth_router
-from app.routers import catalog, orders, home, upload, superadmin
+from app.routers import catalog, orders, home, upload, superadmin, health
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import FileResponse
 from fastapi.staticfiles import StaticFiles
-from app.database import engine, Base
+from app.database import engine, Base, FAST_START
+from app.utils.email_utils import email_dispatcher
+from app.utils.phone_otp_utils import sms_dispatcher
+from app.utils.compression_utils import CompressionMiddleware
+from app.utils.job_utils import job_worker
+from app.utils.login_audit_utils import login_audit
 from sqlalchemy import text
+import asyncio
 import time
 import os
 
 app = FastAPI(title="TownDrop API")
 
+# In fast-start mode (see database.FAST_START) background senders start a few
+# seconds after the app is serving
+BACKGROUND_START_DELAY = float(os.getenv("BACKGROUND_START_DELAY", 5))
+
 #  Ensure uploads folder exists at startup
 UPLOAD_DIR = os.path.join(os.getcwd(), "uploads")
 os.makedirs(UPLOAD_DIR, exist_ok=True)
@@ -20,6 +30,9 @@ os.makedirs(UPLOAD_DIR, exist_ok=True)
 @app.on_event("startup")
 def create_tables():
     """Create database tables if not exist, with retry logic"""
+    if FAST_START:
+        print("✅ Fast start: skipping create_all (schema is managed by Alembic).")
+        return
     import app.models  # noqa: F401
 
     max_retries = 2
@@ -40,6 +53,34 @@ def create_tables():
                 time.sleep(delay_seconds)
 
 
+def start_background():
+    email_dispatcher.start()
+    sms_dispatcher.start()
+    login_audit.start()
+    if jobs.JOBS_EMBEDDED_WORKER:
+        job_worker.periodic = jobs.PERIODIC
+        job_worker.start()
+
+
+@app.on_event("startup")
+async def start_dispatchers():
+    """Start background senders for the durable outboxes."""
+    if FAST_START:
+        # Messages queued before then wait in the durable outboxes
+        asyncio.get_running_loop().call_later(BACKGROUND_START_DELAY, start_background)
+        return
+    start_background()
+
+
+@app.on_event("shutdown")
+async def stop_dispatchers():
+    """Let in-flight batches finish before the worker exits."""
+    await sms_dispatcher.stop()
+    email_dispatcher.stop()
+    login_audit.stop()
+    job_worker.stop()
+
+
 
 app.add_middleware(
     CORSMiddleware,
@@ -49,6 +90,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# gzip/brotli for API responses (uploads and statics are excluded)
+app.add_middleware(CompressionMiddleware)
+
 
 #  Static Mounts
 app.mount("/statics", StaticFiles(directory="app/statics"), name="statics")
@@ -67,6 +111,7 @@ async def favicon():
 
 
 #  Include all routers
+app.include_router(health.router)
 app.include_router(auth_router)
 app.include_router(catalog.router)
 app.include_router(home.router)
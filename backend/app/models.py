@@ -1,14 +1,23 @@
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, Text, func, Boolean, Time, Enum
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, Text, func, Boolean, Time, Enum, UniqueConstraint, Index
 from sqlalchemy.orm import relationship
 from app.database import Base
 from datetime import datetime
-from sqlalchemy import DateTime
+from sqlalchemy import DateTime, Date, literal_column
 
-class User(Base):
+
+class ChangeTracked:
+    """updated_at / version bumped on every UPDATE, ORM flush or query.update() alike."""
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow,
+                        server_default=func.now())
+    version = Column(Integer, nullable=False, default=1, onupdate=literal_column("version") + 1,
+                     server_default="1")
+
+
+class User(ChangeTracked, Base):
     __tablename__ = "users"
 
     id = Column(Integer, primary_key=True, index=True)
-    name = Column(String(100), nullable=False)
+    name = Column(String(100), nullable=False, index=True)
     email = Column(String(255), unique=True, index=True, nullable=False)
     hashed_password = Column(String(255), nullable=False)
 
@@ -19,7 +28,7 @@ class User(Base):
         nullable=False
     )
 
-    phone = Column(String(20), nullable=True)
+    phone = Column(String(20), nullable=True, index=True)
 
     # ✅ Status flags
     is_verified = Column(Boolean, default=False)
@@ -28,7 +37,7 @@ class User(Base):
     verification_token = Column(String(255), nullable=True)
     stores = relationship("Store", back_populates="owner", cascade="all, delete-orphan")
 
-    # OTP Fields
+    # OTP Fields (legacy: OTPs now live in app.utils.otp_utils, not on the user row)
     otp = Column(String(6), nullable=True)
     otp_expiry = Column(DateTime, nullable=True)
 
@@ -44,21 +53,25 @@ class LoginHistory(Base):
     __tablename__ = "login_history"
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    login_time = Column(DateTime, default=datetime.utcnow)
+    login_time = Column(DateTime, default=datetime.utcnow, index=True)
     ip_address = Column(String(50), nullable=True)
     user_agent = Column(String(255), nullable=True)
+    method = Column(String(20), nullable=True)  # "password", "phone_otp"
+
+    # Rows are written in batches by app.utils.login_audit_utils
+    __table_args__ = (Index("ix_login_history_user_time", "user_id", "login_time"),)
 
     user = relationship("User", back_populates="logins")
 
 
-class Category(Base):
+class Category(ChangeTracked, Base):
     __tablename__ = "categories"
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(100), unique=True, index=True, nullable=False)
     image = Column(String(255), nullable=True)
     stores = relationship("Store", back_populates="category")
 
-class Store(Base):
+class Store(ChangeTracked, Base):
     __tablename__ = "stores"
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(100), index=True, nullable=False)
@@ -82,7 +95,7 @@ class Store(Base):
     
 
 
-class Product(Base):
+class Product(ChangeTracked, Base):
     __tablename__ = "products"
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(100), index=True, nullable=False)
@@ -97,9 +110,10 @@ class Product(Base):
 
     available = Column(Boolean, default=True)
     sales_count = Column(Integer, default=0)
+    stock = Column(Integer, nullable=True)  # None = not tracked (unlimited)
 
 
-class ProductSubCategory(Base):
+class ProductSubCategory(ChangeTracked, Base):
     __tablename__ = "product_subcategories"
 
     id = Column(Integer, primary_key=True, index=True)
@@ -111,7 +125,7 @@ class ProductSubCategory(Base):
 
 
 
-class Order(Base):
+class Order(ChangeTracked, Base):
     __tablename__ = "orders"
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -128,6 +142,11 @@ class Order(Base):
     store_earnings = Column(Float, default=0.0)
 
     contact_number = Column(String(20), nullable=True)
+    # Client-supplied Idempotency-Key; the unique index stops a duplicate checkout
+    # even when the TTL store has forgotten the key
+    idempotency_key = Column(String(64), nullable=True)
+
+    __table_args__ = (UniqueConstraint("user_id", "idempotency_key", name="uq_orders_user_idempotency_key"),)
 
     user = relationship("User", back_populates="orders")
     address = relationship("Address")
@@ -145,6 +164,100 @@ class OrderItem(Base):
     product = relationship("Product")
 
 
+class ArchivedOrder(Base):
+    """Finished orders moved out of `orders` (see utils/archive_utils.py); same ids and columns."""
+    __tablename__ = "orders_archive"
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    user_id = Column(Integer, nullable=False, index=True)
+    store_id = Column(Integer, index=True)
+    address_id = Column(Integer, nullable=False)
+    total_price = Column(Float, nullable=False)
+    status = Column(String(50))
+    store_name = Column(String(100), nullable=True)
+    payment_method = Column(String(50))
+    order_title = Column(String(255), nullable=True)
+    created_at = Column(DateTime, nullable=False, index=True)
+    delivery_fee = Column(Float, default=0.0)
+    store_earnings = Column(Float, default=0.0)
+    contact_number = Column(String(20), nullable=True)
+    idempotency_key = Column(String(64), nullable=True)
+    updated_at = Column(DateTime, nullable=False)
+    version = Column(Integer, nullable=False)
+    archived_at = Column(DateTime, nullable=False, server_default=func.now())
+
+
+class ArchivedOrderItem(Base):
+    __tablename__ = "order_items_archive"
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    order_id = Column(Integer, nullable=False, index=True)
+    product_id = Column(Integer, nullable=False, index=True)
+    quantity = Column(Integer, nullable=False)
+    price = Column(Float, nullable=False)
+
+
+class StoreCounter(Base):
+    """Maintained per-store totals for the dashboard (see utils/counter_utils.py)."""
+    __tablename__ = "store_counters"
+    store_id = Column(Integer, ForeignKey("stores.id", ondelete="CASCADE"), primary_key=True)
+    product_count = Column(Integer, nullable=False, default=0)
+    order_count = Column(Integer, nullable=False, default=0)  # excludes cancelled orders
+
+
+class UserCounter(Base):
+    """Maintained per-user totals: orders placed, plus totals across owned stores."""
+    __tablename__ = "user_counters"
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    order_count = Column(Integer, nullable=False, default=0)
+    owned_product_count = Column(Integer, nullable=False, default=0)
+    owned_order_count = Column(Integer, nullable=False, default=0)
+
+
+class StoreSalesRollup(Base):
+    """Per store, per local (IST) day and hour sales totals (see utils/rollup_utils.py)."""
+    __tablename__ = "store_sales_rollups"
+    store_id = Column(Integer, ForeignKey("stores.id", ondelete="CASCADE"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    hour = Column(Integer, primary_key=True)
+    order_count = Column(Integer, nullable=False, default=0)  # excludes cancelled orders
+    revenue = Column(Float, nullable=False, default=0.0)  # store earnings, without delivery fee
+    delivery_fees = Column(Float, nullable=False, default=0.0)
+    cancelled_count = Column(Integer, nullable=False, default=0)
+
+
+class ProductSalesRollup(Base):
+    """Per store, product and local day quantities sold."""
+    __tablename__ = "product_sales_rollups"
+    store_id = Column(Integer, ForeignKey("stores.id", ondelete="CASCADE"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    product_id = Column(Integer, ForeignKey("products.id", ondelete="CASCADE"), primary_key=True)
+    quantity = Column(Integer, nullable=False, default=0)
+    revenue = Column(Float, nullable=False, default=0.0)
+
+
+class OrderCube(Base):
+    """Platform-wide order aggregates per IST day, category, store, payment method and status."""
+    __tablename__ = "order_cube"
+    day = Column(Date, primary_key=True)
+    category_id = Column(Integer, primary_key=True)  # 0 when unknown
+    store_id = Column(Integer, primary_key=True)  # 0 when unknown
+    payment_method = Column(String(50), primary_key=True)
+    status = Column(String(50), primary_key=True)
+    order_count = Column(Integer, nullable=False, default=0)
+    gmv = Column(Float, nullable=False, default=0.0)  # total_price, including delivery fee
+    delivery_fees = Column(Float, nullable=False, default=0.0)
+    store_earnings = Column(Float, nullable=False, default=0.0)
+
+
+class CatalogChange(Base):
+    """Append-only log behind /catalog/sync; `id` doubles as the client's cursor."""
+    __tablename__ = "catalog_changes"
+    id = Column(Integer, primary_key=True, index=True)
+    entity = Column(String(20), nullable=False)  # category / store / subcategory / product
+    entity_id = Column(Integer, nullable=False)
+    op = Column(String(10), nullable=False)  # upsert / delete
+    changed_at = Column(DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+
 class Cart(Base):
     __tablename__ = "cart"
     id = Column(Integer, primary_key=True, index=True)
@@ -168,7 +281,7 @@ class AppDeliverySettings(Base):
     free_above = Column(Float, default=750)
 
 
-class Address(Base):
+class Address(ChangeTracked, Base):
     __tablename__ = "addresses"
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -181,6 +294,14 @@ class Address(Base):
 
     user = relationship("User", back_populates="addresses")
 
+
+class StoreAddressDistance(Base):
+    """Cached store -> address distance (see utils/distance_utils.py)."""
+    __tablename__ = "store_address_distances"
+    store_id = Column(Integer, ForeignKey("stores.id", ondelete="CASCADE"), primary_key=True)
+    address_id = Column(Integer, ForeignKey("addresses.id", ondelete="CASCADE"), primary_key=True, index=True)
+    distance_km = Column(Float, nullable=False)
+
 class Notification(Base):
     __tablename__ = "notifications"
 
@@ -1,14 +1,19 @@
-from fastapi import APIRouter, Depends, HTTPException, Body
+from fastapi import APIRouter, Depends, HTTPException, Body, Header, Request, Response, UploadFile, File
+from fastapi.responses import StreamingResponse
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session, selectinload
-from typing import List
-from app import models, schemas
-from app.database import get_db
+from typing import List, Optional
+from app import jobs, models, schemas
+from app.database import get_db, get_read_db, SessionLocal
 from app.auth import get_current_user  
 from app.models import User
+from app.utils import counter_utils, rollup_utils
+from app.utils import change_log_utils, distance_utils, etag_utils, idempotency_utils, inventory_utils, order_state_utils, product_io_utils, serialization_utils
+from app.utils.serialization_utils import FastJSONResponse, fetch_orders, product_query, product_dict
 from typing import Dict
-from datetime import datetime
-from haversine import haversine, Unit
+from datetime import datetime, date, timedelta
 import pytz
+import csv
 
 
 india = pytz.timezone("Asia/Kolkata")
@@ -16,13 +21,17 @@ india = pytz.timezone("Asia/Kolkata")
 
 router = APIRouter(prefix="/catalog", tags=["Catalog"])
 
+# Read routes that may be served by a replica, by how stale (seconds) they can be
+catalog_read_db = get_read_db(max_lag=30)
+orders_read_db = get_read_db(max_lag=2)
+analytics_read_db = get_read_db(max_lag=120)
+
+# Fields PATCH /products/{id} may change; ids, counters and versions are not among them
+PATCHABLE_PRODUCT_FIELDS = {"name", "price", "image", "available", "subcategory_id", "stock"}
+
 def calculate_delivery_distance(store, address):
     """Return distance in kilometers between store and user address."""
-    if not store.latitude or not store.longitude or not address.latitude or not address.longitude:
-        return None
-    store_coords = (store.latitude, store.longitude)
-    user_coords = (address.latitude, address.longitude)
-    return haversine(store_coords, user_coords, unit=Unit.KILOMETERS)
+    return distance_utils.compute_distance(store, address)
 
 def calculate_delivery_fee(distance_km: float):
     """Simple delivery fee model based on distance."""
@@ -54,41 +63,78 @@ def get_store_status(store):
         return False, f"Closed - Opens again at {open_str}"
 
 def send_notification(db: Session, user_id: int, title: str, message: str):
-    """Store notification in DB or trigger push message."""
-    notification = models.Notification(
-        user_id=user_id,
-        title=title,
-        message=message
-    )
-    db.add(notification)
-    db.commit()
+    """Queue the notification; the job worker stores it (or triggers a push message)."""
+    jobs.notify([user_id], title, message)
 
 @router.get("/stats", response_model=Dict[str, int])
 def get_stats(
-    db: Session = Depends(get_db),
+    db: Session = Depends(analytics_read_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Return dashboard statistics based on user role."""
-    total_orders = 0
-    total_products = 0
-    if current_user.role == "store_owner" or current_user.role == "store_owner":
-        store_ids = [
-            store.id
-            for store in db.query(models.Store).filter(models.Store.owner_id == current_user.id).all()
-        ]
-        if store_ids:
-            total_products = db.query(models.Product).filter(models.Product.store_id.in_(store_ids)).count()
-            total_orders = db.query(models.Order).filter(models.Order.store_id.in_(store_ids)).count()
-    else:
-        total_orders = db.query(models.Order).filter(models.Order.user_id == current_user.id).count()
-    return {"totalOrders": total_orders, "totalProducts": total_products}
+    """Return dashboard statistics based on user role (one row read from user_counters)."""
+    counters = db.query(models.UserCounter).filter(models.UserCounter.user_id == current_user.id).first()
+    if not counters:
+        return {"totalOrders": 0, "totalProducts": 0}
+    if current_user.role == "store_owner":
+        return {"totalOrders": counters.owned_order_count, "totalProducts": counters.owned_product_count}
+    return {"totalOrders": counters.order_count, "totalProducts": 0}
+
+
+@router.get("/analytics/sales", response_model=schemas.SalesAnalyticsOut)
+def get_sales_analytics(
+    store_id: int,
+    start: date = None,
+    end: date = None,
+    top: int = 10,
+    db: Session = Depends(analytics_read_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Revenue per day, orders per hour and top products, read from the sales rollups."""
+    store = db.query(models.Store).filter(models.Store.id == store_id).first()
+    if not store:
+        raise HTTPException(status_code=404, detail="Store not found")
+    if store.owner_id != current_user.id and current_user.role != "superadmin":
+        raise HTTPException(status_code=403, detail="Not authorized to view this store")
+
+    end = end or rollup_utils.local_today()
+    start = start or end - timedelta(days=29)
+    if start > end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+    if (end - start).days > 366:
+        raise HTTPException(status_code=400, detail="Date range too large (max 1 year)")
+
+    return rollup_utils.sales_summary(db, store_id, start, end, top=max(1, min(top, 50)))
+
+
+@router.get("/sync", response_model=schemas.CatalogSyncOut)
+def sync_catalog(
+    cursor: int = 0,
+    limit: int = change_log_utils.SYNC_PAGE_SIZE,
+    db: Session = Depends(catalog_read_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Catalog deltas (upserts + tombstones) since `cursor`. Without a cursor, or
+    when it is older than the retained log, a full snapshot with reset=true.
+    Keep calling with the returned cursor while has_more is true.
+    """
+    limit = max(1, min(limit, 5000))
+    return FastJSONResponse(change_log_utils.changes_since(db, cursor, limit, get_store_status))
 
 
 @router.get("/categories", response_model=List[schemas.CategoryOut])
 def get_categories(
-    db: Session = Depends(get_db),
+    request: Request,
+    response: Response,
+    db: Session = Depends(catalog_read_db),
     current_user: User = Depends(get_current_user)
 ):
+    variant = f"owner:{current_user.id}" if current_user.role == "store_owner" else ""
+    validators = etag_utils.check(request, db, [(models.Category,), (models.Store,)], variant)
+    if validators.not_modified:
+        return validators.not_modified_response()
+    validators.apply(response)
+
     if current_user.role == "store_owner": 
         stores = db.query(models.Store).filter(models.Store.owner_id == current_user.id).all()
         if stores:
@@ -129,31 +175,51 @@ def update_category(category_id: int, category: schemas.CategoryUpdate, db: Sess
 
 # Stores
 @router.get("/categories/{category_id}/stores", response_model=List[schemas.StoreOut])
-def get_stores_by_category(category_id: int, db: Session = Depends(get_db)):
-    category = db.query(models.Category).filter(models.Category.id == category_id).first()
+def get_stores_by_category(request: Request, category_id: int, fields: Optional[str] = None, db: Session = Depends(catalog_read_db)):
+    category = db.query(models.Category.id).filter(models.Category.id == category_id).first()
     if not category:
         raise HTTPException(status_code=404, detail="Category not found")
-    
-    stores = category.stores
-    for store in stores:
-        store.is_open, store.status_text = get_store_status(store)
-    return category.stores
+
+    spec = serialization_utils.parse_fields(fields, serialization_utils.STORE_TREE)
+    validators = etag_utils.check(
+        request, db, [(models.Store, models.Store.category_id == category_id)], etag_utils.store_status_variant()
+    )
+    if validators.not_modified:
+        return validators.not_modified_response()
+
+    stores = serialization_utils.store_query(db, spec).filter(models.Store.category_id == category_id)
+    return validators.apply(
+        FastJSONResponse([serialization_utils.store_dict(row, spec, get_store_status) for row in stores])
+    )
 
 @router.get("/categories/all", response_model=List[schemas.CategoryOut])
-def get_all_categories(db: Session = Depends(get_db)):
+def get_all_categories(request: Request, response: Response, db: Session = Depends(catalog_read_db)):
     """Return all categories (for adding a store)"""
+    validators = etag_utils.check(request, db, [(models.Category,), (models.Store,)])
+    if validators.not_modified:
+        return validators.not_modified_response()
+    validators.apply(response)
     return db.query(models.Category).all()
 
 @router.get("/stores/my", response_model=List[schemas.StoreOut])
 def get_my_stores(
+    request: Request,
+    fields: Optional[str] = None,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """✅ Return only stores owned by the logged-in user"""
-    stores = db.query(models.Store).filter(models.Store.owner_id == current_user.id).all()
-    for store in stores:
-        store.is_open, store.status_text = get_store_status(store)
-    return stores
+    spec = serialization_utils.parse_fields(fields, serialization_utils.STORE_TREE)
+    validators = etag_utils.check(
+        request, db, [(models.Store, models.Store.owner_id == current_user.id)], etag_utils.store_status_variant()
+    )
+    if validators.not_modified:
+        return validators.not_modified_response()
+
+    stores = serialization_utils.store_query(db, spec).filter(models.Store.owner_id == current_user.id)
+    return validators.apply(
+        FastJSONResponse([serialization_utils.store_dict(row, spec, get_store_status) for row in stores])
+    )
     
 
 @router.post("/stores", response_model=schemas.StoreOut)
@@ -183,6 +249,8 @@ def create_store(
     db.add(new_store)
     db.commit()
     db.refresh(new_store)
+    if new_store.latitude and new_store.longitude:
+        distance_utils.refill_store(new_store.id)
     return new_store
 
 @router.put("/stores/{store_id}", response_model=schemas.StoreOut)
@@ -211,10 +279,14 @@ def update_store(
     if store.close_time is not None:
         db_store.close_time = store.close_time
     
+    old_coords = (db_store.latitude, db_store.longitude)
     if store.latitude is not None:
         db_store.latitude = store.latitude
     if store.longitude is not None:
         db_store.longitude = store.longitude
+    moved = (db_store.latitude, db_store.longitude) != old_coords
+    if moved:
+        distance_utils.invalidate_store(db, db_store.id)
 
 
     if hasattr(store, "is_open") and store.is_open is not None:
@@ -222,6 +294,8 @@ def update_store(
 
     db.commit()
     db.refresh(db_store)
+    if moved:
+        distance_utils.refill_store(db_store.id)
     return db_store
 @router.patch("/stores/{store_id}", response_model=schemas.StoreOut)
 def patch_store(
@@ -239,12 +313,18 @@ def patch_store(
         raise HTTPException(status_code=403, detail="Not authorized to update this store")
 
     updatable_fields = {"name", "image", "contact_number", "open_time", "close_time", "is_open", "latitude", "longitude"}
+    old_coords = (db_store.latitude, db_store.longitude)
     for key, value in data.items():
         if key in updatable_fields:
             setattr(db_store, key, value)
+    moved = (db_store.latitude, db_store.longitude) != old_coords
+    if moved:
+        distance_utils.invalidate_store(db, db_store.id)
 
     db.commit()
     db.refresh(db_store)
+    if moved:
+        distance_utils.refill_store(db_store.id)
     return db_store
     
 
@@ -273,8 +353,10 @@ def create_subcategory(
 
 @router.get("/stores/{store_id}/subcategories", response_model=List[schemas.ProductSubCategoryOut])
 def get_subcategories_by_store(
+    request: Request,
+    response: Response,
     store_id: int,
-    db: Session = Depends(get_db),
+    db: Session = Depends(catalog_read_db),
     current_user: User = Depends(get_current_user)
 ):
     """✅ Fetch all subcategories for a store"""
@@ -282,6 +364,13 @@ def get_subcategories_by_store(
     if not store:
         raise HTTPException(status_code=404, detail="Store not found")
 
+    validators = etag_utils.check(
+        request, db, [(models.ProductSubCategory, models.ProductSubCategory.store_id == store_id)]
+    )
+    if validators.not_modified:
+        return validators.not_modified_response()
+    validators.apply(response)
+
     return db.query(models.ProductSubCategory).filter(
         models.ProductSubCategory.store_id == store_id
     ).all()
@@ -347,9 +436,11 @@ def update_subcategory(
 # Products
 @router.get("/stores/{store_id}/products", response_model=List[schemas.ProductOut])
 def get_products_by_store(
+    request: Request,
     store_id: int,
     q: str = None,
-    db: Session = Depends(get_db),
+    fields: Optional[str] = None,
+    db: Session = Depends(catalog_read_db),
     current_user: User = Depends(get_current_user)
 ):
     store = db.query(models.Store).filter(models.Store.id == store_id).first()
@@ -357,14 +448,75 @@ def get_products_by_store(
         raise HTTPException(status_code=404, detail="Store not found")
     if current_user.role == "store_owner" and store.owner_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized to access this store")
-    query = db.query(models.Product).filter(models.Product.store_id == store_id)
+    spec = serialization_utils.parse_fields(fields, serialization_utils.PRODUCT_TREE)
+    validators = etag_utils.check(request, db, [
+        (models.Product, models.Product.store_id == store_id),
+        (models.ProductSubCategory, models.ProductSubCategory.store_id == store_id),
+    ])
+    if validators.not_modified:
+        return validators.not_modified_response()
+
+    query = product_query(db, spec=spec).filter(models.Product.store_id == store_id)
     if q:
         query = query.filter(models.Product.name.ilike(f"%{q}%"))
-    products = query.all()
-    for p in products:
-        if p.available is None:
-            p.available = False
-    return products
+    return validators.apply(FastJSONResponse([product_dict(row, spec) for row in query]))
+
+
+def get_owned_store(db: Session, store_id: int, current_user: User):
+    store = db.query(models.Store).filter(models.Store.id == store_id).first()
+    if not store:
+        raise HTTPException(status_code=404, detail="Store not found")
+    if store.owner_id != current_user.id and current_user.role != "superadmin":
+        raise HTTPException(status_code=403, detail="Not authorized to manage this store")
+    return store
+
+
+@router.post("/stores/{store_id}/products/import")
+def import_products(
+    store_id: int,
+    file: UploadFile = File(...),
+    format: Optional[str] = None,
+    create_subcategories: bool = True,
+    dry_run: bool = False,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Bulk upsert products from a CSV or JSONL upload, matched by name.
+    Columns: name, price, image, available, stock, subcategory (name) or subcategory_id.
+    Valid rows are saved in chunks; invalid ones are reported by line number.
+    """
+    store = get_owned_store(db, store_id, current_user)
+    fmt = (format or "").lower()
+    if not fmt:
+        fmt = "jsonl" if (file.filename or "").lower().endswith((".jsonl", ".ndjson")) else "csv"
+    if fmt not in ("csv", "jsonl"):
+        raise HTTPException(status_code=400, detail="format must be csv or jsonl")
+
+    job = product_io_utils.ProductImport(db, store, create_subcategories=create_subcategories, dry_run=dry_run)
+    try:
+        return job.run(product_io_utils.read_rows(file.file, fmt))
+    except (UnicodeDecodeError, csv.Error) as e:
+        raise HTTPException(status_code=400, detail=f"Unreadable file after {job.created + job.updated} rows: {e}")
+
+
+@router.get("/stores/{store_id}/products/export")
+def export_products(
+    store_id: int,
+    format: str = "csv",
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Stream every product of the store as CSV (import-compatible) or JSONL."""
+    get_owned_store(db, store_id, current_user)
+    if format not in ("csv", "jsonl"):
+        raise HTTPException(status_code=400, detail="format must be csv or jsonl")
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        product_io_utils.export_lines(SessionLocal, store_id, format),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="store-{store_id}-products.{format}"'},
+    )
 
 
 @router.post("/products", response_model=schemas.ProductOut)
@@ -387,9 +539,12 @@ def create_product(
         price=product.price,
         image=product.image,
         store_id=product.store_id,
-        subcategory_id=product.subcategory_id
+        subcategory_id=product.subcategory_id,
+        stock=product.stock,
+        available=inventory_utils.initial_available(product.stock),
     )
     db.add(new_product)
+    counter_utils.count_product(db, store, 1)
     db.commit()
     db.refresh(new_product)
     return new_product
@@ -416,6 +571,8 @@ def update_product(
         db_product.image = product.image
     if product.subcategory_id is not None:   
         db_product.subcategory_id = product.subcategory_id
+    if product.stock is not None:
+        inventory_utils.set_stock(db, db_product.id, stock=product.stock)
 
     db.commit()
     db.refresh(db_product)
@@ -434,16 +591,86 @@ def patch_product(
     store = db.query(models.Store).filter(models.Store.id == db_product.store_id).first()
     if store.owner_id != current_user.id and current_user.role != "store_owner":
         raise HTTPException(status_code=403, detail="Not authorized to update this product")
-    if "subcategory_id" in data:
-        db_product.subcategory_id = data["subcategory_id"]
+    unknown = sorted(set(data) - PATCHABLE_PRODUCT_FIELDS)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Cannot patch: {', '.join(unknown)}")
+    stock = data.get("stock")
+    if "stock" in data and stock is not None and (not isinstance(stock, int) or isinstance(stock, bool) or stock < 0):
+        raise HTTPException(status_code=400, detail="stock must be a non-negative integer or null")
+    # stock / available go through the inventory helper, the rest straight on the row
+    inventory_utils.set_stock(db, db_product.id, **{k: data.pop(k) for k in ("stock", "available") if k in data})
     for key, value in data.items():
-        if hasattr(db_product, key):
-            setattr(db_product, key, value)
+        setattr(db_product, key, value)
 
     db.commit()
     db.refresh(db_product)
     return db_product
 
+@router.patch("/products", response_model=List[schemas.ProductOut])
+def bulk_patch_products(
+    patches: List[schemas.ProductBulkPatch],
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Update price / available / subcategory_id / stock of many products at once.
+    Ownership is checked with one query and all rows go out in one
+    executemany per set of changed columns, in a single transaction.
+    """
+    if not patches:
+        return FastJSONResponse([])
+    if len(patches) > 500:
+        raise HTTPException(status_code=400, detail="At most 500 products per request")
+
+    changes = {}
+    for patch in patches:
+        values = patch.dict(exclude_unset=True)
+        values.pop("id")
+        if values.get("price", 0) is None or values.get("available", False) is None:
+            raise HTTPException(status_code=400, detail=f"Product {patch.id}: price and available cannot be null")
+        changes.setdefault(patch.id, {}).update(values)
+
+    owners = {
+        product_id: (store_id, owner_id) for product_id, store_id, owner_id in
+        db.query(models.Product.id, models.Product.store_id, models.Store.owner_id)
+        .join(models.Store, models.Store.id == models.Product.store_id)
+        .filter(models.Product.id.in_(list(changes)))
+    }
+    missing = [product_id for product_id in changes if product_id not in owners]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Products not found: {missing}")
+    if current_user.role != "superadmin":
+        foreign = [product_id for product_id, (_, owner_id) in owners.items() if owner_id != current_user.id]
+        if foreign:
+            raise HTTPException(status_code=403, detail=f"Not authorized to update products: {foreign}")
+
+    subcategory_ids = {v["subcategory_id"] for v in changes.values() if v.get("subcategory_id") is not None}
+    if subcategory_ids:
+        subcategory_stores = dict(
+            db.query(models.ProductSubCategory.id, models.ProductSubCategory.store_id)
+            .filter(models.ProductSubCategory.id.in_(list(subcategory_ids)))
+        )
+        for product_id, values in changes.items():
+            sub_id = values.get("subcategory_id")
+            if sub_id is not None and subcategory_stores.get(sub_id) != owners[product_id][0]:
+                raise HTTPException(status_code=400, detail=f"Product {product_id}: subcategory {sub_id} is not in its store")
+
+    stock_changes = {
+        product_id: {k: values.pop(k) for k in ("stock", "available") if k in values}
+        for product_id, values in changes.items()
+    }
+    updates = [{"id": product_id, **values} for product_id, values in changes.items() if values]
+    if updates:
+        db.bulk_update_mappings(models.Product, updates)
+        change_log_utils.record_changes(db, models.Product, [row["id"] for row in updates])
+    for product_id, values in stock_changes.items():
+        inventory_utils.set_stock(db, product_id, **values)
+    db.commit()
+
+    rows = product_query(db).filter(models.Product.id.in_(list(changes))).order_by(models.Product.id)
+    return FastJSONResponse([product_dict(row) for row in rows])
+
+
 @router.delete("/products/{product_id}")
 def delete_product(
     product_id: int,
@@ -463,10 +690,9 @@ def delete_product(
     if current_user.role != "store_owner" and store.owner_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized to delete this product")
 
-    order_item_exists = (
-        db.query(models.OrderItem)
-        .filter(models.OrderItem.product_id == product_id)
-        .first()
+    order_item_exists = any(
+        db.query(model.id).filter(model.product_id == product_id).first()
+        for model in (models.OrderItem, models.ArchivedOrderItem)
     )
     if order_item_exists:
         raise HTTPException(
@@ -475,6 +701,7 @@ def delete_product(
         )
 
     db.delete(product)
+    counter_utils.count_product(db, store, -1)
     db.commit()
 
     return {"message": "Product deleted successfully", "product_id": product_id}
@@ -558,14 +785,130 @@ def calculate_dynamic_delivery_fee(settings, distance_km, order_total_without_fe
     return round(fee, 2)
 
 
+def load_delivery_settings(db: Session):
+    settings = db.query(models.AppDeliverySettings).first()
+    if not settings:
+        settings = models.AppDeliverySettings()
+        db.add(settings)
+        db.commit()
+        db.refresh(settings)
+    return settings
+
+
+@router.get("/delivery-quote", response_model=schemas.DeliveryQuote)
+def get_delivery_quote(
+    address_id: int,
+    store_id: Optional[int] = None,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """
+    Delivery fee the cart would be charged at checkout, using the same rules
+    as POST /orders. `store_id` defaults to the cart's store.
+    """
+    address = db.query(models.Address).filter(
+        models.Address.id == address_id, models.Address.user_id == current_user.id
+    ).first()
+    if not address:
+        raise HTTPException(status_code=404, detail="Address not found")
+
+    cart = (
+        db.query(models.Product.store_id, models.Product.price, models.Cart.quantity)
+        .join(models.Product, models.Product.id == models.Cart.product_id)
+        .filter(models.Cart.user_id == current_user.id)
+        .order_by(models.Cart.id)
+        .all()
+    )
+    if store_id is None:
+        if not cart:
+            raise HTTPException(status_code=400, detail="Cart is empty")
+        store_id = cart[0].store_id
+    store = db.query(models.Store).filter(models.Store.id == store_id).first()
+    if not store:
+        raise HTTPException(status_code=404, detail="Store not found")
+
+    distance_km = distance_utils.lookup_distance(db, store, address)
+    subtotal = sum((row.price or 0) * (row.quantity or 0) for row in cart if row.store_id == store.id)
+    settings = load_delivery_settings(db)
+    delivery_fee = calculate_dynamic_delivery_fee(settings, distance_km, subtotal)
+    free_above = settings.free_above
+
+    return {
+        "store_id": store.id,
+        "address_id": address.id,
+        "distance_km": round(distance_km, 2) if distance_km is not None else None,
+        "subtotal": round(subtotal, 2),
+        "delivery_fee": delivery_fee,
+        "total": round(subtotal + delivery_fee, 2),
+        "free_delivery_above": free_above,
+        "amount_to_free_delivery": round(max(free_above - subtotal, 0), 2) if free_above else None,
+    }
+
+
 # Orders
+def load_order(db: Session, order_id: int):
+    order = db.query(models.Order).options(
+        selectinload(models.Order.items).selectinload(models.OrderItem.product),
+        selectinload(models.Order.user),
+        selectinload(models.Order.address)
+    ).filter(models.Order.id == order_id).first()
+    if not order:
+        raise HTTPException(status_code=404, detail="Order not found")
+    return order
+
+
+def find_order_by_key(db: Session, user_id: int, idempotency_key: str):
+    row = db.query(models.Order.id).filter(
+        models.Order.user_id == user_id, models.Order.idempotency_key == idempotency_key
+    ).first()
+    return row.id if row else None
+
+
 @router.post("/orders", response_model=schemas.OrderOut)
 def create_order(
     order_data: schemas.OrderCreate,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None),
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
-    """Create order + calculate delivery fee. Delivery fee is NOT part of store earnings."""
+    """
+    Create order + calculate delivery fee. Delivery fee is NOT part of store earnings.
+    Send an `Idempotency-Key` header to make retries safe: a repeat with the
+    same key and body returns the original order (Idempotent-Replayed: true)
+    without running checkout again, even while the first request is in flight.
+    """
+    if idempotency_key is None:
+        return load_order(db, place_order(order_data, db, current_user))
+
+    key = idempotency_utils.validate_key(idempotency_key)
+    scope = f"orders:{current_user.id}"
+    request_fingerprint = idempotency_utils.fingerprint(order_data.dict())
+    order_id = idempotency_utils.claim(scope, key, request_fingerprint)
+    if order_id is None:
+        # The store can forget (TTL, restart, another worker's memory); the orders table can't
+        order_id = find_order_by_key(db, current_user.id, key)
+        if order_id is None:
+            try:
+                order_id = place_order(order_data, db, current_user, key)
+            except Exception:
+                idempotency_utils.release(scope, key)
+                raise
+            idempotency_utils.complete(scope, key, request_fingerprint, order_id)
+            return load_order(db, order_id)
+        idempotency_utils.complete(scope, key, request_fingerprint, order_id)
+
+    response.headers["Idempotent-Replayed"] = "true"
+    return load_order(db, order_id)
+
+
+def place_order(
+    order_data: schemas.OrderCreate,
+    db: Session,
+    current_user: models.User,
+    idempotency_key: Optional[str] = None,
+) -> int:
+    """Run checkout and return the new order's id."""
 
     # Fetch cart items
     cart_items = db.query(models.Cart).options(selectinload(models.Cart.product)).filter(
@@ -583,15 +926,10 @@ def create_order(
     if not address:
         raise HTTPException(status_code=404, detail="Address not found")
 
-    distance_km = calculate_delivery_distance(store, address)
+    distance_km = distance_utils.get_distance(db, store, address)
     order_total = sum((item.product.price or 0) * (item.quantity or 0) for item in cart_items)
 
-    settings = db.query(models.AppDeliverySettings).first()
-    if not settings:
-        settings = models.AppDeliverySettings()
-        db.add(settings)
-        db.commit()
-        db.refresh(settings)
+    settings = load_delivery_settings(db)
 
     delivery_fee = calculate_dynamic_delivery_fee(
         settings=settings,
@@ -601,7 +939,11 @@ def create_order(
 
     total_price = order_total + delivery_fee 
 
-    # Create order
+    # Take stock first; a 409 here leaves nothing behind
+    lines = [(item.product_id, item.quantity, item.product.price) for item in cart_items]
+    inventory_utils.reserve_stock(db, lines)
+
+    # Create order, items and clear the cart in one transaction
     order = models.Order(
         user_id=current_user.id,
         address_id=order_data.address_id,
@@ -613,11 +955,21 @@ def create_order(
         payment_method=order_data.payment_method,
         contact_number=order_data.contact_number or current_user.phone,
         delivery_fee=delivery_fee,
+        idempotency_key=idempotency_key,
         created_at=datetime.now(india)
     )
     db.add(order)
-    db.commit()
-    db.refresh(order)
+    try:
+        db.flush()
+    except IntegrityError:
+        # Same key committed by a concurrent request on another worker: that one wins
+        db.rollback()
+        order_id = idempotency_key and find_order_by_key(db, current_user.id, idempotency_key)
+        if not order_id:
+            raise
+        return order_id
+    counter_utils.count_order(db, order, store.owner_id, 1)
+    rollup_utils.record_order(db, order, lines, category_id=store.category_id)
 
     # Add order items
     for item in cart_items:
@@ -628,63 +980,86 @@ def create_order(
             price=item.product.price
         )
         db.add(order_item)
-    db.commit()
 
     # Clear cart
-    db.query(models.Cart).filter(models.Cart.user_id == current_user.id).delete()
+    db.query(models.Cart).filter(models.Cart.user_id == current_user.id).delete(synchronize_session=False)
     db.commit()
-
-    return db.query(models.Order).options(
-        selectinload(models.Order.items).selectinload(models.OrderItem.product),
-        selectinload(models.Order.user),
-        selectinload(models.Order.address)
-    ).filter(models.Order.id == order.id).first()
+    return order.id
 
 # --- Get Orders ---
 @router.get("/orders", response_model=List[schemas.OrderOut])
 def get_orders(
-    db: Session = Depends(get_db),
+    request: Request,
+    fields: Optional[str] = None,
+    include: Optional[str] = None,
+    db: Session = Depends(orders_read_db),
     current_user: models.User = Depends(get_current_user)
 ):
-    query = db.query(models.Order).options(
-        selectinload(models.Order.items).selectinload(models.OrderItem.product),
-        selectinload(models.Order.user),
-        selectinload(models.Order.address)
-    )
-
+    """
+    Order history, newest first. Served through the column-projected fast path;
+    `fields` / `include` (items, user, address) trim the payload. Pollers send
+    If-None-Match and get a 304 until an order, or a product, user or address
+    it embeds, is added or changes version.
+    """
+    spec = serialization_utils.parse_fields(fields, serialization_utils.ORDER_TREE, include)
     if current_user.role == "store_owner":
-        store_ids = [store.id for store in db.query(models.Store).filter(models.Store.owner_id == current_user.id).all()]
+        store_ids = [row.id for row in db.query(models.Store.id).filter(models.Store.owner_id == current_user.id)]
         if not store_ids:
-            return []
-        query = query.filter(models.Order.store_id.in_(store_ids))
+            return FastJSONResponse([])
+        sources = serialization_utils.order_etag_sources(lambda model: [model.store_id.in_(store_ids)])
     else:
-        query = query.filter(models.Order.user_id == current_user.id)
+        sources = serialization_utils.order_etag_sources(lambda model: [model.user_id == current_user.id])
 
-    orders = query.order_by(models.Order.created_at.desc()).all()
+    validators = etag_utils.check(request, db, sources, f"user:{current_user.id}")
+    if validators.not_modified:
+        return validators.not_modified_response()
 
+    if current_user.role == "store_owner":
+        orders = fetch_orders(db, store_ids=store_ids, spec=spec, include_archive=True)
+    else:
+        orders = fetch_orders(db, user_id=current_user.id, spec=spec, include_archive=True)
+    return validators.apply(FastJSONResponse(orders))
 
-    for order in orders:
-        if order.items:
-            first_product = order.items[0].product.name
-            order.order_title = f"{first_product} +{len(order.items) - 1} more" if len(order.items) > 1 else first_product
-        else:
-            order.order_title = "Order"
 
-        if order.user:
-            order.user.phone = order.contact_number or order.user.phone
-        if not hasattr(order, "store_earnings") or order.store_earnings is None:
-            order.store_earnings = sum(item.price * item.quantity for item in order.items)
+@router.get("/orders/{order_id}/state", response_model=schemas.OrderState)
+def get_order_state(
+    order_id: int,
+    request: Request,
+    db: Session = Depends(orders_read_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """Cheap poll: status + version only, 304 while the version is unchanged."""
+    for model in (models.Order, models.ArchivedOrder):
+        row = (
+            db.query(model.id, model.status, model.version, model.user_id, models.Store.owner_id)
+            .outerjoin(models.Store, models.Store.id == model.store_id)
+            .filter(model.id == order_id)
+            .first()
+        )
+        if row:
+            break
+    if not row:
+        raise HTTPException(status_code=404, detail="Order not found")
+    if current_user.id not in (row.user_id, row.owner_id) and current_user.role != "superadmin":
+        raise HTTPException(status_code=403, detail="Not authorized to view this order")
 
-    return orders
+    validators = etag_utils.Validators(etag_utils.make_etag(f"order:{row.id}:{row.version}"))
+    if etag_utils.is_not_modified(request, validators.etag):
+        return validators.not_modified_response()
+    return validators.apply(FastJSONResponse({"id": row.id, "status": row.status, "version": row.version}))
 
 @router.patch("/orders/{order_id}", response_model=schemas.OrderOut)
 def patch_order(
     order_id: int,
-    data: dict = Body(...),
+    data: schemas.OrderPatch,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """✅ store_owner can update order fields (like status) and notify the user."""
+    """
+    ✅ store_owner can update status / contact_number and notify the user.
+    Status moves follow order_state_utils.ORDER_TRANSITIONS; pass the `version`
+    you last saw to get a 409 instead of overwriting a concurrent change.
+    """
     order = db.query(models.Order).options(selectinload(models.Order.user)).filter(models.Order.id == order_id).first()
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
@@ -693,19 +1068,30 @@ def patch_order(
     if store.owner_id != current_user.id and current_user.role != "store_owner":
         raise HTTPException(status_code=403, detail="Not authorized to update this order")
 
-    for key, value in data.items():
-        if hasattr(order, key):
-            setattr(order, key, value)
+    values = data.dict(exclude_unset=True)
+    expected_version = values.pop("version", None)
+    old_status = order.status
+    if "status" in values:
+        order_state_utils.check_transition(old_status, values["status"])
+        values["status"] = order_state_utils.normalize_status(values["status"])
+    if not values:
+        return order
+    order_state_utils.compare_and_set(db, order, values, expected_version)
+    counter_utils.count_status_change(db, order, store.owner_id, old_status, order.status)
+    rollup_utils.record_status_change(db, order, old_status, order.status, category_id=store.category_id)
+    inventory_utils.stock_status_change(
+        db, order, rollup_utils.order_lines(db, order.id), old_status, order.status
+    )
 
     db.commit()
     db.refresh(order)
 
-    if "status" in data:
+    if "status" in values and order_state_utils.normalize_status(old_status) != order.status:
         send_notification(
             db=db,
             user_id=order.user_id,
-            title=f"Order #{order.id} {data['status'].capitalize()}",
-            message=f"Your order status has been updated to '{data['status']}'."
+            title=f"Order #{order.id} {order.status.capitalize()}",
+            message=f"Your order status has been updated to '{order.status}'."
         )
 
     return order
@@ -719,13 +1105,8 @@ def delete_order(
     """✅ Delete an order (store_owner or Store Owner only)."""
 
     # Fetch the order
-    order = (
-        db.query(models.Order)
-        .options(selectinload(models.Order.items))
-        .filter(models.Order.id == order_id)
-        .first()
-    )
-    
+    order = db.query(models.Order).filter(models.Order.id == order_id).first()
+
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
 
@@ -734,8 +1115,13 @@ def delete_order(
         raise HTTPException(status_code=404, detail="Store not found")
     if current_user.role != "store_owner" and store.owner_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized to delete this order")
-    for item in order.items:
-        db.delete(item)
+    if counter_utils.is_counted(order.status):
+        counter_utils.count_order(db, order, store.owner_id, -1)
+    rollup_utils.record_deleted(db, order, category_id=store.category_id)
+    lines = rollup_utils.order_lines(db, order.id)
+    inventory_utils.stock_deleted(db, order, [(product_id, quantity) for product_id, quantity, _ in lines])
+    # One DELETE for all items instead of one per row
+    db.query(models.OrderItem).filter(models.OrderItem.order_id == order.id).delete(synchronize_session=False)
     db.delete(order)
     db.commit()
 
@@ -762,18 +1148,26 @@ def cancel_order(
         raise HTTPException(status_code=403, detail="Not authorized to cancel this order")
 
     # Only allow cancel if order is not already completed/cancelled
-    if order.status in ["cancelled", "delivered", "completed"]:
+    if order_state_utils.normalize_status(order.status) in ["cancelled", "delivered", "completed", "rejected"]:
         raise HTTPException(status_code=400, detail=f"Cannot cancel an order with status '{order.status}'")
 
-    # Update order status
-    order.status = "cancelled"
-    db.commit()
-    db.refresh(order)
-
     # ✅ Fetch store info and notify owner safely
     store = db.query(models.Store).filter(models.Store.id == order.store_id).first()
     user_id = store.owner_id if store else None
 
+    # Update order status
+    counter_utils.count_status_change(db, order, user_id, order.status, "cancelled")
+    rollup_utils.record_status_change(
+        db, order, order.status, "cancelled", category_id=store.category_id if store else None
+    )
+    inventory_utils.stock_status_change(
+        db, order, rollup_utils.order_lines(db, order.id), order.status, "cancelled"
+    )
+    # Loses to a concurrent accept/reject with a 409 rather than overwriting it
+    order_state_utils.compare_and_set(db, order, {"status": "cancelled"})
+    db.commit()
+    db.refresh(order)
+
     if user_id:
         send_notification(
             db=db,
@@ -804,6 +1198,8 @@ def add_address(
     db.add(new_address)
     db.commit()
     db.refresh(new_address)
+    if new_address.latitude and new_address.longitude:
+        distance_utils.refill_address(new_address.id)
     return new_address
 
 
@@ -1,11 +1,17 @@
 from fastapi import APIRouter, Depends, Request
+from typing import Optional
 from sqlalchemy.orm import Session
 from fastapi.staticfiles import StaticFiles
 from app import database, models, schemas
+from app.utils import etag_utils
+from app.utils.serialization_utils import FastJSONResponse, PRODUCT_TREE, parse_fields, product_query, product_dict
 
 router = APIRouter(prefix="/home", tags=["Home"])
 products_router = APIRouter(prefix="/products", tags=["Products"])
 
+# Popular products may come from a replica up to 30 s behind
+catalog_read_db = database.get_read_db(max_lag=30)
+
 
 
 @router.get("/banners", response_model=list[schemas.BannerOut])
@@ -22,10 +28,8 @@ def get_banners(request: Request):
     ]
 
 
-from sqlalchemy import func
-
 @products_router.get("/popular", response_model=list[schemas.ProductOut])
-def get_popular_products(db: Session = Depends(database.get_db)):
+def get_popular_products(request: Request, fields: Optional[str] = None, db: Session = Depends(catalog_read_db)):
     """
     Return REAL popular products:
     - Only from OPEN stores
@@ -33,14 +37,21 @@ def get_popular_products(db: Session = Depends(database.get_db)):
     - Limited to top 10
     """
 
+    spec = parse_fields(fields, PRODUCT_TREE)
+    # sales_count and is_closed_today updates bump the row versions too
+    validators = etag_utils.check(
+        request, db, [(models.Product,), (models.Store,), (models.ProductSubCategory,)]
+    )
+    if validators.not_modified:
+        return validators.not_modified_response()
+
     products = (
-        db.query(models.Product)
-        .join(models.Store)  # join store table
+        product_query(db, spec=spec)
+        .join(models.Store, models.Store.id == models.Product.store_id)  # join store table
         .filter(models.Store.is_closed_today == False)   # only open stores
         .order_by(models.Product.sales_count.desc())  # highest sales first
         .limit(10)
-        .all()
     )
 
-    return products
+    return validators.apply(FastJSONResponse([product_dict(row, spec) for row in products]))
 
@@ -1,10 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException, Body
+from fastapi import APIRouter, Depends, HTTPException, Body, Query, Request, Response
+from sqlalchemy import func, or_
 from sqlalchemy.orm import Session, selectinload
-from typing import List
+from typing import List, Optional
 from app.database import get_db
 from app.auth import get_current_user
-from app import models, schemas
-from datetime import datetime
+from app import jobs, models, schemas
+from app.utils import counter_utils, distance_utils, inventory_utils, order_state_utils, rollup_utils
+from app.utils import etag_utils, job_utils, login_audit_utils, serialization_utils
+from app.utils.serialization_utils import FastJSONResponse, fetch_orders
+from datetime import datetime, date, timedelta
 from haversine import haversine, Unit
 
 router = APIRouter(prefix="/superadmin", tags=["SuperAdmin"])
@@ -48,9 +52,7 @@ def get_store_status(store):
 
 
 def send_notification(db: Session, user_id: int, title: str, message: str):
-    notification = models.Notification(user_id=user_id, title=title, message=message)
-    db.add(notification)
-    db.commit()
+    jobs.notify([user_id], title, message)
 
 
 # ----------------------------
@@ -132,19 +134,156 @@ def get_stores_with_delivery(
     return stores
 
 
+# ----------------------------
+# ANALYTICS
+# ----------------------------
+@router.get("/analytics")
+def get_platform_analytics(
+    start: date = None,
+    end: date = None,
+    group_by: str = "",
+    granularity: str = "total",
+    category_id: int = None,
+    store_id: int = None,
+    payment_method: str = None,
+    status: str = None,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(superadmin_only),
+):
+    """
+    GMV, delivery fee revenue and order counts from the order cube.
+    e.g. ?group_by=category,status&granularity=day&start=2025-11-01
+    """
+    dimensions = [name.strip() for name in group_by.split(",") if name.strip()]
+    unknown = [name for name in dimensions if name not in rollup_utils.CUBE_DIMENSIONS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown group_by: {', '.join(unknown)}")
+    if granularity not in ("day", "month", "total"):
+        raise HTTPException(status_code=400, detail="granularity must be day, month or total")
+
+    end = end or rollup_utils.local_today()
+    start = start or end - timedelta(days=29)
+    if start > end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+
+    filters = {
+        name: value
+        for name, value in {
+            "category": category_id,
+            "store": store_id,
+            "payment_method": payment_method.lower() if payment_method else None,
+            "status": status.lower() if status else None,
+        }.items()
+        if value is not None
+    }
+    rows = rollup_utils.cube_query(db, start, end, dimensions, granularity, filters)
+
+    return {
+        "start": start,
+        "end": end,
+        "group_by": dimensions,
+        "granularity": granularity,
+        "totals": {
+            "orders": sum(r["orders"] for r in rows),
+            "gmv": round(sum(r["gmv"] for r in rows), 2),
+            "delivery_fees": round(sum(r["delivery_fees"] for r in rows), 2),
+            "store_earnings": round(sum(r["store_earnings"] for r in rows), 2),
+        },
+        "rows": rows,
+    }
+
+
 # ----------------------------
 # USERS
 # ----------------------------
-@router.get("/users-with-stores")
-def get_users_with_stores(db: Session = Depends(get_db)):
-    users = db.query(models.User).options(selectinload(models.User.stores)).all()
-    return users
+USER_DIRECTORY_COLUMNS = (
+    models.User.id,
+    models.User.name,
+    models.User.email,
+    models.User.phone,
+    models.User.role,
+    models.User.is_active,
+    models.User.is_verified,
+)
+
+
+def store_counts(db: Session, user_ids) -> dict:
+    """{owner_id: number of stores} for the given users, in one GROUP BY."""
+    if not user_ids:
+        return {}
+    return dict(
+        db.query(models.Store.owner_id, func.count(models.Store.id))
+        .filter(models.Store.owner_id.in_(user_ids))
+        .group_by(models.Store.owner_id)
+        .all()
+    )
+
+
+@router.get("/users", response_model=schemas.UserDirectoryPage)
+def list_users(
+    q: str = None,
+    role: str = None,
+    page: int = Query(1, ge=1),
+    page_size: int = Query(50, ge=1, le=200),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(superadmin_only),
+):
+    """Paginated user directory; `q` is a prefix match on name, email or phone (indexed)."""
+    query = db.query(*USER_DIRECTORY_COLUMNS)
+    if q:
+        prefix = q.strip().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        query = query.filter(or_(
+            models.User.name.like(prefix, escape="\\"),
+            models.User.email.like(prefix, escape="\\"),
+            models.User.phone.like(prefix, escape="\\"),
+        ))
+    if role:
+        query = query.filter(models.User.role == role)
+
+    total = query.order_by(None).count()
+    rows = query.order_by(models.User.id).offset((page - 1) * page_size).limit(page_size).all()
+    counts = store_counts(db, [row.id for row in rows])
+
+    return {
+        "items": [{**row._asdict(), "store_count": counts.get(row.id, 0)} for row in rows],
+        "total": total,
+        "page": page,
+        "page_size": page_size,
+    }
+
+
+@router.get("/users/{user_id}/logins", response_model=List[schemas.LoginHistoryOut])
+def get_user_logins(
+    user_id: int,
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(superadmin_only),
+):
+    """A user's recent sign-ins (IP, user agent, method), newest first."""
+    if not db.query(models.User.id).filter(models.User.id == user_id).first():
+        raise HTTPException(status_code=404, detail="User not found")
+    return login_audit_utils.recent_logins(db, user_id, limit)
+
+
+@router.get("/users-with-stores", response_model=List[schemas.UserDirectoryEntry], deprecated=True)
+def get_users_with_stores(
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(superadmin_only),
+):
+    """Unpaginated listing kept for older clients; use /superadmin/users."""
+    rows = db.query(*USER_DIRECTORY_COLUMNS).order_by(models.User.id).all()
+    counts = store_counts(db, [row.id for row in rows])
+    return [{**row._asdict(), "store_count": counts.get(row.id, 0)} for row in rows]
 
 # ----------------------------
 # CATEGORIES
 # ----------------------------
 @router.get("/categories", response_model=List[schemas.CategoryOut])
-def get_all_categories(db: Session = Depends(get_db), current_user: models.User = Depends(superadmin_only)):
+def get_all_categories(request: Request, response: Response, db: Session = Depends(get_db), current_user: models.User = Depends(superadmin_only)):
+    validators = etag_utils.check(request, db, [(models.Category,), (models.Store,)])
+    if validators.not_modified:
+        return validators.not_modified_response()
+    validators.apply(response)
     return db.query(models.Category).all()
 
 
@@ -185,11 +324,16 @@ def delete_category(category_id: int, db: Session = Depends(get_db), current_use
 
 # STORES
 @router.get("/stores", response_model=List[schemas.StoreOut])
-def get_all_stores(db: Session = Depends(get_db), current_user: models.User = Depends(superadmin_only)):
-    stores = db.query(models.Store).all()
-    for store in stores:
-        store.is_open, store.status_text = get_store_status(store)
-    return stores
+def get_all_stores(request: Request, fields: Optional[str] = None, db: Session = Depends(get_db), current_user: models.User = Depends(superadmin_only)):
+    spec = serialization_utils.parse_fields(fields, serialization_utils.STORE_TREE)
+    validators = etag_utils.check(request, db, [(models.Store,)], etag_utils.store_status_variant())
+    if validators.not_modified:
+        return validators.not_modified_response()
+
+    stores = serialization_utils.store_query(db, spec)
+    return validators.apply(
+        FastJSONResponse([serialization_utils.store_dict(row, spec, get_store_status) for row in stores])
+    )
 
 
 @router.post("/stores", response_model=schemas.StoreOut)
@@ -210,6 +354,8 @@ def create_store(store: schemas.StoreCreate, db: Session = Depends(get_db), curr
     db.add(new_store)
     db.commit()
     db.refresh(new_store)
+    if new_store.latitude and new_store.longitude:
+        distance_utils.refill_store(new_store.id)
     return new_store
 
 
@@ -218,11 +364,17 @@ def update_store(store_id: int, store: schemas.StoreUpdate, db: Session = Depend
     db_store = db.query(models.Store).filter(models.Store.id == store_id).first()
     if not db_store:
         raise HTTPException(status_code=404, detail="Store not found")
+    old_coords = (db_store.latitude, db_store.longitude)
     for field in ["name", "image", "contact_number", "open_time", "close_time", "latitude", "longitude", "is_open"]:
         if getattr(store, field, None) is not None:
             setattr(db_store, field, getattr(store, field))
+    moved = (db_store.latitude, db_store.longitude) != old_coords
+    if moved:
+        distance_utils.invalidate_store(db, db_store.id)
     db.commit()
     db.refresh(db_store)
+    if moved:
+        distance_utils.refill_store(db_store.id)
     return db_store
 
 
@@ -238,44 +390,58 @@ def delete_store(store_id: int, db: Session = Depends(get_db), current_user: mod
 
 # ORDERS
 @router.get("/orders", response_model=List[schemas.OrderOut])
-def get_orders(db: Session = Depends(get_db), current_user: models.User = Depends(superadmin_only)):
-    orders = db.query(models.Order).options(
-        selectinload(models.Order.items).selectinload(models.OrderItem.product),
-        selectinload(models.Order.user),
-        selectinload(models.Order.address),
-    ).all()
-
-    for order in orders:
-        if order.items:
-            first_product = order.items[0].product.name
-            order.order_title = f"{first_product} +{len(order.items) - 1} more" if len(order.items) > 1 else first_product
-        else:
-            order.order_title = "Order"
-        if order.user:
-            order.user.phone = order.contact_number or order.user.phone
-
-    return orders
+def get_orders(
+    request: Request,
+    fields: Optional[str] = None,
+    include: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+    offset: int = Query(0, ge=0),
+    include_archive: bool = False,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(superadmin_only),
+):
+    """One page of orders, newest first. Archived orders only with include_archive=true."""
+    spec = serialization_utils.parse_fields(fields, serialization_utils.ORDER_TREE, include)
+    validators = etag_utils.check(request, db, serialization_utils.order_etag_sources())
+    if validators.not_modified:
+        return validators.not_modified_response()
+    orders = fetch_orders(db, spec=spec, limit=limit, offset=offset, include_archive=include_archive)
+    return validators.apply(FastJSONResponse(orders))
 
 
 @router.patch("/orders/{order_id}", response_model=schemas.OrderOut)
-def patch_order(order_id: int, data: dict = Body(...), db: Session = Depends(get_db), current_user: models.User = Depends(superadmin_only)):
+def patch_order(order_id: int, data: schemas.OrderPatch, db: Session = Depends(get_db), current_user: models.User = Depends(superadmin_only)):
     order = db.query(models.Order).options(selectinload(models.Order.user)).filter(models.Order.id == order_id).first()
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
 
-    for key, value in data.items():
-        if hasattr(order, key):
-            setattr(order, key, value)
+    values = data.dict(exclude_unset=True)
+    expected_version = values.pop("version", None)
+    old_status = order.status
+    if "status" in values:
+        order_state_utils.check_transition(old_status, values["status"])
+        values["status"] = order_state_utils.normalize_status(values["status"])
+    if not values:
+        return order
+    order_state_utils.compare_and_set(db, order, values, expected_version)
+    store = db.query(models.Store).filter(models.Store.id == order.store_id).first()
+    counter_utils.count_status_change(db, order, store.owner_id if store else None, old_status, order.status)
+    rollup_utils.record_status_change(
+        db, order, old_status, order.status, category_id=store.category_id if store else None
+    )
+    inventory_utils.stock_status_change(
+        db, order, rollup_utils.order_lines(db, order.id), old_status, order.status
+    )
 
     db.commit()
     db.refresh(order)
 
-    if "status" in data:
+    if "status" in values and order_state_utils.normalize_status(old_status) != order.status:
         send_notification(
             db,
             order.user_id,
-            f"Order #{order.id} {data['status'].capitalize()}",
-            f"Your order status updated to '{data['status']}'.",
+            f"Order #{order.id} {order.status.capitalize()}",
+            f"Your order status updated to '{order.status}'.",
         )
 
     return order
@@ -283,11 +449,38 @@ def patch_order(order_id: int, data: dict = Body(...), db: Session = Depends(get
 
 @router.delete("/orders/{order_id}")
 def delete_order(order_id: int, db: Session = Depends(get_db), current_user: models.User = Depends(superadmin_only)):
-    order = db.query(models.Order).options(selectinload(models.Order.items)).filter(models.Order.id == order_id).first()
+    order = db.query(models.Order).filter(models.Order.id == order_id).first()
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
-    for item in order.items:
-        db.delete(item)
+    store = db.query(models.Store).filter(models.Store.id == order.store_id).first()
+    if counter_utils.is_counted(order.status):
+        counter_utils.count_order(db, order, store.owner_id if store else None, -1)
+    rollup_utils.record_deleted(db, order, category_id=store.category_id if store else None)
+    lines = rollup_utils.order_lines(db, order.id)
+    inventory_utils.stock_deleted(db, order, [(product_id, quantity) for product_id, quantity, _ in lines])
+    db.query(models.OrderItem).filter(models.OrderItem.order_id == order.id).delete(synchronize_session=False)
     db.delete(order)
     db.commit()
     return {"message": "Order deleted successfully", "order_id": order_id}
+
+
+# ----------------------------
+# BACKGROUND JOBS
+# ----------------------------
+@router.get("/jobs")
+def get_job_stats(current_user: models.User = Depends(superadmin_only)):
+    """Queue depth per job and status (queued / dead / done)."""
+    return job_utils.job_queue.stats()
+
+
+@router.post("/jobs/{name}", status_code=202)
+def run_job(name: str, payload: dict = Body(default={}), current_user: models.User = Depends(superadmin_only)):
+    """Queue a maintenance job (rollups.backfill, counters.reconcile, ...) instead of running it in the request."""
+    if name not in jobs.MAINTENANCE_JOBS:
+        raise HTTPException(status_code=404, detail=f"Unknown job '{name}'")
+    return {"job_id": job_utils.enqueue(name, payload), "name": name}
+
+
+@router.post("/jobs/dead/requeue")
+def requeue_dead_jobs(name: Optional[str] = None, current_user: models.User = Depends(superadmin_only)):
+    return {"requeued": job_utils.job_queue.requeue_dead(name)}
@@ -1,6 +1,6 @@
 from pydantic import BaseModel, EmailStr
 from typing import List, Optional
-from datetime import datetime, time
+from datetime import datetime, time, date
 from pydantic import BaseModel, EmailStr, Field, validator
 import re
 
@@ -46,6 +46,31 @@ class UserOut(BaseModel):
     class Config:
         orm_mode = True
 
+class UserDirectoryEntry(BaseModel):
+    id: int
+    name: str
+    email: str
+    phone: Optional[str] = None
+    role: str
+    is_active: Optional[bool] = None
+    is_verified: Optional[bool] = None
+    store_count: int = 0
+
+
+class UserDirectoryPage(BaseModel):
+    items: List[UserDirectoryEntry]
+    total: int
+    page: int
+    page_size: int
+
+
+class LoginHistoryOut(BaseModel):
+    login_time: datetime
+    ip_address: Optional[str] = None
+    user_agent: Optional[str] = None
+    method: Optional[str] = None
+
+
 class RegisterUser(BaseModel):
     name: str = Field(..., min_length=2, max_length=50)
     email: EmailStr
@@ -156,6 +181,7 @@ class ProductBase(BaseModel):
     image: Optional[str] = None
     store_id: int
     subcategory_id: Optional[int] = None
+    stock: Optional[int] = Field(None, ge=0)
 
 
 class ProductCreate(ProductBase):
@@ -167,6 +193,16 @@ class ProductUpdate(BaseModel):
     price: Optional[float] = None
     image: Optional[str] = None
     subcategory_id: Optional[int] = None
+    stock: Optional[int] = Field(None, ge=0)
+
+
+class ProductBulkPatch(BaseModel):
+    """One entry of PATCH /catalog/products; omitted fields are left as they are."""
+    id: int
+    price: Optional[float] = Field(None, ge=0)
+    available: Optional[bool] = None
+    subcategory_id: Optional[int] = None
+    stock: Optional[int] = Field(None, ge=0)
 
 
 class ProductOut(BaseModel):
@@ -178,6 +214,7 @@ class ProductOut(BaseModel):
     store_id: int
     subcategory_id: Optional[int] = None
     subcategory: Optional[ProductSubCategoryOut] = None
+    stock: Optional[int] = None
 
     class Config:
         orm_mode = True
@@ -273,6 +310,21 @@ class OrderCreate(BaseModel):
     contact_number: Optional[str] = None
 
 
+class OrderPatch(BaseModel):
+    status: Optional[str] = None
+    contact_number: Optional[str] = None
+    version: Optional[int] = None  # version the client last saw; 409 if the order moved on
+
+    class Config:
+        extra = "forbid"
+
+
+class OrderState(BaseModel):
+    id: int
+    status: str
+    version: int
+
+
 class OrderOut(BaseModel):
     id: int
     total_price: float               
@@ -288,6 +340,7 @@ class OrderOut(BaseModel):
     payment_method: str
     order_title: Optional[str] = None
     delivery_fee: Optional[float] = None
+    version: Optional[int] = None
 
     class Config:
         orm_mode = True
@@ -295,6 +348,77 @@ class OrderOut(BaseModel):
         orm_mode = True
 
 
+# -----------------------
+# Analytics Schemas
+# -----------------------
+
+class SalesTotals(BaseModel):
+    orders: int
+    revenue: float
+    delivery_fees: float
+    cancelled: int
+
+
+class DailySales(SalesTotals):
+    day: date
+
+
+class HourlyOrders(BaseModel):
+    hour: int
+    orders: int
+
+
+class TopProduct(BaseModel):
+    product_id: int
+    name: str
+    quantity: int
+    revenue: float
+
+
+class SalesAnalyticsOut(BaseModel):
+    store_id: int
+    start: date
+    end: date
+    totals: SalesTotals
+    daily: List[DailySales]
+    hourly: List[HourlyOrders]
+    top_products: List[TopProduct]
+
+
+# -----------------------
+# Catalog Sync Schemas
+# -----------------------
+
+class CategoryChanges(BaseModel):
+    upserts: List[CategoryOut] = []
+    deletes: List[int] = []
+
+
+class StoreChanges(BaseModel):
+    upserts: List[StoreOut] = []
+    deletes: List[int] = []
+
+
+class SubcategoryChanges(BaseModel):
+    upserts: List[ProductSubCategoryOut] = []
+    deletes: List[int] = []
+
+
+class ProductChanges(BaseModel):
+    upserts: List[ProductOut] = []
+    deletes: List[int] = []
+
+
+class CatalogSyncOut(BaseModel):
+    cursor: int
+    has_more: bool
+    reset: bool  # True: drop the local cache, this is a full snapshot
+    categories: CategoryChanges
+    stores: StoreChanges
+    subcategories: SubcategoryChanges
+    products: ProductChanges
+
+
 # -----------------------
 # Delivery Settings
 # -----------------------
@@ -310,6 +434,17 @@ class AppDeliverySettings(BaseModel):
 
     class Config:
         orm_mode = True
+class DeliveryQuote(BaseModel):
+    store_id: int
+    address_id: int
+    distance_km: Optional[float] = None
+    subtotal: float
+    delivery_fee: float
+    total: float
+    free_delivery_above: Optional[float] = None
+    amount_to_free_delivery: Optional[float] = None
+
+
 class DeliverySettingsUpdate(BaseModel):
     base_fee: Optional[float] = None
     per_km_fee: Optional[float] = None
@@ -0,0 +1,83 @@
+import os
+from datetime import datetime, timedelta
+
+from dotenv import load_dotenv
+from sqlalchemy import func, literal, select
+from sqlalchemy.orm import Session
+
+from app import models
+from app.utils.order_state_utils import ORDER_TRANSITIONS
+from app.utils.rollup_utils import india
+
+# Load .env file
+load_dotenv()
+
+# Finished orders older than this move from orders/order_items to the archive
+# tables, ARCHIVE_BATCH_SIZE orders per transaction. History reads merge both
+# (serialization_utils.fetch_orders(include_archive=True)).
+ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", 90))
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", 500))
+
+# Only statuses with no way out of them: an archived order's status never
+# changes again ("completed" can still move to "delivered", so it stays)
+ARCHIVABLE_STATUSES = tuple(sorted(status for status, moves in ORDER_TRANSITIONS.items() if not moves))
+
+orders = models.Order.__table__
+order_items = models.OrderItem.__table__
+orders_archive = models.ArchivedOrder.__table__
+order_items_archive = models.ArchivedOrderItem.__table__
+
+
+def _copy(source, target, where, **extra):
+    """INSERT INTO target (...) SELECT ... FROM source WHERE ..., column by column."""
+    names = [c.name for c in source.columns if c.name in target.c]
+    columns = [source.c[name] for name in names] + [literal(v).label(k) for k, v in extra.items()]
+    return target.insert().from_select(names + list(extra), select(*columns).where(where))
+
+
+def archive_batch(db: Session, cutoff: datetime, batch_size: int = ARCHIVE_BATCH_SIZE) -> int:
+    """Move up to `batch_size` finished orders created before `cutoff`, in one transaction."""
+    ids = [order_id for (order_id,) in (
+        db.query(orders.c.id)
+        .filter(func.lower(orders.c.status).in_(ARCHIVABLE_STATUSES), orders.c.created_at < cutoff)
+        .order_by(orders.c.id)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )]
+    if not ids:
+        db.rollback()
+        return 0
+
+    now = datetime.utcnow()
+    db.execute(_copy(orders, orders_archive, orders.c.id.in_(ids), archived_at=now))
+    db.execute(_copy(order_items, order_items_archive, order_items.c.order_id.in_(ids)))
+    db.execute(order_items.delete().where(order_items.c.order_id.in_(ids)))
+    db.execute(orders.delete().where(orders.c.id.in_(ids)))
+    db.commit()
+    return len(ids)
+
+
+def archive_orders(db: Session, days: int = ARCHIVE_AFTER_DAYS, batch_size: int = ARCHIVE_BATCH_SIZE) -> int:
+    """Archive every finished order older than `days`. Returns the number moved."""
+    # created_at is stored as naive IST
+    cutoff = datetime.now(india).replace(tzinfo=None) - timedelta(days=days)
+    moved = 0
+    while True:
+        count = archive_batch(db, cutoff, batch_size)
+        moved += count
+        if count < batch_size:
+            return moved
+
+
+if __name__ == "__main__":
+    import sys
+
+    from app.database import SessionLocal
+
+    # python -m app.utils.archive_utils [DAYS]
+    db = SessionLocal()
+    try:
+        count = archive_orders(db, *[int(arg) for arg in sys.argv[1:2]])
+        print(f"✅ Archived {count} orders.")
+    finally:
+        db.close()
@@ -0,0 +1,224 @@
+import os
+from datetime import datetime, timedelta
+
+from dotenv import load_dotenv
+from sqlalchemy import event, func
+from sqlalchemy.orm import Session
+
+from app import models
+from app.utils.serialization_utils import chunks, product_query, product_dict, store_query, store_dict
+
+# Load .env file
+load_dotenv()
+
+SYNC_PAGE_SIZE = int(os.getenv("SYNC_PAGE_SIZE", 1000))
+# Log rows are written as the last statement before COMMIT (see below), so a
+# lower id committing after a higher one only happens within that last
+# instant. Changes younger than this are held back to cover it.
+SYNC_SETTLE_SECONDS = float(os.getenv("SYNC_SETTLE_SECONDS", 2))
+CATALOG_CHANGES_RETENTION_DAYS = int(os.getenv("CATALOG_CHANGES_RETENTION_DAYS", 30))
+
+TRACKED = {
+    models.Category: "category",
+    models.Store: "store",
+    models.ProductSubCategory: "subcategory",
+    models.Product: "product",
+}
+_changes = models.CatalogChange.__table__
+
+
+# ----------------------
+# Writing the log
+# ----------------------
+_PENDING = "catalog_changes"
+_SAVEPOINTS = "catalog_changes_savepoints"
+
+
+def _queue(session, rows):
+    if rows:
+        session.info.setdefault(_PENDING, []).extend(rows)
+
+
+@event.listens_for(Session, "after_flush")
+def _log_catalog_changes(session, flush_context):
+    """Every ORM insert/update/delete of a catalog row is queued for catalog_changes."""
+    rows = []
+    for obj in session.new:
+        if type(obj) in TRACKED:
+            rows.append({"entity": TRACKED[type(obj)], "entity_id": obj.id, "op": "upsert"})
+    for obj in session.dirty:
+        if type(obj) in TRACKED and session.is_modified(obj, include_collections=False):
+            rows.append({"entity": TRACKED[type(obj)], "entity_id": obj.id, "op": "upsert"})
+    for obj in session.deleted:
+        if type(obj) in TRACKED:
+            rows.append({"entity": TRACKED[type(obj)], "entity_id": obj.id, "op": "delete"})
+    _queue(session, rows)
+
+
+@event.listens_for(Session, "before_commit")
+def _write_catalog_changes(session):
+    """
+    Insert the queued rows at commit time, in the committing transaction.
+    Their ids and changed_at then follow commit order however long the
+    transaction ran, so the sync cursor cannot step over it.
+    """
+    if session.in_nested_transaction():
+        return  # savepoint release; the outer COMMIT writes them
+    session.flush()
+    rows = session.info.pop(_PENDING, None)
+    if rows:
+        now = datetime.utcnow()
+        session.connection().execute(_changes.insert(), [{**row, "changed_at": now} for row in rows])
+
+
+@event.listens_for(Session, "after_transaction_create")
+def _mark_savepoint(session, transaction):
+    if transaction.nested:
+        session.info.setdefault(_SAVEPOINTS, {})[transaction] = len(session.info.get(_PENDING, ()))
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _rollback_savepoint(session, previous_transaction):
+    """A rolled back savepoint takes the changes queued inside it along."""
+    mark = session.info.get(_SAVEPOINTS, {}).pop(previous_transaction, None)
+    if mark is not None and _PENDING in session.info:
+        del session.info[_PENDING][mark:]
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _drop_catalog_changes(session, transaction):
+    if transaction.parent is None:
+        session.info.pop(_PENDING, None)
+        session.info.pop(_SAVEPOINTS, None)
+
+
+def record_changes(db: Session, model, ids, op: str = "upsert"):
+    """For bulk paths (query.update/delete, bulk mappings) that skip the flush hook."""
+    _queue(db, [{"entity": TRACKED[model], "entity_id": entity_id, "op": op} for entity_id in ids])
+
+
+def prune_changes(db: Session, days: int = CATALOG_CHANGES_RETENTION_DAYS) -> int:
+    """Drop old log rows. Clients whose cursor falls behind get a full snapshot."""
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    deleted = db.query(models.CatalogChange).filter(
+        models.CatalogChange.changed_at < cutoff
+    ).delete(synchronize_session=False)
+    db.commit()
+    return deleted
+
+
+# ----------------------
+# Reading it back
+# ----------------------
+def _categories(db: Session, ids=None) -> list:
+    table = models.Category.__table__
+    query = db.query(table.c.id, table.c.name, table.c.image)
+    if ids is None:
+        return [dict(row._mapping) for row in query]
+    return [dict(row._mapping) for chunk in chunks(ids) for row in query.filter(table.c.id.in_(chunk))]
+
+
+def _subcategories(db: Session, ids=None) -> list:
+    table = models.ProductSubCategory.__table__
+    query = db.query(table.c.id, table.c.name, table.c.store_id)
+    if ids is None:
+        return [dict(row._mapping) for row in query]
+    return [dict(row._mapping) for chunk in chunks(ids) for row in query.filter(table.c.id.in_(chunk))]
+
+
+def _stores(db: Session, ids=None, get_status=None) -> list:
+    query = store_query(db)
+    if ids is None:
+        return [store_dict(row, None, get_status) for row in query]
+    return [store_dict(row, None, get_status) for chunk in chunks(ids)
+            for row in query.filter(models.Store.id.in_(chunk))]
+
+
+def _products(db: Session, ids=None) -> list:
+    query = product_query(db)
+    if ids is None:
+        return [product_dict(row) for row in query]
+    return [product_dict(row) for chunk in chunks(ids) for row in query.filter(models.Product.id.in_(chunk))]
+
+
+def _loaders(get_status):
+    return {
+        "category": ("categories", _categories),
+        "store": ("stores", lambda db, ids=None: _stores(db, ids, get_status)),
+        "subcategory": ("subcategories", _subcategories),
+        "product": ("products", _products),
+    }
+
+
+def _first_unsettled(db: Session, cursor: int):
+    """Lowest log id after `cursor` still inside the settle window; pages stop short of it."""
+    settled = datetime.utcnow() - timedelta(seconds=SYNC_SETTLE_SECONDS)
+    return db.query(func.min(_changes.c.id)).filter(
+        _changes.c.id > cursor, _changes.c.changed_at > settled
+    ).scalar()
+
+
+def snapshot(db: Session, get_status=None) -> dict:
+    """Whole catalog as upserts, with a cursor to continue from."""
+    first_unsettled = _first_unsettled(db, 0)
+    if first_unsettled is not None:
+        cursor = first_unsettled - 1
+    else:
+        cursor = db.query(func.max(models.CatalogChange.id)).scalar() or 0
+    payload = {"cursor": cursor, "has_more": False, "reset": True}
+    for key, load in _loaders(get_status).values():
+        payload[key] = {"upserts": load(db), "deletes": []}
+    return payload
+
+
+def changes_since(db: Session, cursor: int = 0, limit: int = SYNC_PAGE_SIZE, get_status=None) -> dict:
+    """
+    Net catalog changes after `cursor`, at most `limit` log rows per page.
+    Repeated edits of one row collapse to its current state; a row that no
+    longer exists is sent as a tombstone.
+    """
+    oldest = db.query(func.min(models.CatalogChange.id)).scalar()
+    if not cursor or (oldest is not None and cursor < oldest - 1):
+        return snapshot(db, get_status)
+
+    # Everything below the first unsettled id is settled; a settled row above
+    # it waits, or the cursor would step over the lower one
+    query = db.query(_changes.c.id, _changes.c.entity, _changes.c.entity_id, _changes.c.op).filter(
+        _changes.c.id > cursor
+    )
+    first_unsettled = _first_unsettled(db, cursor)
+    if first_unsettled is not None:
+        query = query.filter(_changes.c.id < first_unsettled)
+    rows = (
+        query
+        .order_by(_changes.c.id)
+        .limit(limit + 1)
+        .all()
+    )
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    latest = {}
+    for row in rows:
+        latest[(row.entity, row.entity_id)] = row.op
+
+    payload = {"cursor": rows[-1].id if rows else cursor, "has_more": has_more, "reset": False}
+    for entity, (key, load) in _loaders(get_status).items():
+        upsert_ids = [entity_id for (name, entity_id), op in latest.items() if name == entity and op == "upsert"]
+        deletes = [entity_id for (name, entity_id), op in latest.items() if name == entity and op == "delete"]
+        upserts = load(db, upsert_ids) if upsert_ids else []
+        # Upserted, then deleted in a later page: send a tombstone now
+        found = {item["id"] for item in upserts}
+        deletes += [entity_id for entity_id in upsert_ids if entity_id not in found]
+        payload[key] = {"upserts": upserts, "deletes": deletes}
+    return payload
+
+
+if __name__ == "__main__":
+    from app.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        print(f"✅ Pruned {prune_changes(db)} catalog change rows.")
+    finally:
+        db.close()
@@ -0,0 +1,257 @@
+import gzip
+import hashlib
+import os
+import threading
+import zlib
+from collections import OrderedDict
+
+from dotenv import load_dotenv
+
+try:
+    import brotli
+except ImportError:  # optional, gzip only without it
+    brotli = None
+
+# Load .env file
+load_dotenv()
+
+COMPRESSION_ENABLED = os.getenv("COMPRESSION_ENABLED", "true").lower() == "true"
+# Below this many bytes the headers cost more than the savings
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", 1024))
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", 6))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", 5))
+# Comma-separated path prefixes that are never compressed
+COMPRESSION_EXCLUDE_PATHS = os.getenv("COMPRESSION_EXCLUDE_PATHS", "/uploads,/statics,/favicon.ico")
+COMPRESSION_CACHE_ENTRIES = int(os.getenv("COMPRESSION_CACHE_ENTRIES", 256))
+COMPRESSION_CACHE_MAX_BYTES = int(os.getenv("COMPRESSION_CACHE_MAX_BYTES", 1024 * 1024))
+
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript", "application/x-ndjson", "image/svg+xml")
+
+
+# ----------------------
+# Encoders
+# ----------------------
+def supported_encodings() -> tuple:
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def choose_encoding(accept_encoding: str, available=None):
+    """Pick the best encoding the client accepts (honours q=0), or None."""
+    available = available or supported_encodings()
+    accepted = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name] = q
+
+    best, best_q = None, 0.0
+    for encoding in available:
+        q = accepted.get(encoding, accepted.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=COMPRESSION_BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=COMPRESSION_GZIP_LEVEL, mtime=0)
+
+
+class StreamCompressor:
+    """Incremental encoder for streamed responses (exports, long lists)."""
+
+    def __init__(self, encoding: str):
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=COMPRESSION_BROTLI_QUALITY)
+            self._flush = self._compressor.flush
+            self._finish = self._compressor.finish
+            self._compress = self._compressor.process
+        else:
+            self._compressor = zlib.compressobj(COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+            self._flush = lambda: self._compressor.flush(zlib.Z_SYNC_FLUSH)
+            self._finish = self._compressor.flush
+            self._compress = self._compressor.compress
+
+    def write(self, chunk: bytes) -> bytes:
+        # Sync-flush each chunk so the client can start parsing right away
+        return self._compress(chunk) + self._flush()
+
+    def finish(self) -> bytes:
+        return self._finish()
+
+
+# ----------------------
+# Compressed-bytes cache
+# ----------------------
+class CompressedCache:
+    """Small LRU of compressed bodies, keyed by encoding and a digest of the raw body."""
+
+    def __init__(self, max_entries: int = COMPRESSION_CACHE_ENTRIES, max_bytes: int = COMPRESSION_CACHE_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(encoding: str, body: bytes):
+        return encoding, hashlib.blake2b(body, digest_size=16).digest()
+
+    def get_or_compress(self, body: bytes, encoding: str) -> bytes:
+        if self.max_entries <= 0 or len(body) > self.max_bytes:
+            return compress(body, encoding)
+        key = self.key(encoding, body)
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return cached
+        compressed = compress(body, encoding)
+        with self._lock:
+            self.misses += 1
+            self._entries[key] = compressed
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return compressed
+
+
+def is_cacheable(headers: dict) -> bool:
+    """Responses that declare themselves reusable (ETag or public max-age)."""
+    cache_control = headers.get("cache-control", "").lower()
+    if "no-store" in cache_control or "private" in cache_control:
+        return False
+    return "etag" in headers or "max-age" in cache_control or "public" in cache_control
+
+
+# ----------------------
+# Middleware
+# ----------------------
+class CompressionMiddleware:
+    """
+    Pure ASGI gzip/brotli middleware. Negotiates from Accept-Encoding, leaves
+    small, already-encoded, non-text and excluded-path responses untouched,
+    streams chunked bodies through an incremental encoder, and reuses the
+    compressed bytes of cacheable responses.
+    """
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_SIZE, exclude_paths=None,
+                 cache: CompressedCache = None, enabled: bool = COMPRESSION_ENABLED):
+        self.app = app
+        self.minimum_size = minimum_size
+        if exclude_paths is None:
+            exclude_paths = [p.strip() for p in COMPRESSION_EXCLUDE_PATHS.split(",") if p.strip()]
+        self.exclude_paths = tuple(exclude_paths)
+        self.cache = cache if cache is not None else CompressedCache()
+        self.enabled = enabled
+
+    async def __call__(self, scope, receive, send):
+        if not self.enabled or scope["type"] != "http" or scope["path"].startswith(self.exclude_paths):
+            await self.app(scope, receive, send)
+            return
+
+        accept_encoding = ""
+        for name, value in scope.get("headers", []):
+            if name == b"accept-encoding":
+                accept_encoding = value.decode("latin-1")
+                break
+        encoding = choose_encoding(accept_encoding)
+
+        responder = _CompressingResponder(self, send, encoding)
+        await self.app(scope, receive, responder.send)
+
+
+class _CompressingResponder:
+    def __init__(self, middleware: CompressionMiddleware, send, encoding):
+        self.middleware = middleware
+        self._send = send
+        self.encoding = encoding
+        self.start = None
+        self.headers = None
+        self.passthrough = False
+        self.stream = None
+
+    async def send(self, message):
+        if self.passthrough:
+            await self._send(message)
+            return
+
+        if message["type"] == "http.response.start":
+            self.start = message
+            self.headers = {k.decode("latin-1").lower(): v.decode("latin-1") for k, v in message.get("headers", [])}
+            content_type = self.headers.get("content-type", "")
+            compressible = content_type.startswith(COMPRESSIBLE_TYPES)
+            if compressible:
+                self._add_vary()
+            if (not compressible or self.encoding is None or "content-encoding" in self.headers
+                    or message["status"] < 200 or message["status"] in (204, 304)):
+                self.passthrough = True
+                await self._send(self.start)
+            return
+
+        if message["type"] != "http.response.body":
+            await self._send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.stream is None and not more_body:
+            # Whole body in one message: the common case for JSON endpoints
+            if len(body) < self.middleware.minimum_size:
+                await self._send(self.start)
+                await self._send(message)
+                return
+            if is_cacheable(self.headers):
+                compressed = self.middleware.cache.get_or_compress(body, self.encoding)
+            else:
+                compressed = compress(body, self.encoding)
+            self._set_encoding_headers(content_length=len(compressed))
+            await self._send(self.start)
+            await self._send({"type": "http.response.body", "body": compressed})
+            return
+
+        if self.stream is None:
+            self.stream = StreamCompressor(self.encoding)
+            self._set_encoding_headers(content_length=None)
+            await self._send(self.start)
+        data = self.stream.write(body) if body else b""
+        if not more_body:
+            data += self.stream.finish()
+        await self._send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+    def _add_vary(self):
+        vary = self.headers.get("vary")
+        if vary and "accept-encoding" in vary.lower():
+            return
+        value = f"{vary}, Accept-Encoding" if vary else "Accept-Encoding"
+        self._replace_header("vary", value)
+
+    def _set_encoding_headers(self, content_length):
+        self._replace_header("content-encoding", self.encoding)
+        self._replace_header("content-length", str(content_length) if content_length is not None else None)
+        etag = self.headers.get("etag")
+        if etag and not etag.startswith("W/"):
+            # Same entity, different bytes: a strong validator no longer applies
+            self._replace_header("etag", f"W/{etag}")
+
+    def _replace_header(self, name: str, value):
+        raw = name.encode("latin-1")
+        headers = [(k, v) for k, v in self.start.get("headers", []) if k.lower() != raw]
+        if value is not None:
+            headers.append((raw, value.encode("latin-1")))
+            self.headers[name] = value
+        else:
+            self.headers.pop(name, None)
+        self.start = {**self.start, "headers": headers}
@@ -0,0 +1,189 @@
+from collections import defaultdict
+
+from sqlalchemy import func, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app import models
+from app.utils.order_state_utils import INACTIVE_ORDER_STATUSES
+
+
+def is_counted(status) -> bool:
+    return (status or "").lower() not in INACTIVE_ORDER_STATUSES
+
+
+def increment(db: Session, model, keys: dict, deltas: dict):
+    """UPDATE counter = counter + delta for the row at `keys`, creating it on first use.
+
+    Runs inside the caller's transaction; nothing is committed here.
+    """
+    deltas = {name: delta for name, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    values = {getattr(model, name): getattr(model, name) + delta for name, delta in deltas.items()}
+    criteria = [getattr(model, name) == value for name, value in keys.items()]
+
+    updated = db.query(model).filter(*criteria).update(values, synchronize_session=False)
+    if updated:
+        return
+    try:
+        with db.begin_nested():
+            db.add(model(**keys, **{name: max(delta, 0) for name, delta in deltas.items()}))
+    except IntegrityError:
+        # Created concurrently by another request
+        db.query(model).filter(*criteria).update(values, synchronize_session=False)
+
+
+def bump_store(db: Session, store_id: int, products: int = 0, orders: int = 0):
+    increment(db, models.StoreCounter, {"store_id": store_id},
+              {"product_count": products, "order_count": orders})
+
+
+def bump_user(db: Session, user_id: int, orders: int = 0, owned_products: int = 0, owned_orders: int = 0):
+    increment(db, models.UserCounter, {"user_id": user_id},
+              {"order_count": orders, "owned_product_count": owned_products, "owned_order_count": owned_orders})
+
+
+def count_product(db: Session, store, delta: int):
+    """Product created (+1) or deleted (-1) in `store`."""
+    bump_store(db, store.id, products=delta)
+    bump_user(db, store.owner_id, owned_products=delta)
+
+
+def count_order(db: Session, order, owner_id, delta: int):
+    """Order started (+1) or stopped (-1) counting, e.g. created or cancelled."""
+    if order.store_id:
+        bump_store(db, order.store_id, orders=delta)
+    bump_user(db, order.user_id, orders=delta)
+    if owner_id:
+        bump_user(db, owner_id, owned_orders=delta)
+
+
+def count_status_change(db: Session, order, owner_id, old_status, new_status):
+    was, now = is_counted(old_status), is_counted(new_status)
+    if was != now:
+        count_order(db, order, owner_id, 1 if now else -1)
+
+
+# ----------------------
+# Reconciliation
+# ----------------------
+def _active(model):
+    return func.coalesce(func.lower(model.status), "").notin_(INACTIVE_ORDER_STATUSES)
+
+
+def _order_count(db: Session, criteria) -> int:
+    """Counted orders, hot and archived, matching `criteria(model)`."""
+    return sum(
+        db.query(func.count(model.id)).filter(_active(model), *criteria(model)).scalar()
+        for model in (models.Order, models.ArchivedOrder)
+    )
+
+
+def store_values(db: Session, store_id: int) -> dict:
+    return {
+        "product_count": db.query(func.count(models.Product.id)).filter(models.Product.store_id == store_id).scalar(),
+        "order_count": _order_count(db, lambda model: [model.store_id == store_id]),
+    }
+
+
+def user_values(db: Session, user_id: int) -> dict:
+    owned = select(models.Store.id).where(models.Store.owner_id == user_id)
+    return {
+        "order_count": _order_count(db, lambda model: [model.user_id == user_id]),
+        "owned_product_count": (
+            db.query(func.count(models.Product.id)).filter(models.Product.store_id.in_(owned)).scalar()
+        ),
+        "owned_order_count": _order_count(db, lambda model: [model.store_id.in_(owned)]),
+    }
+
+
+def _expected_counters(db: Session) -> tuple:
+    """Every counter recomputed with a few GROUP BY scans: ({store_id: values}, {user_id: values})."""
+    store_products = dict(
+        db.query(models.Product.store_id, func.count(models.Product.id)).group_by(models.Product.store_id)
+    )
+    # Archived orders still count
+    store_orders, user_orders = defaultdict(int), defaultdict(int)
+    for model in (models.Order, models.ArchivedOrder):
+        for store_id, count in (
+            db.query(model.store_id, func.count(model.id))
+            .filter(_active(model), model.store_id.isnot(None))
+            .group_by(model.store_id)
+        ):
+            store_orders[store_id] += count
+        for user_id, count in db.query(model.user_id, func.count(model.id)).filter(_active(model)).group_by(model.user_id):
+            user_orders[user_id] += count
+    owners = dict(db.query(models.Store.id, models.Store.owner_id))
+
+    expected_stores = {
+        store_id: {"product_count": store_products.get(store_id, 0), "order_count": store_orders.get(store_id, 0)}
+        for store_id in owners
+    }
+    expected_users = {
+        user_id: {"order_count": user_orders.get(user_id, 0), "owned_product_count": 0, "owned_order_count": 0}
+        for (user_id,) in db.query(models.User.id)
+    }
+    for store_id, owner_id in owners.items():
+        if owner_id in expected_users:
+            expected_users[owner_id]["owned_product_count"] += expected_stores[store_id]["product_count"]
+            expected_users[owner_id]["owned_order_count"] += expected_stores[store_id]["order_count"]
+    return expected_stores, expected_users
+
+
+def _differs(row, values: dict) -> bool:
+    if row is None:
+        return any(values.values())  # a missing row reads as zeros
+    return any(getattr(row, name) != value for name, value in values.items())
+
+
+def reconcile_counters(db: Session) -> int:
+    """Recompute every counter from the source tables and fix drifted rows.
+
+    Returns the number of rows changed. Safe to run while the app is live:
+    the full scan takes no locks, and each drifted row is then fixed in its
+    own short transaction (see _fix_row), so checkouts only ever wait on
+    the one row being fixed.
+    """
+    expected_stores, expected_users = _expected_counters(db)
+    drifted = []
+    for model, key_name, expected, recount in (
+        (models.StoreCounter, "store_id", expected_stores, store_values),
+        (models.UserCounter, "user_id", expected_users, user_values),
+    ):
+        current = {getattr(row, key_name): row for row in db.query(model)}
+        drifted += [(model, key_name, key, recount) for key, values in expected.items()
+                    if _differs(current.get(key), values)]
+    db.rollback()  # end the scan's transaction before locking anything
+
+    return sum(_fix_row(db, *args) for args in drifted)
+
+
+def _fix_row(db: Session, model, key_name: str, key: int, recount) -> int:
+    """
+    Lock one counter row, recount its key and store the result. Lock first,
+    count second: the counts then see every write that got its counter bump
+    in before us, and writes that bump after wait and add on top.
+    """
+    row = db.query(model).filter(getattr(model, key_name) == key).with_for_update().first()
+    values = recount(db, key)
+    changed = _differs(row, values)
+    if row is None:
+        # No row to lock yet: add the count as a delta so a concurrent first
+        # use is not overwritten (a row created mid-run is settled next run)
+        increment(db, model, {key_name: key}, values)
+    elif changed:
+        for name, value in values.items():
+            setattr(row, name, value)
+    db.commit()
+    return int(changed)
+
+
+if __name__ == "__main__":
+    from app.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        print(f"✅ Counters reconciled, {reconcile_counters(db)} rows fixed.")
+    finally:
+        db.close()
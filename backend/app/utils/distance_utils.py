@@ -0,0 +1,114 @@
+from haversine import haversine, Unit
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app import models
+from app.utils.job_utils import enqueue
+
+# Store -> address distances are cached in store_address_distances. Rows are
+# filled in the background when an address is added or a store moves, and
+# on first use otherwise; moving a store deletes its rows in the same
+# transaction. Pairs where either side has no coordinates are not cached.
+
+
+def compute_distance(store, address):
+    """Return distance in kilometers between store and user address."""
+    if not store.latitude or not store.longitude or not address.latitude or not address.longitude:
+        return None
+    return haversine((store.latitude, store.longitude), (address.latitude, address.longitude),
+                     unit=Unit.KILOMETERS)
+
+
+def _cached(db: Session, store, address):
+    return db.query(models.StoreAddressDistance.distance_km).filter(
+        models.StoreAddressDistance.store_id == store.id,
+        models.StoreAddressDistance.address_id == address.id,
+    ).first()
+
+
+def get_distance(db: Session, store, address):
+    """Cached distance for the pair, computed and stored on a miss (caller commits)."""
+    row = _cached(db, store, address)
+    if row:
+        return row.distance_km
+    distance = compute_distance(store, address)
+    if distance is not None:
+        try:
+            with db.begin_nested():
+                db.add(models.StoreAddressDistance(store_id=store.id, address_id=address.id, distance_km=distance))
+        except IntegrityError:
+            pass  # filled concurrently
+    return distance
+
+
+def lookup_distance(db: Session, store, address):
+    """Like get_distance but read-only: a miss is computed and queued for the background fill."""
+    row = _cached(db, store, address)
+    if row:
+        return row.distance_km
+    distance = compute_distance(store, address)
+    if distance is not None:
+        refill_address(address.id)
+    return distance
+
+
+# ----------------------
+# Fill / invalidate
+# ----------------------
+def fill_address(db: Session, address_id: int) -> int:
+    """(Re)compute distances from every located store to one address."""
+    address = db.query(models.Address).filter(models.Address.id == address_id).first()
+    if not address or not address.latitude or not address.longitude:
+        return 0
+    stores = db.query(models.Store.id, models.Store.latitude, models.Store.longitude).filter(
+        models.Store.latitude.isnot(None), models.Store.longitude.isnot(None)
+    )
+    rows = [
+        {"store_id": store.id, "address_id": address.id, "distance_km": distance}
+        for store in stores
+        if (distance := compute_distance(store, address)) is not None
+    ]
+    db.query(models.StoreAddressDistance).filter(
+        models.StoreAddressDistance.address_id == address_id
+    ).delete(synchronize_session=False)
+    db.bulk_insert_mappings(models.StoreAddressDistance, rows)
+    db.commit()
+    return len(rows)
+
+
+def fill_store(db: Session, store_id: int) -> int:
+    """(Re)compute distances from one store to every located address."""
+    store = db.query(models.Store).filter(models.Store.id == store_id).first()
+    if not store or not store.latitude or not store.longitude:
+        return 0
+    addresses = db.query(models.Address.id, models.Address.latitude, models.Address.longitude).filter(
+        models.Address.latitude.isnot(None), models.Address.longitude.isnot(None)
+    )
+    rows = [
+        {"store_id": store.id, "address_id": address.id, "distance_km": distance}
+        for address in addresses
+        if (distance := compute_distance(store, address)) is not None
+    ]
+    db.query(models.StoreAddressDistance).filter(
+        models.StoreAddressDistance.store_id == store_id
+    ).delete(synchronize_session=False)
+    for i in range(0, len(rows), 1000):
+        db.bulk_insert_mappings(models.StoreAddressDistance, rows[i:i + 1000])
+    db.commit()
+    return len(rows)
+
+
+def invalidate_store(db: Session, store_id: int):
+    """Drop a store's cached distances; call in the transaction that changes its coordinates."""
+    db.query(models.StoreAddressDistance).filter(
+        models.StoreAddressDistance.store_id == store_id
+    ).delete(synchronize_session=False)
+
+
+def refill_store(store_id: int):
+    """Queue a refill; call after the coordinate change is committed."""
+    enqueue("distances.fill", {"store_id": store_id})
+
+
+def refill_address(address_id: int):
+    enqueue("distances.fill", {"address_id": address_id})
@@ -1,36 +1,245 @@
 import os
+import queue
+import smtplib
+import threading
+import time
+from contextlib import contextmanager
+from email.message import EmailMessage
+from email.utils import formataddr
+
 from dotenv import load_dotenv
-from fastapi_mail import FastMail, MessageSchema, ConnectionConfig
 from pydantic import EmailStr
 
+from app.utils.outbox_utils import Outbox, backoff_delay
+
 # Load variables from .env
 load_dotenv()
 
 MAIL_USERNAME = os.getenv("MAIL_USERNAME")
 MAIL_PASSWORD = os.getenv("MAIL_PASSWORD")
 
-if not MAIL_USERNAME or not MAIL_PASSWORD:
-    print("❌ EMAIL CONFIG MISSING: Please add MAIL_USERNAME and MAIL_PASSWORD to .env")
-else:
+
+def check_email_config() -> bool:
+    """Checked when the dispatcher starts, not at import, so importing the app stays cheap."""
+    if not MAIL_USERNAME or not MAIL_PASSWORD:
+        print("❌ EMAIL CONFIG MISSING: Please add MAIL_USERNAME and MAIL_PASSWORD to .env")
+        return False
     print(f"✔ Email config loaded for {MAIL_USERNAME}")
+    return True
+
+# Email server configuration (point MAIL_SERVER/MAIL_PORT at a local
+# SMTP stand-in such as aiosmtpd, with MAIL_STARTTLS=0, for testing)
+MAIL_SERVER = os.getenv("MAIL_SERVER", "smtp.gmail.com")
+MAIL_PORT = int(os.getenv("MAIL_PORT", 587))
+MAIL_STARTTLS = os.getenv("MAIL_STARTTLS", "1") == "1"
+MAIL_SSL_TLS = os.getenv("MAIL_SSL_TLS", "0") == "1"
+MAIL_FROM = os.getenv("MAIL_FROM", MAIL_USERNAME)
+MAIL_FROM_NAME = "TownDrop Support"
+
+# Dispatcher tuning
+EMAIL_POOL_SIZE = int(os.getenv("EMAIL_POOL_SIZE", 2))
+EMAIL_BATCH_SIZE = int(os.getenv("EMAIL_BATCH_SIZE", 50))
+EMAIL_MAX_ATTEMPTS = int(os.getenv("EMAIL_MAX_ATTEMPTS", 6))
+EMAIL_CONN_MAX_IDLE = float(os.getenv("EMAIL_CONN_MAX_IDLE", 60))
+
+
+# ----------------------
+# SMTP connection pool
+# ----------------------
+class SMTPConnectionPool:
+    """
+    Keeps up to `size` logged-in SMTP sessions open so batches reuse one
+    handshake (TCP + STARTTLS + AUTH) instead of paying it per message.
+    """
+
+    def __init__(self, size: int = EMAIL_POOL_SIZE, max_idle: float = EMAIL_CONN_MAX_IDLE):
+        self.max_idle = max_idle
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+
+    def _connect(self):
+        if MAIL_SSL_TLS:
+            conn = smtplib.SMTP_SSL(MAIL_SERVER, MAIL_PORT, timeout=30)
+        else:
+            conn = smtplib.SMTP(MAIL_SERVER, MAIL_PORT, timeout=30)
+            if MAIL_STARTTLS:
+                conn.starttls()
+        if MAIL_USERNAME and MAIL_PASSWORD:
+            conn.login(MAIL_USERNAME, MAIL_PASSWORD)
+        return conn
+
+    def _is_usable(self, conn, last_used):
+        if time.monotonic() - last_used > self.max_idle:
+            return False
+        try:
+            return conn.noop()[0] == 250
+        except smtplib.SMTPException:
+            return False
+        except OSError:
+            return False
+
+    @staticmethod
+    def _close(conn):
+        try:
+            conn.quit()
+        except Exception:
+            conn.close()
+
+    @contextmanager
+    def connection(self):
+        """Borrow a session; it is dropped instead of returned if the block raises."""
+        self._slots.acquire()
+        conn = None
+        try:
+            while conn is None:
+                try:
+                    candidate, last_used = self._idle.get_nowait()
+                except queue.Empty:
+                    conn = self._connect()
+                    break
+                if self._is_usable(candidate, last_used):
+                    conn = candidate
+                else:
+                    self._close(candidate)
+
+            yield conn
+            self._idle.put((conn, time.monotonic()))
+        except Exception:
+            if conn is not None:
+                self._close(conn)
+            raise
+        finally:
+            self._slots.release()
+
+    def close(self):
+        while True:
+            try:
+                conn, _ = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            self._close(conn)
+
+
+# ----------------------
+# Dispatcher
+# ----------------------
+def build_message(payload: dict) -> EmailMessage:
+    message = EmailMessage()
+    message["Subject"] = payload["subject"]
+    message["From"] = formataddr((MAIL_FROM_NAME, MAIL_FROM or ""))
+    message["To"] = payload["to"]
+    message.set_content("Please view this email in an HTML capable client.")
+    message.add_alternative(payload["html"], subtype="html")
+    return message
+
+
+def _is_permanent(error: Exception) -> bool:
+    # 5xx replies (bad recipient, rejected content) will not succeed on retry
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return True
+    code = getattr(error, "smtp_code", None)
+    return code is not None and 500 <= code < 600 and not isinstance(error, smtplib.SMTPAuthenticationError)
+
+
+class EmailDispatcher:
+    """
+    Drains the durable email outbox in batches on background threads, one
+    pooled SMTP session per thread. Failed sends are retried with
+    exponential backoff, permanent failures are parked as 'dead'.
+    """
+
+    def __init__(self, outbox: Outbox, pool: SMTPConnectionPool, workers: int = EMAIL_POOL_SIZE,
+                 batch_size: int = EMAIL_BATCH_SIZE, poll_interval: float = 1.0):
+        self.outbox = outbox
+        self.pool = pool
+        self.workers = workers
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._threads = []
+
+    def start(self):
+        if self._threads:
+            return
+        check_email_config()
+        self._stop.clear()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"email-dispatcher-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: float = 10):
+        """Finish the batches in flight, then close pooled sessions."""
+        self._stop.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+        self.pool.close()
+
+    def wake(self):
+        self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                batch = self.outbox.claim(self.batch_size, lease_seconds=120)
+            except Exception as e:
+                print(f"⚠️ Email outbox unavailable: {e}")
+                batch = []
+            if not batch:
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+                continue
+            self.send_batch(batch)
+
+    def send_batch(self, batch):
+        sent = []
+        remaining = list(batch)
+        try:
+            with self.pool.connection() as conn:
+                while remaining:
+                    message_id, payload, attempts = remaining[0]
+                    try:
+                        conn.send_message(build_message(payload))
+                        sent.append(message_id)
+                    except Exception as e:
+                        if not _is_permanent(e):
+                            raise
+                        print(f"❌ Email {message_id} to {payload.get('to')} rejected: {e}")
+                        self.outbox.dead(message_id, str(e))
+                    remaining.pop(0)
+        except Exception as e:
+            # Connection-level failure: back off the message that failed,
+            # hand the untouched rest of the batch back for another worker
+            if remaining:
+                message_id, payload, attempts = remaining.pop(0)
+                if attempts >= EMAIL_MAX_ATTEMPTS:
+                    print(f"❌ Email {message_id} to {payload.get('to')} failed {attempts} times: {e}")
+                    self.outbox.dead(message_id, str(e))
+                else:
+                    self.outbox.retry(message_id, backoff_delay(attempts), str(e))
+                self.outbox.release([m[0] for m in remaining])
+            else:
+                print(f"⚠️ Email batch sent, connection closed with error: {e}")
+        finally:
+            self.outbox.ack(sent)
+
+
+email_outbox = Outbox("email")
+email_dispatcher = EmailDispatcher(email_outbox, SMTPConnectionPool())
+
+
+def send_email(email_to: str, subject: str, html: str) -> int:
+    """Queue an email durably; the dispatcher delivers it off the request path."""
+    message_id = email_outbox.put({"to": email_to, "subject": subject, "html": html})
+    email_dispatcher.wake()
+    return message_id
 
-# Email server configuration
-conf = ConnectionConfig(
-    MAIL_USERNAME=MAIL_USERNAME,
-    MAIL_PASSWORD=MAIL_PASSWORD,       # Gmail App Password
-    MAIL_FROM=MAIL_USERNAME,
-    MAIL_PORT=587,
-    MAIL_SERVER="smtp.gmail.com",
-    MAIL_FROM_NAME="TownDrop Support",
-    MAIL_STARTTLS=True,
-    MAIL_SSL_TLS=False,
-    USE_CREDENTIALS=True,
-)
-
-fastmail = FastMail(conf)
 
 # Function that sends OTP email
-async def send_verification_email(email_to: EmailStr, name: str, otp: str):
+def send_verification_email(email_to: EmailStr, name: str, otp: str):
     subject = "Your TownDrop Verification OTP"
 
     body = f"""
@@ -44,11 +253,4 @@ async def send_verification_email(email_to: EmailStr, name: str, otp: str):
     </div>
     """
 
-    message = MessageSchema(
-        subject=subject,
-        recipients=[email_to],
-        body=body,
-        subtype="html",
-    )
-
-    await fastmail.send_message(message)
+    return send_email(email_to, subject, body)
@@ -0,0 +1,105 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+
+from fastapi import Request
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from starlette.responses import Response
+
+# Conditional GET for collection endpoints. A collection's validator is built
+# from cheap aggregates over the tables it renders (row count, max id, latest
+# updated_at and the sum of row versions), so any insert, update or delete
+# changes it without loading the rows.
+
+
+def collection_state(db: Session, sources) -> tuple:
+    """
+    `sources` is a list of (model, criteria...) tuples. Returns a fingerprint
+    of their aggregates and the newest updated_at among them.
+    """
+    parts, last_modified = [], None
+    for model, *criteria in sources:
+        count, max_id, newest, versions = db.query(
+            func.count(model.id), func.max(model.id), func.max(model.updated_at), func.sum(model.version)
+        ).filter(*criteria).one()
+        parts.append(f"{model.__tablename__}:{count}:{max_id}:{newest}:{versions}")
+        if newest is not None and (last_modified is None or newest > last_modified):
+            last_modified = newest
+    return "|".join(parts), last_modified
+
+
+def make_etag(state: str, variant: str = "") -> str:
+    # Weak: the same entity may go out gzip/br encoded or with different key order
+    return 'W/"%s"' % hashlib.blake2b(f"{state}#{variant}".encode(), digest_size=12).hexdigest()
+
+
+def http_date(value: datetime) -> str:
+    # updated_at is stored as naive UTC
+    return format_datetime(value.replace(tzinfo=timezone.utc, microsecond=0), usegmt=True)
+
+
+def _opaque(tag: str) -> str:
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def is_not_modified(request: Request, etag: str, last_modified: datetime = None) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # If-None-Match wins over If-Modified-Since; compared weakly (RFC 9110 13.1.2)
+        if if_none_match.strip() == "*":
+            return True
+        return _opaque(etag) in {_opaque(tag) for tag in if_none_match.split(",")}
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        return last_modified.replace(tzinfo=timezone.utc, microsecond=0) <= since
+    return False
+
+
+class Validators:
+    """ETag / Last-Modified for one request, and whether the client's copy is current."""
+
+    def __init__(self, etag: str, last_modified: datetime = None, not_modified: bool = False):
+        self.etag = etag
+        self.last_modified = last_modified
+        self.not_modified = not_modified
+
+    @property
+    def headers(self) -> dict:
+        headers = {"ETag": self.etag, "Cache-Control": "no-cache"}
+        if self.last_modified is not None:
+            headers["Last-Modified"] = http_date(self.last_modified)
+        return headers
+
+    def not_modified_response(self) -> Response:
+        return Response(status_code=304, headers=self.headers)
+
+    def apply(self, response: Response) -> Response:
+        """Set the validators on the route's Response (injected or returned)."""
+        response.headers.update(self.headers)
+        return response
+
+
+def check(request: Request, db: Session, sources, variant: str = "") -> Validators:
+    """
+    Compute validators for a collection built from `sources`. The request path
+    and query string (e.g. ?fields=) are always part of the ETag; pass
+    `variant` for anything else the body depends on (the caller, the clock).
+    Last-Modified is only sent when the body depends on nothing but the rows.
+    """
+    state, last_modified = collection_state(db, sources)
+    etag = make_etag(state, f"{request.url.path}?{request.url.query}#{variant}")
+    if variant:
+        last_modified = None
+    return Validators(etag, last_modified, is_not_modified(request, etag, last_modified))
+
+
+def store_status_variant() -> str:
+    """Store lists embed is_open/status_text, which move with the clock."""
+    return datetime.now().strftime("%Y%m%d%H%M")
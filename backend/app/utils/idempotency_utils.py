@@ -0,0 +1,91 @@
+import hashlib
+import json
+import os
+import time
+
+from dotenv import load_dotenv
+from fastapi import HTTPException
+
+from app.utils.ttl_store_utils import make_ttl_store
+
+load_dotenv()
+
+# ----------------------
+# Configuration
+# ----------------------
+# How long a finished request can be replayed by its key
+IDEMPOTENCY_TTL_SECONDS = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", 86400))
+# How long an in-flight claim lives if the worker dies before finishing it
+IDEMPOTENCY_LOCK_SECONDS = int(os.getenv("IDEMPOTENCY_LOCK_SECONDS", 30))
+# How long a concurrent retry waits for the first request before giving up with a 409
+IDEMPOTENCY_WAIT_SECONDS = float(os.getenv("IDEMPOTENCY_WAIT_SECONDS", 10))
+# "memory" (per process) or "redis" (shared between workers)
+IDEMPOTENCY_STORE_BACKEND = os.getenv("IDEMPOTENCY_STORE_BACKEND", "memory")
+MAX_KEY_LENGTH = 64
+
+_store = make_ttl_store(IDEMPOTENCY_STORE_BACKEND, prefix="idem:")
+
+
+def set_store(store):
+    """Swap the idempotency backend (any object with the TTL store interface)."""
+    global _store
+    _store = store
+
+
+def validate_key(key: str) -> str:
+    key = (key or "").strip()
+    if not key or len(key) > MAX_KEY_LENGTH:
+        raise HTTPException(status_code=400, detail=f"Idempotency-Key must be 1-{MAX_KEY_LENGTH} characters")
+    return key
+
+
+def fingerprint(payload: dict) -> str:
+    """Stable hash of the request body, so a key reused for a different request is caught."""
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _check_fingerprint(entry: dict, request_fingerprint: str):
+    if entry.get("fingerprint") != request_fingerprint:
+        raise HTTPException(status_code=422, detail="Idempotency-Key was already used for a different request")
+
+
+def claim(scope: str, key: str, request_fingerprint: str):
+    """
+    Claim `key` for this request.
+
+    Returns None when the caller owns the key and must run the request, then
+    call complete() or release(). Returns the stored result when the key has
+    already been served. A retry that arrives while the first request is
+    still running waits for it (up to IDEMPOTENCY_WAIT_SECONDS) instead of
+    running a second checkout.
+    """
+    store_key = f"{scope}:{key}"
+    deadline = time.monotonic() + IDEMPOTENCY_WAIT_SECONDS
+    delay = 0.05
+    while True:
+        if _store.add(store_key, {"state": "running", "fingerprint": request_fingerprint}, IDEMPOTENCY_LOCK_SECONDS):
+            return None
+        entry = _store.get(store_key)
+        if entry is None:
+            continue  # expired between add() and get(); try to claim again
+        _check_fingerprint(entry, request_fingerprint)
+        if entry.get("state") == "done":
+            return entry["result"]
+        if time.monotonic() >= deadline:
+            raise HTTPException(status_code=409, detail="A request with this Idempotency-Key is still in progress")
+        time.sleep(delay)
+        delay = min(delay * 2, 0.5)
+
+
+def complete(scope: str, key: str, request_fingerprint: str, result):
+    """Remember the result (JSON-serializable) for replays."""
+    _store.set(
+        f"{scope}:{key}",
+        {"state": "done", "fingerprint": request_fingerprint, "result": result},
+        IDEMPOTENCY_TTL_SECONDS,
+    )
+
+
+def release(scope: str, key: str):
+    """The request failed: let a retry run it again."""
+    _store.delete(f"{scope}:{key}")
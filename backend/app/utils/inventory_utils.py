@@ -0,0 +1,126 @@
+from collections import defaultdict
+
+from fastapi import HTTPException
+from sqlalchemy import Integer, case, func, literal, update
+from sqlalchemy.orm import Session
+
+from app import models
+from app.utils.change_log_utils import record_changes
+from app.utils.order_state_utils import INACTIVE_ORDER_STATUSES
+
+# Deleting an order in one of these states also hands its stock back
+OPEN_ORDER_STATUSES = {"pending", "accepted"}
+
+_products = models.Product.__table__
+
+
+def _quantities(lines) -> list:
+    """[(product_id, quantity)] summed per product, in id order so concurrent
+    checkouts always lock rows in the same order (no deadlocks)."""
+    totals = defaultdict(int)
+    for product_id, quantity, *_ in lines:
+        totals[product_id] += quantity or 0
+    return sorted((product_id, qty) for product_id, qty in totals.items() if qty > 0)
+
+
+def reserve_stock(db: Session, lines):
+    """
+    Take stock for every line with one conditional UPDATE per product:
+    SET stock = stock - n WHERE stock >= n (NULL stock is not tracked).
+    Row locks only, no read-then-write window. Products that hit 0 are
+    flipped to unavailable in the same statement. Raises 409 listing every
+    line that could not be served; the caller's transaction must be rolled
+    back (nothing is committed here).
+    """
+    short, sold_out = [], []
+    for product_id, qty in _quantities(lines):
+        stmt = (
+            update(_products)
+            .where(
+                _products.c.id == product_id,
+                _products.c.available == True,  # noqa: E712
+                (_products.c.stock.is_(None)) | (_products.c.stock >= qty),
+            )
+            # MySQL applies SET left to right, so `available` must read the old stock
+            .ordered_values(
+                (_products.c.available, case((_products.c.stock - qty <= 0, False), else_=_products.c.available)),
+                (_products.c.stock, _products.c.stock - qty),
+                (_products.c.sales_count, func.coalesce(_products.c.sales_count, 0) + qty),
+            )
+        )
+        if db.execute(stmt).rowcount != 1:
+            short.append(product_id)
+    if short:
+        names = [name for (name,) in db.query(models.Product.name).filter(models.Product.id.in_(short))]
+        raise HTTPException(status_code=409, detail=f"Out of stock: {', '.join(names) or short}")
+
+    reserved = [product_id for product_id, _ in _quantities(lines)]
+    if reserved:
+        sold_out = [product_id for (product_id,) in db.query(models.Product.id).filter(
+            models.Product.id.in_(reserved), models.Product.stock == 0
+        )]
+    # Availability changed: let synced catalogs know
+    record_changes(db, models.Product, sold_out)
+
+
+def release_stock(db: Session, lines):
+    """Give stock back (cancel / reject / delete). Re-enables products that had sold out."""
+    restocked = []
+    for product_id, qty in _quantities(lines):
+        stmt = (
+            update(_products)
+            .where(_products.c.id == product_id)
+            .ordered_values(
+                (_products.c.available, case((_products.c.stock == 0, True), else_=_products.c.available)),
+                (_products.c.stock, _products.c.stock + qty),
+                (_products.c.sales_count, case(
+                    (func.coalesce(_products.c.sales_count, 0) >= qty, _products.c.sales_count - qty), else_=0
+                )),
+            )
+        )
+        db.execute(stmt)
+        restocked.append(product_id)
+    record_changes(db, models.Product, restocked)
+
+
+def initial_available(stock, available: bool = True) -> bool:
+    """`available` for a new product: nothing to sell means unavailable."""
+    return bool(available) and stock != 0
+
+
+def set_stock(db: Session, product_id: int, **values):
+    """
+    Write `stock` and/or `available` for one product (the keys given), with
+    availability derived the way checkout does it: 0 in stock is unavailable,
+    restocking a sold-out product makes it available again, and an explicit
+    `available` wins unless there is nothing to sell. One UPDATE, so there is
+    no read-then-write window against concurrent checkouts.
+    """
+    if "stock" not in values and "available" not in values:
+        return
+    stock = literal(values["stock"], Integer) if "stock" in values else _products.c.stock
+    if "available" in values:
+        otherwise = literal(bool(values["available"]))
+    else:
+        otherwise = case((_products.c.stock == 0, True), else_=_products.c.available)
+    assignments = [(_products.c.available, case((stock == 0, False), else_=otherwise))]
+    if "stock" in values:
+        # After `available`, which must read the old stock (MySQL sets left to right)
+        assignments.append((_products.c.stock, stock))
+    db.execute(update(_products).where(_products.c.id == product_id).ordered_values(*assignments))
+    record_changes(db, models.Product, [product_id])
+
+
+def stock_status_change(db: Session, order, lines, old_status, new_status):
+    """Release on entering cancelled/rejected, take again when an order is reopened."""
+    was = (old_status or "").lower() in INACTIVE_ORDER_STATUSES
+    now = (new_status or "").lower() in INACTIVE_ORDER_STATUSES
+    if now and not was:
+        release_stock(db, lines)
+    elif was and not now:
+        reserve_stock(db, lines)
+
+
+def stock_deleted(db: Session, order, lines):
+    if (order.status or "").lower() in OPEN_ORDER_STATUSES:
+        release_stock(db, lines)
@@ -0,0 +1,311 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import traceback
+
+from dotenv import load_dotenv
+
+from app.utils.outbox_utils import OUTBOX_PATH, backoff_delay
+
+load_dotenv()
+
+# ----------------------
+# Configuration
+# ----------------------
+# Same SQLite file as the outboxes by default: durable across restarts and
+# shared by every process on the host (web workers and `python -m app.worker`)
+JOBS_PATH = os.getenv("JOBS_PATH", OUTBOX_PATH)
+JOB_WORKER_THREADS = int(os.getenv("JOB_WORKER_THREADS", 2))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", 1.0))
+# Visibility timeout: a claimed job that is not finished in time is handed to another worker
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", 300))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", 5))
+# Dead jobs (and finished jobs that hold a unique key) are kept this long
+JOB_RETENTION_DAYS = int(os.getenv("JOB_RETENTION_DAYS", 14))
+
+# Priorities: higher runs first
+HIGH, NORMAL, LOW = 10, 0, -10
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    run_at REAL NOT NULL,
+    leased_until REAL NOT NULL DEFAULT 0,
+    unique_key TEXT UNIQUE,
+    last_error TEXT,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_jobs_ready ON jobs (status, priority, run_at);
+"""
+
+
+# ----------------------
+# Handler registry
+# ----------------------
+class JobSpec:
+    def __init__(self, name: str, func, priority: int, max_attempts: int, lease_seconds: float):
+        self.name = name
+        self.func = func
+        self.priority = priority
+        self.max_attempts = max_attempts
+        self.lease_seconds = lease_seconds
+
+
+HANDLERS = {}
+
+
+def job(name: str, priority: int = NORMAL, max_attempts: int = JOB_MAX_ATTEMPTS,
+        lease_seconds: float = JOB_LEASE_SECONDS):
+    """Register `func(payload: dict)` as the handler for jobs called `name`."""
+    def register(func):
+        HANDLERS[name] = JobSpec(name, func, priority, max_attempts, lease_seconds)
+        return func
+    return register
+
+
+class PermanentJobError(Exception):
+    """Raise from a handler when retrying cannot help; the job goes straight to 'dead'."""
+
+
+# ----------------------
+# Queue
+# ----------------------
+class JobQueue:
+    """
+    Durable priority queue of named jobs with scheduled run times.
+
+    `claim()` leases ready jobs, highest priority first, then oldest run_at.
+    A job whose lease runs out before it is acked (the worker crashed or hung)
+    becomes claimable again, so every job runs at least once; handlers must
+    be safe to re-run.
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path or JOBS_PATH
+        self._local = threading.local()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def put(self, name: str, payload: dict = None, priority: int = NORMAL, delay: float = 0,
+            run_at: float = None, max_attempts: int = JOB_MAX_ATTEMPTS, unique_key: str = None):
+        """
+        Queue a job. With `unique_key`, a second put() with the same key is
+        ignored while the first job exists (returns None).
+        """
+        now = time.time()
+        cur = self._conn().execute(
+            "INSERT OR IGNORE INTO jobs (name, payload, priority, max_attempts, run_at, unique_key, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (name, json.dumps(payload or {}), priority, max_attempts,
+             run_at if run_at is not None else now + delay, unique_key, now),
+        )
+        return cur.lastrowid if cur.rowcount else None
+
+    def claim(self, limit: int, lease_seconds: float = JOB_LEASE_SECONDS):
+        """Lease up to `limit` ready jobs. Returns [(id, name, payload, attempts, max_attempts)]."""
+        conn = self._conn()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = conn.execute(
+                "SELECT id, name, payload, attempts, max_attempts FROM jobs "
+                "WHERE status = 'queued' AND run_at <= ? AND leased_until <= ? "
+                "ORDER BY priority DESC, run_at, id LIMIT ?",
+                (now, now, limit),
+            ).fetchall()
+            if rows:
+                conn.executemany(
+                    "UPDATE jobs SET leased_until = ?, attempts = attempts + 1 WHERE id = ?",
+                    [(now + lease_seconds, row[0]) for row in rows],
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return [(row[0], row[1], json.loads(row[2]), row[3] + 1, row[4]) for row in rows]
+
+    def extend(self, job_id: int, lease_seconds: float):
+        """Heartbeat for long jobs: push the visibility timeout out again."""
+        self._conn().execute(
+            "UPDATE jobs SET leased_until = ? WHERE id = ?", (time.time() + lease_seconds, job_id)
+        )
+
+    def ack(self, job_id: int):
+        """Finish a job. Rows with a unique key stay as 'done' so the key keeps deduplicating."""
+        conn = self._conn()
+        if not conn.execute("DELETE FROM jobs WHERE id = ? AND unique_key IS NULL", (job_id,)).rowcount:
+            conn.execute(
+                "UPDATE jobs SET status = 'done', leased_until = 0, run_at = ? WHERE id = ?", (time.time(), job_id)
+            )
+
+    def retry(self, job_id: int, delay: float, error: str = None):
+        self._conn().execute(
+            "UPDATE jobs SET run_at = ?, leased_until = 0, last_error = ? WHERE id = ?",
+            (time.time() + delay, error, job_id),
+        )
+
+    def dead(self, job_id: int, error: str = None):
+        """Park a job that will not succeed; kept for inspection and requeue_dead()."""
+        self._conn().execute(
+            "UPDATE jobs SET status = 'dead', leased_until = 0, last_error = ?, run_at = ? WHERE id = ?",
+            (error, time.time(), job_id),
+        )
+
+    def requeue_dead(self, name: str = None) -> int:
+        """Put dead jobs back in the queue with a fresh attempt budget."""
+        sql = "UPDATE jobs SET status = 'queued', attempts = 0, run_at = ? WHERE status = 'dead'"
+        params = [time.time()]
+        if name:
+            sql += " AND name = ?"
+            params.append(name)
+        return self._conn().execute(sql, params).rowcount
+
+    def prune(self, days: int = JOB_RETENTION_DAYS) -> int:
+        """Drop old dead and done rows."""
+        return self._conn().execute(
+            "DELETE FROM jobs WHERE status IN ('dead', 'done') AND run_at < ?", (time.time() - days * 86400,)
+        ).rowcount
+
+    def stats(self) -> list:
+        """[{name, status, count, next_run_at}] for dashboards."""
+        rows = self._conn().execute(
+            "SELECT name, status, COUNT(*), MIN(run_at) FROM jobs GROUP BY name, status ORDER BY name, status"
+        ).fetchall()
+        return [{"name": r[0], "status": r[1], "count": r[2], "next_run_at": r[3]} for r in rows]
+
+
+job_queue = JobQueue()
+
+
+def enqueue(name: str, payload: dict = None, delay: float = 0, run_at: float = None,
+            priority: int = None, unique_key: str = None):
+    """Queue a registered job. Defaults (priority, attempts) come from its @job registration."""
+    spec = HANDLERS.get(name)
+    if spec is None:
+        raise KeyError(f"No job handler registered for '{name}'")
+    job_id = job_queue.put(
+        name, payload, priority=spec.priority if priority is None else priority, delay=delay,
+        run_at=run_at, max_attempts=spec.max_attempts, unique_key=unique_key,
+    )
+    job_worker.wake()
+    return job_id
+
+
+# ----------------------
+# Worker
+# ----------------------
+class JobWorker:
+    """
+    Runs queued jobs on background threads. Used both embedded in the web
+    app (JOBS_EMBEDDED_WORKER) and by the standalone `python -m app.worker`.
+    Failures are retried with exponential backoff up to the job's
+    max_attempts, then parked as 'dead'.
+    """
+
+    def __init__(self, queue: JobQueue, threads: int = JOB_WORKER_THREADS,
+                 poll_interval: float = JOB_POLL_INTERVAL, periodic=()):
+        self.queue = queue
+        self.threads = threads
+        self.poll_interval = poll_interval
+        self.periodic = list(periodic)
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._threads = []
+
+    def start(self):
+        if self._threads:
+            return
+        self._stop.clear()
+        for i in range(self.threads):
+            thread = threading.Thread(target=self._run, name=f"job-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        if self.periodic:
+            thread = threading.Thread(target=self._schedule, name="job-scheduler", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: float = 30):
+        """Let running jobs finish; unfinished ones are picked up again after their lease."""
+        self._stop.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def wake(self):
+        self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                batch = self.queue.claim(1)
+            except Exception as e:
+                print(f"⚠️ Job queue unavailable: {e}")
+                batch = []
+            if not batch:
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+                continue
+            self.run_job(*batch[0])
+
+    def run_job(self, job_id: int, name: str, payload: dict, attempts: int, max_attempts: int):
+        spec = HANDLERS.get(name)
+        if spec is None:
+            self.queue.dead(job_id, f"No handler registered for '{name}'")
+            print(f"❌ Job {job_id} ({name}) has no handler")
+            return
+        if spec.lease_seconds != JOB_LEASE_SECONDS:
+            self.queue.extend(job_id, spec.lease_seconds)
+        started = time.monotonic()
+        try:
+            spec.func(payload)
+        except PermanentJobError as e:
+            print(f"❌ Job {job_id} ({name}) failed permanently: {e}")
+            self.queue.dead(job_id, str(e))
+            return
+        except Exception as e:
+            error = "".join(traceback.format_exception_only(type(e), e)).strip()
+            if attempts >= max_attempts:
+                print(f"❌ Job {job_id} ({name}) failed {attempts} times: {error}")
+                self.queue.dead(job_id, error)
+            else:
+                print(f"⚠️ Job {job_id} ({name}) attempt {attempts} failed, retrying: {error}")
+                self.queue.retry(job_id, backoff_delay(attempts), error)
+            return
+        self.queue.ack(job_id)
+        print(f"✅ Job {job_id} ({name}) done in {time.monotonic() - started:.2f}s")
+
+    def _schedule(self):
+        """
+        Queue periodic jobs. The unique key is the job name plus the current
+        slot, so any number of schedulers (one per process) queue each slot once.
+        """
+        while not self._stop.is_set():
+            now = time.time()
+            for name, every, payload in self.periodic:
+                slot = int(now // every)
+                try:
+                    enqueue(name, payload, unique_key=f"periodic:{name}:{slot}")
+                except Exception as e:
+                    print(f"⚠️ Could not schedule {name}: {e}")
+            self._stop.wait(min(60, min(every for _, every, _ in self.periodic)))
+
+
+job_worker = JobWorker(job_queue)
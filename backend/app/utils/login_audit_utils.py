@@ -0,0 +1,144 @@
+import os
+import threading
+from collections import deque
+from datetime import datetime, timedelta
+
+from dotenv import load_dotenv
+from sqlalchemy.orm import Session
+
+from app import models
+from app.database import SessionLocal
+
+# Load .env file
+load_dotenv()
+
+# Logins are recorded in memory and written to login_history in batches, so a
+# login costs an append instead of an INSERT + COMMIT. Events still in the
+# buffer are lost if the process is killed; stop() flushes on shutdown.
+LOGIN_AUDIT_FLUSH_SECONDS = float(os.getenv("LOGIN_AUDIT_FLUSH_SECONDS", 5))
+LOGIN_AUDIT_BATCH_SIZE = int(os.getenv("LOGIN_AUDIT_BATCH_SIZE", 500))
+LOGIN_AUDIT_MAX_BUFFER = int(os.getenv("LOGIN_AUDIT_MAX_BUFFER", 10_000))  # oldest dropped beyond this
+LOGIN_HISTORY_RETENTION_DAYS = int(os.getenv("LOGIN_HISTORY_RETENTION_DAYS", 180))
+
+
+class LoginAuditBuffer:
+    """
+    Collects login events from request handlers and inserts them with one
+    executemany per batch from a background thread, every `flush_interval`
+    seconds or as soon as `batch_size` events are waiting.
+    """
+
+    def __init__(self, flush_interval: float = LOGIN_AUDIT_FLUSH_SECONDS,
+                 batch_size: int = LOGIN_AUDIT_BATCH_SIZE, max_buffer: int = LOGIN_AUDIT_MAX_BUFFER):
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self._events = deque(maxlen=max_buffer)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def record(self, user_id: int, ip_address: str = None, user_agent: str = None, method: str = None):
+        """Called on the request path: no I/O."""
+        with self._lock:
+            self._events.append({
+                "user_id": user_id,
+                "login_time": datetime.utcnow(),
+                "ip_address": (ip_address or "")[:50] or None,
+                "user_agent": (user_agent or "")[:255] or None,
+                "method": method,
+            })
+            full = len(self._events) >= self.batch_size
+        if full:
+            self._wake.set()
+
+    def pending(self, user_id: int) -> list:
+        """Events for `user_id` not yet written, newest first."""
+        with self._lock:
+            return [event for event in reversed(self._events) if event["user_id"] == user_id]
+
+    def flush(self) -> int:
+        """Write everything buffered so far. Returns the number of rows inserted."""
+        written = 0
+        while True:
+            with self._lock:
+                batch = [self._events.popleft() for _ in range(min(self.batch_size, len(self._events)))]
+            if not batch:
+                return written
+            db = SessionLocal()
+            try:
+                db.bulk_insert_mappings(models.LoginHistory, batch)
+                db.commit()
+                written += len(batch)
+            except Exception as e:
+                db.rollback()
+                print(f"⚠️ Login audit flush failed, {len(batch)} events kept: {e}")
+                with self._lock:
+                    self._events.extendleft(reversed(batch))
+                return written
+            finally:
+                db.close()
+
+    def start(self):
+        if self._thread:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="login-audit", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10):
+        """Stop the flusher and write what is left."""
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+        self.flush()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+
+login_audit = LoginAuditBuffer()
+
+
+def record_login(user_id: int, ip_address: str = None, user_agent: str = None, method: str = None):
+    login_audit.record(user_id, ip_address, user_agent, method)
+
+
+def recent_logins(db: Session, user_id: int, limit: int = 20) -> list:
+    """Newest logins of a user, including ones still waiting in this process's buffer."""
+    pending = login_audit.pending(user_id)[:limit]
+    rows = (
+        db.query(models.LoginHistory.login_time, models.LoginHistory.ip_address,
+                 models.LoginHistory.user_agent, models.LoginHistory.method)
+        .filter(models.LoginHistory.user_id == user_id)
+        .order_by(models.LoginHistory.login_time.desc())
+        .limit(limit - len(pending))
+        .all()
+    ) if len(pending) < limit else []
+    return [
+        {name: event[name] for name in ("login_time", "ip_address", "user_agent", "method")}
+        for event in pending
+    ] + [row._asdict() for row in rows]
+
+
+def prune_login_history(db: Session, days: int = LOGIN_HISTORY_RETENTION_DAYS, batch_size: int = 5000) -> int:
+    """Delete logins older than `days`, in short batches. Returns the number removed."""
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    removed = 0
+    while True:
+        ids = [row_id for (row_id,) in (
+            db.query(models.LoginHistory.id)
+            .filter(models.LoginHistory.login_time < cutoff)
+            .order_by(models.LoginHistory.id)
+            .limit(batch_size)
+        )]
+        if not ids:
+            return removed
+        db.query(models.LoginHistory).filter(models.LoginHistory.id.in_(ids)).delete(synchronize_session=False)
+        db.commit()
+        removed += len(ids)
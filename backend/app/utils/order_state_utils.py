@@ -0,0 +1,62 @@
+from fastapi import HTTPException
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app import models
+
+# Allowed status moves. Anything else is a 409.
+ORDER_TRANSITIONS = {
+    "pending": {"accepted", "rejected", "completed", "cancelled"},
+    "accepted": {"completed", "delivered", "rejected", "cancelled"},
+    "completed": {"delivered"},
+    "rejected": {"accepted"},  # store changed its mind; stock is taken again
+    "delivered": set(),
+    "cancelled": set(),
+}
+ORDER_STATUSES = set(ORDER_TRANSITIONS)
+
+# Orders in these states are out of the dashboard counters and sales rollups
+# and have handed their stock back
+INACTIVE_ORDER_STATUSES = {"cancelled", "rejected"}
+
+
+def normalize_status(status) -> str:
+    return (status or "pending").strip().lower()
+
+
+def check_transition(old_status, new_status):
+    """400 for a status we don't know, 409 for a move the table doesn't allow."""
+    if new_status is None:
+        raise HTTPException(status_code=400, detail="status must not be null")
+    old, new = normalize_status(old_status), normalize_status(new_status)
+    if new not in ORDER_STATUSES:
+        raise HTTPException(status_code=400, detail=f"Unknown status '{new_status}'")
+    if new == old:
+        return
+    if new not in ORDER_TRANSITIONS.get(old, set()):
+        raise HTTPException(status_code=409, detail=f"Cannot move order from '{old}' to '{new}'")
+
+
+def compare_and_set(db: Session, order, values: dict, expected_version: int = None):
+    """
+    UPDATE orders SET ... WHERE id = :id AND version = :expected. The version
+    bump comes from the column's onupdate. No SELECT ... FOR UPDATE: a writer
+    that lost the race gets a 409 with the current state instead of waiting
+    and overwriting. Caller commits.
+    """
+    expected = order.version if expected_version is None else expected_version
+    updated = db.query(models.Order).filter(
+        models.Order.id == order.id, models.Order.version == expected
+    ).update(values, synchronize_session=False)
+    if not updated:
+        current = db.query(models.Order.status, models.Order.version).filter(models.Order.id == order.id).first()
+        if current is None:
+            raise HTTPException(status_code=404, detail="Order not found")
+        raise HTTPException(status_code=409, detail={
+            "message": "Order was changed by someone else",
+            "status": current.status,
+            "version": current.version,
+        })
+    # Mirror the write on the loaded object without making it dirty (no second UPDATE on flush)
+    for key, value in {**values, "version": expected + 1}.items():
+        set_committed_value(order, key, value)
@@ -0,0 +1,74 @@
+import hashlib
+import hmac
+import os
+import secrets
+
+from dotenv import load_dotenv
+from fastapi import HTTPException
+
+from app.utils.ttl_store_utils import make_ttl_store
+
+load_dotenv()
+
+# ----------------------
+# Configuration
+# ----------------------
+OTP_TTL_SECONDS = int(os.getenv("OTP_TTL_SECONDS", 600))
+OTP_MAX_ATTEMPTS = int(os.getenv("OTP_MAX_ATTEMPTS", 5))
+# "memory" (per process) or "redis" (shared and survives restarts)
+OTP_STORE_BACKEND = os.getenv("OTP_STORE_BACKEND", "memory")
+
+_store = make_ttl_store(OTP_STORE_BACKEND, prefix="otp:")
+
+
+def set_store(store):
+    """Swap the OTP backend (any object with the TTL store interface)."""
+    global _store
+    _store = store
+
+
+def _key(purpose: str, subject: str) -> str:
+    return f"{purpose}:{subject.strip().lower()}"
+
+
+def _digest(code: str) -> str:
+    return hashlib.sha256(code.encode()).hexdigest()
+
+
+def issue_otp(purpose: str, subject: str, ttl: int = OTP_TTL_SECONDS) -> str:
+    """Create a fresh OTP for (purpose, subject), replacing any previous one."""
+    code = f"{secrets.randbelow(900000) + 100000}"
+    key = _key(purpose, subject)
+    _store.set(key, {"digest": _digest(code)}, ttl)
+    _store.delete(f"{key}:attempts")
+    return code
+
+
+def verify_otp(purpose: str, subject: str, code: str):
+    """
+    Check an OTP and consume it on success (single use).
+    Raises HTTPException when the code is missing, wrong or locked out.
+    """
+    key = _key(purpose, subject)
+    entry = _store.get(key)
+    if entry is None:
+        raise HTTPException(status_code=400, detail="OTP expired or not requested")
+
+    attempts = _store.incr(f"{key}:attempts", OTP_TTL_SECONDS)
+    if attempts > OTP_MAX_ATTEMPTS:
+        _store.delete(key)
+        raise HTTPException(status_code=429, detail="Too many attempts. Please request a new OTP")
+
+    if not hmac.compare_digest(entry["digest"], _digest(code)):
+        raise HTTPException(status_code=400, detail="Invalid OTP")
+
+    # Another request may have consumed the same code in the meantime
+    if _store.pop(key) is None:
+        raise HTTPException(status_code=400, detail="OTP expired or not requested")
+    _store.delete(f"{key}:attempts")
+
+
+def discard_otp(purpose: str, subject: str):
+    key = _key(purpose, subject)
+    _store.delete(key)
+    _store.delete(f"{key}:attempts")
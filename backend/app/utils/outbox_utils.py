@@ -0,0 +1,121 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Durable local queue for outbound messages (email, SMS, ...).
+# A SQLite file survives worker restarts and is safe to share between the
+# worker processes of one host (WAL mode + leases).
+OUTBOX_PATH = os.getenv("OUTBOX_PATH", os.path.join(os.getcwd(), "outbox.sqlite3"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    queue TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    run_at REAL NOT NULL,
+    leased_until REAL NOT NULL DEFAULT 0,
+    last_error TEXT,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_outbox_ready ON outbox (queue, status, run_at);
+"""
+
+
+class Outbox:
+    """
+    FIFO of JSON payloads for one named queue.
+
+    Consumers `claim()` a batch, which leases the rows for `lease_seconds`;
+    rows that are not acked or rescheduled before the lease runs out (e.g.
+    the worker died) become claimable again.
+    """
+
+    def __init__(self, queue: str, path: str = None):
+        self.queue = queue
+        self.path = path or OUTBOX_PATH
+        self._local = threading.local()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def put(self, payload: dict, delay: float = 0) -> int:
+        now = time.time()
+        cur = self._conn().execute(
+            "INSERT INTO outbox (queue, payload, run_at, created_at) VALUES (?, ?, ?, ?)",
+            (self.queue, json.dumps(payload), now + delay, now),
+        )
+        return cur.lastrowid
+
+    def claim(self, limit: int, lease_seconds: float = 60):
+        """Lease up to `limit` ready messages. Returns [(id, payload, attempts)]."""
+        conn = self._conn()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = conn.execute(
+                "SELECT id, payload, attempts FROM outbox "
+                "WHERE queue = ? AND status = 'queued' AND run_at <= ? AND leased_until <= ? "
+                "ORDER BY run_at, id LIMIT ?",
+                (self.queue, now, now, limit),
+            ).fetchall()
+            if rows:
+                conn.executemany(
+                    "UPDATE outbox SET leased_until = ?, attempts = attempts + 1 WHERE id = ?",
+                    [(now + lease_seconds, row[0]) for row in rows],
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return [(row[0], json.loads(row[1]), row[2] + 1) for row in rows]
+
+    def ack(self, ids):
+        """Delete delivered messages."""
+        if ids:
+            self._conn().executemany("DELETE FROM outbox WHERE id = ?", [(i,) for i in ids])
+
+    def retry(self, message_id: int, delay: float, error: str = None):
+        self._conn().execute(
+            "UPDATE outbox SET run_at = ?, leased_until = 0, last_error = ? WHERE id = ?",
+            (time.time() + delay, error, message_id),
+        )
+
+    def release(self, ids):
+        """Give leased messages back without counting the attempt."""
+        if ids:
+            self._conn().executemany(
+                "UPDATE outbox SET leased_until = 0, attempts = attempts - 1 WHERE id = ?",
+                [(i,) for i in ids],
+            )
+
+    def dead(self, message_id: int, error: str = None):
+        """Park a message that will never succeed; kept for inspection."""
+        self._conn().execute(
+            "UPDATE outbox SET status = 'dead', leased_until = 0, last_error = ? WHERE id = ?",
+            (error, message_id),
+        )
+
+    def pending(self) -> int:
+        return self._conn().execute(
+            "SELECT COUNT(*) FROM outbox WHERE queue = ? AND status = 'queued'", (self.queue,)
+        ).fetchone()[0]
+
+
+def backoff_delay(attempts: int, base: float = 2.0, cap: float = 900.0) -> float:
+    """Exponential backoff: 2s, 4s, 8s, ... capped at 15 minutes."""
+    return min(cap, base ** attempts)
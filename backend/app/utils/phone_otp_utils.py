@@ -1,32 +1,243 @@
-from twilio.rest import Client
+import asyncio
+import logging
 import os
+import time
+
 from dotenv import load_dotenv
 
+from app.utils.outbox_utils import Outbox, backoff_delay
+
 # Load .env file
 load_dotenv()
 
-# ❌ WRONG: os.getenv("actual value")
-# ✔ CORRECT: os.getenv("VARIABLE_NAME")
-print("DEBUG OTP:", otp)
+logger = logging.getLogger(__name__)
+
+# Required: "twilio" for real delivery, "fake" for local development and tests
+# (messages are kept in memory, never delivered). Startup fails without it.
+SMS_PROVIDER = os.getenv("SMS_PROVIDER")
+SMS_COUNTRY_CODE = os.getenv("SMS_COUNTRY_CODE", "+91")
+# Local development only: with the fake provider, also return the OTP from
+# /auth/phone/request-otp. Ignored when a real provider is configured.
+SMS_EXPOSE_OTP = os.getenv("SMS_EXPOSE_OTP", "false").lower() == "true"
 
 TWILIO_SID = os.getenv("TWILIO_SID")
 TWILIO_AUTH = os.getenv("TWILIO_AUTH")
 TWILIO_PHONE = os.getenv("TWILIO_PHONE")
 
-# Debug print to verify loading (can be removed)
-print("LOADED TWILIO_SID:", TWILIO_SID)
-print("LOADED TWILIO_AUTH:", TWILIO_AUTH)
-print("LOADED TWILIO_PHONE:", TWILIO_PHONE)
+SMS_BATCH_SIZE = int(os.getenv("SMS_BATCH_SIZE", 20))
+SMS_MAX_ATTEMPTS = int(os.getenv("SMS_MAX_ATTEMPTS", 5))
+
+
+# ----------------------
+# Providers
+# ----------------------
+class SmsProvider:
+    """Async SMS sender. `send` returns the provider's message id."""
+
+    async def send(self, to: str, body: str) -> str:
+        raise NotImplementedError
+
+
+class TwilioSmsProvider(SmsProvider):
+    def __init__(self, sid: str = TWILIO_SID, auth: str = TWILIO_AUTH, from_phone: str = TWILIO_PHONE):
+        self.sid = sid
+        self.auth = auth
+        self.from_phone = from_phone
+        self._client = None
+
+    def _get_client(self):
+        # Created on first send: importing the SDK stays off the boot path
+        if self._client is None:
+            if not self.sid or not self.auth or not self.from_phone:
+                raise RuntimeError("⚠ Twilio .env variables not loaded correctly")
+            from twilio.rest import Client
+
+            self._client = Client(self.sid, self.auth)
+        return self._client
+
+    async def send(self, to: str, body: str) -> str:
+        client = self._get_client()
+        # The Twilio SDK is blocking; keep it off the event loop
+        message = await asyncio.to_thread(
+            client.messages.create, body=body, from_=self.from_phone, to=to
+        )
+        return message.sid
+
+
+class FakeSmsProvider(SmsProvider):
+    """Local stand-in: records and prints messages instead of sending them."""
+
+    def __init__(self):
+        self.sent = []
+
+    async def send(self, to: str, body: str) -> str:
+        self.sent.append((to, body))
+        message_id = f"fake-{len(self.sent)}"
+        # Never the body: it carries the OTP
+        logger.info("SMS %s to %s recorded by the fake provider", message_id, to)
+        return message_id
+
+
+def get_provider(name: str = SMS_PROVIDER) -> SmsProvider:
+    """Build the configured provider; raises at startup on a missing or incomplete config."""
+    if name == "twilio":
+        if not TWILIO_SID or not TWILIO_AUTH or not TWILIO_PHONE:
+            raise RuntimeError("SMS_PROVIDER=twilio needs TWILIO_SID, TWILIO_AUTH and TWILIO_PHONE")
+        return TwilioSmsProvider()
+    if name == "fake":
+        return FakeSmsProvider()
+    raise RuntimeError(f"SMS_PROVIDER must be 'twilio' or 'fake' (for development), got {name!r}")
+
+
+# ----------------------
+# Circuit breaker
+# ----------------------
+class CircuitBreaker:
+    """
+    Stops calling a failing vendor: after `failure_threshold` consecutive
+    failures the circuit opens for `reset_timeout` seconds, then one trial
+    batch is let through (half-open) before closing again.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def retry_after(self) -> float:
+        if self.opened_at is None:
+            return 0
+        return max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+
+
+# ----------------------
+# Dispatcher
+# ----------------------
+class SmsDispatcher:
+    """
+    Drains the durable SMS outbox on the event loop. Each batch is sent
+    concurrently; while the circuit is open, messages wait in the outbox.
+    """
+
+    def __init__(self, outbox: Outbox, provider: SmsProvider, breaker: CircuitBreaker,
+                 batch_size: int = SMS_BATCH_SIZE, poll_interval: float = 1.0):
+        self.outbox = outbox
+        self.provider = provider
+        self.breaker = breaker
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self._task = None
+        self._loop = None
+        self._wake = None
+        self._stopping = False
+
+    def start(self):
+        """Start the drain task on the running event loop."""
+        if self._task is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._stopping = False
+        self._task = self._loop.create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._stopping = True
+        self._wake.set()
+        await self._task
+        self._task = None
+
+    def wake(self):
+        """Thread-safe: called from sync request handlers."""
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    async def _sleep(self, seconds: float):
+        try:
+            await asyncio.wait_for(self._wake.wait(), seconds)
+        except asyncio.TimeoutError:
+            pass
+        self._wake.clear()
+
+    async def _run(self):
+        while not self._stopping:
+            if self.breaker.state == "open":
+                await self._sleep(self.breaker.retry_after())
+                continue
+            try:
+                batch = await asyncio.to_thread(self.outbox.claim, self.batch_size, 60)
+            except Exception as e:
+                print(f"⚠️ SMS outbox unavailable: {e}")
+                batch = []
+            if not batch:
+                await self._sleep(self.poll_interval)
+                continue
+            if self.breaker.state == "half_open":
+                # Probe the vendor with one message, hand the rest back
+                await asyncio.to_thread(self.outbox.release, [m[0] for m in batch[1:]])
+                batch = batch[:1]
+            await self.send_batch(batch)
+
+    async def send_batch(self, batch):
+        results = await asyncio.gather(
+            *(self.provider.send(payload["to"], payload["body"]) for _, payload, _ in batch),
+            return_exceptions=True,
+        )
+        sent = []
+        for (message_id, payload, attempts), result in zip(batch, results):
+            if not isinstance(result, Exception):
+                self.breaker.record_success()
+                sent.append(message_id)
+                continue
+
+            self.breaker.record_failure()
+            if attempts >= SMS_MAX_ATTEMPTS:
+                print(f"❌ SMS {message_id} to {payload['to']} failed {attempts} times: {result}")
+                await asyncio.to_thread(self.outbox.dead, message_id, str(result))
+            else:
+                delay = max(backoff_delay(attempts), self.breaker.retry_after())
+                await asyncio.to_thread(self.outbox.retry, message_id, delay, str(result))
+        await asyncio.to_thread(self.outbox.ack, sent)
+
+
+sms_outbox = Outbox("sms")
+sms_dispatcher = SmsDispatcher(sms_outbox, get_provider(), CircuitBreaker())
+
+
+def exposes_otp() -> bool:
+    """True only for the dev shortcut: fake provider and SMS_EXPOSE_OTP set."""
+    return SMS_EXPOSE_OTP and isinstance(sms_dispatcher.provider, FakeSmsProvider)
+
 
-if not TWILIO_SID or not TWILIO_AUTH or not TWILIO_PHONE:
-    raise RuntimeError("⚠ Twilio .env variables not loaded correctly")
+def normalize_phone(phone: str) -> str:
+    phone = phone.strip()
+    return phone if phone.startswith("+") else f"{SMS_COUNTRY_CODE}{phone}"
 
-client = Client(TWILIO_SID, TWILIO_AUTH)
 
-def send_otp_sms(phone, otp):
-    message = client.messages.create(
-        body=f"Your TownDrop OTP is: {otp}",
-        from_=TWILIO_PHONE,
-        to=phone
-    )
-    return message.sid
+def send_otp_sms(phone: str, otp: str) -> int:
+    """Queue the OTP SMS and return immediately; delivery happens off the request path."""
+    message_id = sms_outbox.put({
+        "to": normalize_phone(phone),
+        "body": f"Your TownDrop OTP is: {otp}",
+    })
+    sms_dispatcher.wake()
+    return message_id
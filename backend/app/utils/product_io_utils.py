@@ -0,0 +1,315 @@
+import codecs
+import csv
+import io
+import json
+import os
+
+from dotenv import load_dotenv
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from app import models
+from app.utils import counter_utils, inventory_utils
+from app.utils.change_log_utils import record_changes
+from app.utils.serialization_utils import product_query, product_dict
+
+# Load .env file
+load_dotenv()
+
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", 500))
+IMPORT_MAX_ERRORS = int(os.getenv("IMPORT_MAX_ERRORS", 1000))
+EXPORT_PAGE_SIZE = int(os.getenv("EXPORT_PAGE_SIZE", 1000))
+
+EXPORT_COLUMNS = ("id", "name", "price", "image", "available", "subcategory_id", "subcategory", "stock")
+_TRUE = {"1", "true", "yes", "y"}
+_FALSE = {"0", "false", "no", "n"}
+
+
+# ----------------------
+# Reading uploads
+# ----------------------
+def read_rows(binary_file, fmt: str):
+    """Yield (line_no, dict) from a CSV or JSONL upload without loading it whole."""
+    text = codecs.getreader("utf-8-sig")(binary_file)
+    if fmt == "csv":
+        reader = csv.DictReader(text)
+        for row in reader:
+            yield reader.line_num, {k.strip().lower(): v for k, v in row.items() if k}
+        return
+    for line_no, line in enumerate(text, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            yield line_no, None
+            continue
+        yield line_no, row if isinstance(row, dict) else None
+
+
+def _blank(value) -> bool:
+    return value is None or (isinstance(value, str) and not value.strip())
+
+
+def parse_row(row) -> dict:
+    """Validate one input row; raises ValueError with a readable message."""
+    if row is None:
+        raise ValueError("Not a JSON object")
+    name = str(row.get("name") or "").strip()
+    if not name:
+        raise ValueError("name is required")
+    if len(name) > 100:
+        raise ValueError("name is longer than 100 characters")
+    parsed = {"name": name}
+
+    if not _blank(row.get("price")):
+        try:
+            price = float(row["price"])
+        except (TypeError, ValueError):
+            raise ValueError(f"price is not a number: {row['price']!r}")
+        if price < 0:
+            raise ValueError("price must not be negative")
+        parsed["price"] = price
+
+    if not _blank(row.get("image")):
+        image = str(row["image"]).strip()
+        if len(image) > 255:
+            raise ValueError("image is longer than 255 characters")
+        parsed["image"] = image
+
+    available = row.get("available")
+    if isinstance(available, bool):
+        parsed["available"] = available
+    elif not _blank(available):
+        flag = str(available).strip().lower()
+        if flag not in _TRUE | _FALSE:
+            raise ValueError(f"available must be true/false: {available!r}")
+        parsed["available"] = flag in _TRUE
+
+    if not _blank(row.get("stock")):
+        try:
+            stock = int(row["stock"])
+        except (TypeError, ValueError):
+            raise ValueError(f"stock is not an integer: {row['stock']!r}")
+        if stock < 0:
+            raise ValueError("stock must not be negative")
+        parsed["stock"] = stock
+
+    if not _blank(row.get("subcategory")):
+        parsed["subcategory"] = str(row["subcategory"]).strip()[:100]
+    elif not _blank(row.get("subcategory_id")):
+        try:
+            parsed["subcategory_id"] = int(row["subcategory_id"])
+        except (TypeError, ValueError):
+            raise ValueError(f"subcategory_id is not an integer: {row['subcategory_id']!r}")
+    return parsed
+
+
+# ----------------------
+# Import
+# ----------------------
+class ProductImport:
+    """
+    Upserts products of one store, keyed by name, in chunked transactions:
+    one lookup of existing names, one executemany INSERT and one executemany
+    UPDATE per chunk. Counters and the catalog change log are kept in step.
+    """
+
+    def __init__(self, db: Session, store, create_subcategories: bool = True, dry_run: bool = False):
+        self.db = db
+        self.store = store
+        self.create_subcategories = create_subcategories
+        self.dry_run = dry_run
+        self.created = 0
+        self.updated = 0
+        self.failed = 0
+        self.errors = []
+        self._seen = set()
+        self._failed_lines = set()
+        self._subcategories = {
+            name.lower(): sub_id for sub_id, name in db.query(
+                models.ProductSubCategory.id, models.ProductSubCategory.name
+            ).filter(models.ProductSubCategory.store_id == store.id)
+        }
+        self._subcategory_ids = set(self._subcategories.values())
+
+    def error(self, line_no: int, message: str):
+        self.failed += 1
+        self._failed_lines.add(line_no)
+        if len(self.errors) < IMPORT_MAX_ERRORS:
+            self.errors.append({"row": line_no, "error": message})
+
+    def run(self, rows) -> dict:
+        chunk = []
+        for line_no, row in rows:
+            try:
+                parsed = parse_row(row)
+            except ValueError as e:
+                self.error(line_no, str(e))
+                continue
+            key = parsed["name"].lower()
+            if key in self._seen:
+                self.error(line_no, f"duplicate name in file: {parsed['name']}")
+                continue
+            self._seen.add(key)
+            chunk.append((line_no, parsed))
+            if len(chunk) >= IMPORT_CHUNK_SIZE:
+                self.flush(chunk)
+                chunk = []
+        if chunk:
+            self.flush(chunk)
+        return self.report()
+
+    def report(self) -> dict:
+        return {
+            "created": self.created,
+            "updated": self.updated,
+            "failed": self.failed,
+            "dry_run": self.dry_run,
+            "errors": self.errors,
+            "errors_truncated": self.failed > len(self.errors),
+        }
+
+    def _resolve_subcategory(self, line_no: int, parsed: dict) -> bool:
+        name = parsed.pop("subcategory", None)
+        if name is not None:
+            sub_id = self._subcategories.get(name.lower())
+            if sub_id is None:
+                if not self.create_subcategories:
+                    self.error(line_no, f"unknown subcategory: {name}")
+                    return False
+                sub = models.ProductSubCategory(name=name, store_id=self.store.id)
+                self.db.add(sub)
+                self.db.flush()
+                sub_id = self._subcategories[name.lower()] = sub.id
+                self._subcategory_ids.add(sub_id)
+            parsed["subcategory_id"] = sub_id
+        elif "subcategory_id" in parsed and parsed["subcategory_id"] not in self._subcategory_ids:
+            self.error(line_no, f"subcategory {parsed['subcategory_id']} does not belong to this store")
+            return False
+        return True
+
+    def flush(self, chunk):
+        db = self.db
+        self._failed_lines = set()
+        names = [parsed["name"] for _, parsed in chunk]
+        try:
+            existing = {
+                name.lower(): product_id for product_id, name in db.query(models.Product.id, models.Product.name)
+                .filter(models.Product.store_id == self.store.id, models.Product.name.in_(names))
+            }
+            inserts, updates = [], []
+            for line_no, parsed in chunk:
+                if not self._resolve_subcategory(line_no, parsed):
+                    continue
+                product_id = existing.get(parsed["name"].lower())
+                if product_id is not None:
+                    updates.append({"id": product_id, **parsed})
+                elif "price" not in parsed:
+                    self.error(line_no, "price is required for new products")
+                else:
+                    available = inventory_utils.initial_available(parsed.get("stock"), parsed.get("available", True))
+                    inserts.append({"store_id": self.store.id, **parsed, "available": available})
+
+            if inserts:
+                db.bulk_insert_mappings(models.Product, inserts)
+            # stock / available of existing rows go through the inventory helper,
+            # so availability is derived the same way as at checkout
+            stock_changes = [
+                (row["id"], {k: row.pop(k) for k in ("stock", "available") if k in row}) for row in updates
+            ]
+            # bulk_update_mappings groups rows by key set, one executemany per shape
+            field_updates = [row for row in updates if len(row) > 1]
+            if field_updates:
+                db.bulk_update_mappings(models.Product, field_updates)
+            for product_id, values in stock_changes:
+                inventory_utils.set_stock(db, product_id, **values)
+
+            new_ids = []
+            if inserts:
+                new_ids = [product_id for (product_id,) in db.query(models.Product.id).filter(
+                    models.Product.store_id == self.store.id,
+                    models.Product.name.in_([row["name"] for row in inserts]),
+                )]
+                counter_utils.count_product(db, self.store, len(new_ids))
+            record_changes(db, models.Product, new_ids + [row["id"] for row in updates])
+
+            if self.dry_run:
+                db.rollback()
+            else:
+                db.commit()
+        except SQLAlchemyError as e:
+            db.rollback()
+            for line_no, _ in chunk:
+                if line_no not in self._failed_lines:
+                    self.error(line_no, f"chunk rolled back: {e.__class__.__name__}")
+            # Subcategories created in this chunk were rolled back too
+            self._reload_subcategories()
+            return
+        if self.dry_run:
+            self._reload_subcategories()
+        self.created += len(inserts)
+        self.updated += len(updates)
+
+    def _reload_subcategories(self):
+        self._subcategories = {
+            name.lower(): sub_id for sub_id, name in self.db.query(
+                models.ProductSubCategory.id, models.ProductSubCategory.name
+            ).filter(models.ProductSubCategory.store_id == self.store.id)
+        }
+        self._subcategory_ids = set(self._subcategories.values())
+
+
+# ----------------------
+# Export
+# ----------------------
+def iter_products(db: Session, store_id: int, page_size: int = EXPORT_PAGE_SIZE):
+    """Keyset-paginated product rows, so memory stays flat for any catalog size."""
+    last_id = 0
+    while True:
+        rows = (
+            product_query(db)
+            .filter(models.Product.store_id == store_id, models.Product.id > last_id)
+            .order_by(models.Product.id)
+            .limit(page_size)
+            .all()
+        )
+        if not rows:
+            return
+        for row in rows:
+            yield product_dict(row)
+        last_id = rows[-1].id
+
+
+def export_lines(session_factory, store_id: int, fmt: str):
+    """
+    Yield encoded CSV/JSONL chunks. Opens its own session: the response body
+    is produced after the request's dependencies have been torn down.
+    """
+    db = session_factory()
+    try:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        if fmt == "csv":
+            writer.writerow(EXPORT_COLUMNS)
+        count = 0
+        for product in iter_products(db, store_id):
+            subcategory = product["subcategory"]["name"] if product["subcategory"] else ""
+            if fmt == "csv":
+                writer.writerow([
+                    product["id"], product["name"], product["price"], product["image"] or "",
+                    "true" if product["available"] else "false", product["subcategory_id"] or "", subcategory,
+                    "" if product["stock"] is None else product["stock"],
+                ])
+            else:
+                product = {**product, "subcategory": subcategory or None}
+                buffer.write(json.dumps({name: product[name] for name in EXPORT_COLUMNS}) + "\n")
+            count += 1
+            if count % 200 == 0:
+                yield buffer.getvalue().encode("utf-8")
+                buffer.seek(0)
+                buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue().encode("utf-8")
+    finally:
+        db.close()
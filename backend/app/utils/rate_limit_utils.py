@@ -0,0 +1,172 @@
+import logging
+import math
+import os
+import threading
+import time
+
+from dotenv import load_dotenv
+from fastapi import HTTPException, Request
+
+from app.utils.redis_utils import get_redis
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# ----------------------
+# Configuration
+# ----------------------
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "1") != "0"
+# "memory" (per process) or "redis" (shared between workers / hosts)
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory")
+# Only trust X-Forwarded-For when running behind our own proxy
+TRUST_FORWARDED_FOR = os.getenv("TRUST_FORWARDED_FOR", "0") == "1"
+
+
+# ----------------------
+# Backends
+# ----------------------
+class InMemoryBucketBackend:
+    """Token buckets kept in this process. Limits are per worker."""
+
+    unavailable_errors = ()
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self._buckets = {}  # key -> (tokens, last_refill, full_at)
+        self._lock = threading.Lock()
+
+    def take(self, key: str, capacity: float, refill_rate: float, cost: float = 1) -> float:
+        """Consume `cost` tokens. Returns 0 if allowed, else seconds until allowed."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, last, _ = self._buckets.get(key, (capacity, now, now))
+            tokens = min(capacity, tokens + (now - last) * refill_rate)
+
+            if tokens >= cost:
+                tokens -= cost
+                wait = 0.0
+            else:
+                wait = (cost - tokens) / refill_rate
+
+            full_at = now + (capacity - tokens) / refill_rate
+            self._buckets[key] = (tokens, now, full_at)
+
+            if len(self._buckets) > self.max_keys:
+                self._prune(now)
+        return wait
+
+    def reset(self, key: str):
+        with self._lock:
+            self._buckets.pop(key, None)
+
+    def _prune(self, now: float):
+        # Buckets that have refilled completely carry no state worth keeping
+        self._buckets = {k: v for k, v in self._buckets.items() if v[2] > now}
+        if len(self._buckets) > self.max_keys:
+            # Key flood: keep the most recently touched half
+            newest = sorted(self._buckets.items(), key=lambda kv: kv[1][1], reverse=True)
+            self._buckets = dict(newest[: self.max_keys // 2])
+
+
+class RedisBucketBackend:
+    """Token buckets shared through Redis, updated atomically with a Lua script."""
+
+    SCRIPT = """
+    local capacity = tonumber(ARGV[1])
+    local rate = tonumber(ARGV[2])
+    local cost = tonumber(ARGV[3])
+    local t = redis.call('TIME')
+    local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+
+    local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+    local tokens = tonumber(state[1]) or capacity
+    local ts = tonumber(state[2]) or now
+    tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+
+    local wait = 0
+    if tokens >= cost then
+        tokens = tokens - cost
+    else
+        wait = (cost - tokens) / rate
+    end
+
+    redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+    redis.call('PEXPIRE', KEYS[1], math.ceil((capacity - tokens) / rate * 1000) + 1000)
+    return tostring(wait)
+    """
+
+    def __init__(self, url: str = None):
+        # Built at import: a missing redis package or REDIS_URL stops startup
+        # instead of silently switching rate limiting off
+        import redis
+
+        self.url = url
+        self.unavailable_errors = (redis.ConnectionError, redis.TimeoutError)
+        self._script = get_redis(url).register_script(self.SCRIPT)
+
+    def take(self, key: str, capacity: float, refill_rate: float, cost: float = 1) -> float:
+        return float(self._script(keys=[key], args=[capacity, refill_rate, cost]))
+
+    def reset(self, key: str):
+        get_redis(self.url).delete(key)
+
+
+_backend = RedisBucketBackend() if RATE_LIMIT_BACKEND == "redis" else InMemoryBucketBackend()
+
+
+def set_backend(backend):
+    """Swap the bucket backend (e.g. for a shared store)."""
+    global _backend
+    _backend = backend
+
+
+def get_client_ip(request: Request) -> str:
+    if TRUST_FORWARDED_FOR:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    return request.client.host if request.client else "unknown"
+
+
+# ----------------------
+# Limits
+# ----------------------
+class RateLimit:
+    """
+    Token-bucket limit for one route.
+
+    Use the instance as a dependency to limit by client IP, and call
+    `check_identifier()` from the handler once the email/phone is parsed.
+    `ip` and `identifier` are (requests, per_seconds) tuples.
+    """
+
+    def __init__(self, scope: str, ip=(20, 60), identifier=(5, 60)):
+        self.scope = scope
+        self.ip = ip
+        self.identifier = identifier
+
+    def _take(self, key: str, limit):
+        if not RATE_LIMIT_ENABLED or not limit:
+            return
+        capacity, per_seconds = limit
+        try:
+            wait = _backend.take(f"rl:{self.scope}:{key}", capacity, capacity / per_seconds)
+        except getattr(_backend, "unavailable_errors", ()) as e:
+            # Fail open on an unreachable store only: an outage must not take
+            # logins down with it. Anything else is a bug and surfaces as one.
+            logger.warning("Rate limiter unavailable, request let through: %s", e)
+            return
+        if wait > 0:
+            raise HTTPException(
+                status_code=429,
+                detail="Too many requests. Please try again later.",
+                headers={"Retry-After": str(max(1, math.ceil(wait)))},
+            )
+
+    def __call__(self, request: Request):
+        self._take(f"ip:{get_client_ip(request)}", self.ip)
+
+    def check_identifier(self, identifier: str):
+        if identifier:
+            self._take(f"id:{identifier.strip().lower()}", self.identifier)
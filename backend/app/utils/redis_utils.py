@@ -0,0 +1,25 @@
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Shared Redis used by the pluggable backends (rate limits, TTL stores, ...).
+# Nothing imports the redis package unless a URL is configured.
+REDIS_URL = os.getenv("REDIS_URL")
+
+_clients = {}
+
+
+def get_redis(url: str = None):
+    """Return a cached Redis client for `url` (defaults to REDIS_URL)."""
+    url = url or REDIS_URL
+    if not url:
+        raise RuntimeError("REDIS_URL is not configured")
+
+    client = _clients.get(url)
+    if client is None:
+        import redis  # imported lazily: only deployments with REDIS_URL need it
+
+        client = redis.Redis.from_url(url, decode_responses=True)
+        _clients[url] = client
+    return client
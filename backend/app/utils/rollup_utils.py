@@ -0,0 +1,325 @@
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+
+import pytz
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app import models
+from app.utils.counter_utils import increment, is_counted
+
+# Rollup buckets use the shop's local time, like Order.created_at
+india = pytz.timezone("Asia/Kolkata")
+
+
+def local_bucket(created_at: datetime):
+    """Return (day, hour) of an order timestamp in IST."""
+    if created_at.tzinfo is not None:
+        created_at = created_at.astimezone(india)
+    return created_at.date(), created_at.hour
+
+
+def local_today() -> date:
+    """Today's rollup day (IST), whatever the server's timezone."""
+    return datetime.now(india).date()
+
+
+def order_lines(db: Session, order_id: int):
+    """[(product_id, quantity, price)] for an order, without loading ORM objects."""
+    return db.query(
+        models.OrderItem.product_id, models.OrderItem.quantity, models.OrderItem.price
+    ).filter(models.OrderItem.order_id == order_id).all()
+
+
+# ----------------------
+# Incremental updates (caller commits)
+# ----------------------
+def _record_sales(db: Session, order, lines, sign: int):
+    """Add (sign=1) or remove (sign=-1) an order's sales from the store rollups."""
+    if not order.store_id:
+        return
+    day, hour = local_bucket(order.created_at)
+    increment(db, models.StoreSalesRollup, {"store_id": order.store_id, "day": day, "hour": hour}, {
+        "order_count": sign,
+        "revenue": sign * (order.store_earnings or 0),
+        "delivery_fees": sign * (order.delivery_fee or 0),
+    })
+
+    per_product = defaultdict(lambda: [0, 0.0])
+    for product_id, quantity, price in lines:
+        per_product[product_id][0] += quantity or 0
+        per_product[product_id][1] += (quantity or 0) * (price or 0)
+    for product_id, (quantity, revenue) in per_product.items():
+        increment(db, models.ProductSalesRollup,
+                  {"store_id": order.store_id, "day": day, "product_id": product_id},
+                  {"quantity": sign * quantity, "revenue": sign * revenue})
+
+
+def _record_cancelled(db: Session, order, sign: int):
+    if order.store_id:
+        day, hour = local_bucket(order.created_at)
+        increment(db, models.StoreSalesRollup, {"store_id": order.store_id, "day": day, "hour": hour},
+                  {"cancelled_count": sign})
+
+
+def cube_key(order, category_id, status) -> dict:
+    return {
+        "day": local_bucket(order.created_at)[0],
+        "category_id": category_id or 0,
+        "store_id": order.store_id or 0,
+        "payment_method": (order.payment_method or "").lower(),
+        "status": (status or "").lower(),
+    }
+
+
+def _record_cube(db: Session, order, category_id, status, sign: int):
+    increment(db, models.OrderCube, cube_key(order, category_id, status), {
+        "order_count": sign,
+        "gmv": sign * (order.total_price or 0),
+        "delivery_fees": sign * (order.delivery_fee or 0),
+        "store_earnings": sign * (order.store_earnings or 0),
+    })
+
+
+def record_order(db: Session, order, lines, category_id=None):
+    """A new order: `lines` are (product_id, quantity, price); `category_id` is the store's."""
+    _record_sales(db, order, lines, 1)
+    _record_cube(db, order, category_id, order.status, 1)
+
+
+def record_status_change(db: Session, order, old_status, new_status, category_id=None):
+    """Move an order between status cells, and in or out of sales when (un)cancelled."""
+    if (old_status or "").lower() == (new_status or "").lower():
+        return
+    _record_cube(db, order, category_id, old_status, -1)
+    _record_cube(db, order, category_id, new_status, 1)
+
+    was, now = is_counted(old_status), is_counted(new_status)
+    if was != now:
+        sign = 1 if now else -1
+        _record_sales(db, order, order_lines(db, order.id), sign)
+        _record_cancelled(db, order, -sign)
+
+
+def record_deleted(db: Session, order, category_id=None):
+    """Forget a deleted order (call before its items are removed)."""
+    _record_cube(db, order, category_id, order.status, -1)
+    if is_counted(order.status):
+        _record_sales(db, order, order_lines(db, order.id), -1)
+    else:
+        _record_cancelled(db, order, -1)
+
+
+# ----------------------
+# Backfill
+# ----------------------
+def backfill_rollups(db: Session, start: date = None, end: date = None, store_id: int = None) -> int:
+    """Rebuild rollups and the order cube for [start, end] (inclusive, IST days)
+    from the orders table and its archive.
+
+    Existing rows in the range are replaced. Returns the number of orders read.
+    """
+    rollup_tables = [models.StoreSalesRollup, models.ProductSalesRollup, models.OrderCube]
+    existing = [db.query(table) for table in rollup_tables]
+    if start:
+        existing = [q.filter(table.day >= start) for q, table in zip(existing, rollup_tables)]
+    if end:
+        existing = [q.filter(table.day <= end) for q, table in zip(existing, rollup_tables)]
+    if store_id:
+        existing = [q.filter(table.store_id == store_id) for q, table in zip(existing, rollup_tables)]
+
+    store_totals = defaultdict(lambda: {"order_count": 0, "revenue": 0.0, "delivery_fees": 0.0, "cancelled_count": 0})
+    product_totals = defaultdict(lambda: {"quantity": 0, "revenue": 0.0})
+    cube_totals = defaultdict(lambda: {"order_count": 0, "gmv": 0.0, "delivery_fees": 0.0, "store_earnings": 0.0})
+
+    read = 0
+    for order_model, item_model in ((models.Order, models.OrderItem), (models.ArchivedOrder, models.ArchivedOrderItem)):
+        orders = db.query(
+            order_model.id, order_model.store_id, order_model.status, order_model.created_at,
+            order_model.store_earnings, order_model.delivery_fee, order_model.total_price,
+            order_model.payment_method, models.Store.category_id,
+        ).outerjoin(models.Store, models.Store.id == order_model.store_id)
+        if start:
+            orders = orders.filter(order_model.created_at >= datetime.combine(start, datetime.min.time()))
+        if end:
+            orders = orders.filter(order_model.created_at < datetime.combine(end + timedelta(days=1), datetime.min.time()))
+        if store_id:
+            orders = orders.filter(order_model.store_id == store_id)
+
+        order_buckets = {}
+        for order in orders.yield_per(1000):
+            read += 1
+            cell = cube_totals[tuple(cube_key(order, order.category_id, order.status).values())]
+            cell["order_count"] += 1
+            cell["gmv"] += order.total_price or 0
+            cell["delivery_fees"] += order.delivery_fee or 0
+            cell["store_earnings"] += order.store_earnings or 0
+
+            if not order.store_id:
+                continue
+            day, hour = local_bucket(order.created_at)
+            totals = store_totals[(order.store_id, day, hour)]
+            if is_counted(order.status):
+                totals["order_count"] += 1
+                totals["revenue"] += order.store_earnings or 0
+                totals["delivery_fees"] += order.delivery_fee or 0
+                order_buckets[order.id] = (order.store_id, day)
+            else:
+                totals["cancelled_count"] += 1
+
+        ids = list(order_buckets)
+        for i in range(0, len(ids), 1000):
+            chunk = ids[i:i + 1000]
+            lines = db.query(
+                item_model.order_id, item_model.product_id, item_model.quantity, item_model.price
+            ).filter(item_model.order_id.in_(chunk))
+            for order_id, product_id, quantity, price in lines:
+                store, day = order_buckets[order_id]
+                totals = product_totals[(store, day, product_id)]
+                totals["quantity"] += quantity or 0
+                totals["revenue"] += (quantity or 0) * (price or 0)
+
+    for q in existing:
+        q.delete(synchronize_session=False)
+    db.bulk_insert_mappings(models.StoreSalesRollup, [
+        {"store_id": s, "day": d, "hour": h, **totals} for (s, d, h), totals in store_totals.items()
+    ])
+    db.bulk_insert_mappings(models.ProductSalesRollup, [
+        {"store_id": s, "day": d, "product_id": p, **totals} for (s, d, p), totals in product_totals.items()
+    ])
+    cube_columns = ("day", "category_id", "store_id", "payment_method", "status")
+    db.bulk_insert_mappings(models.OrderCube, [
+        {**dict(zip(cube_columns, key)), **totals} for key, totals in cube_totals.items()
+    ])
+    db.commit()
+    return read
+
+
+# ----------------------
+# Range queries
+# ----------------------
+def sales_summary(db: Session, store_id: int, start: date, end: date, top: int = 10) -> dict:
+    """Daily revenue, orders per hour and top products for one store."""
+    in_range = [
+        models.StoreSalesRollup.store_id == store_id,
+        models.StoreSalesRollup.day >= start,
+        models.StoreSalesRollup.day <= end,
+    ]
+    daily = db.query(
+        models.StoreSalesRollup.day,
+        func.sum(models.StoreSalesRollup.order_count),
+        func.sum(models.StoreSalesRollup.revenue),
+        func.sum(models.StoreSalesRollup.delivery_fees),
+        func.sum(models.StoreSalesRollup.cancelled_count),
+    ).filter(*in_range).group_by(models.StoreSalesRollup.day).order_by(models.StoreSalesRollup.day).all()
+
+    hourly = dict(
+        db.query(models.StoreSalesRollup.hour, func.sum(models.StoreSalesRollup.order_count))
+        .filter(*in_range)
+        .group_by(models.StoreSalesRollup.hour)
+        .all()
+    )
+
+    quantity = func.sum(models.ProductSalesRollup.quantity).label("quantity")
+    top_products = (
+        db.query(models.ProductSalesRollup.product_id, models.Product.name, quantity,
+                 func.sum(models.ProductSalesRollup.revenue))
+        .join(models.Product, models.Product.id == models.ProductSalesRollup.product_id)
+        .filter(
+            models.ProductSalesRollup.store_id == store_id,
+            models.ProductSalesRollup.day >= start,
+            models.ProductSalesRollup.day <= end,
+        )
+        .group_by(models.ProductSalesRollup.product_id, models.Product.name)
+        .having(quantity > 0)
+        .order_by(quantity.desc())
+        .limit(top)
+        .all()
+    )
+
+    daily = [
+        {"day": day, "orders": int(orders or 0), "revenue": round(revenue or 0, 2),
+         "delivery_fees": round(fees or 0, 2), "cancelled": int(cancelled or 0)}
+        for day, orders, revenue, fees, cancelled in daily
+    ]
+    return {
+        "store_id": store_id,
+        "start": start,
+        "end": end,
+        "totals": {
+            "orders": sum(d["orders"] for d in daily),
+            "revenue": round(sum(d["revenue"] for d in daily), 2),
+            "delivery_fees": round(sum(d["delivery_fees"] for d in daily), 2),
+            "cancelled": sum(d["cancelled"] for d in daily),
+        },
+        "daily": daily,
+        "hourly": [{"hour": hour, "orders": int(hourly.get(hour) or 0)} for hour in range(24)],
+        "top_products": [
+            {"product_id": product_id, "name": name, "quantity": int(qty or 0), "revenue": round(revenue or 0, 2)}
+            for product_id, name, qty, revenue in top_products
+        ],
+    }
+
+
+CUBE_DIMENSIONS = {
+    "category": models.OrderCube.category_id,
+    "store": models.OrderCube.store_id,
+    "payment_method": models.OrderCube.payment_method,
+    "status": models.OrderCube.status,
+}
+
+
+def cube_query(db: Session, start: date, end: date, group_by=(), granularity: str = "total",
+               filters: dict = None) -> list:
+    """Aggregate the order cube over [start, end].
+
+    `group_by` is a subset of CUBE_DIMENSIONS, `granularity` is "day", "month"
+    or "total" and `filters` maps dimension names to a required value.
+    """
+    columns = [CUBE_DIMENSIONS[name].label(name) for name in group_by]
+    if granularity != "total":
+        columns.insert(0, models.OrderCube.day.label("day"))
+    measures = [
+        func.sum(models.OrderCube.order_count),
+        func.sum(models.OrderCube.gmv),
+        func.sum(models.OrderCube.delivery_fees),
+        func.sum(models.OrderCube.store_earnings),
+    ]
+
+    query = db.query(*columns, *measures).filter(models.OrderCube.day >= start, models.OrderCube.day <= end)
+    for name, value in (filters or {}).items():
+        query = query.filter(CUBE_DIMENSIONS[name] == value)
+    if columns:
+        query = query.group_by(*[c.element for c in columns])
+
+    keys = [c.name for c in columns]
+    rows = defaultdict(lambda: [0, 0.0, 0.0, 0.0])
+    for row in query:
+        key = list(row[:len(keys)])
+        if granularity == "month":
+            key[0] = key[0].strftime("%Y-%m")
+        totals = rows[tuple(key)]
+        for i, value in enumerate(row[len(keys):]):
+            totals[i] += value or 0
+
+    return [
+        {**dict(zip(keys, key)), "orders": int(orders), "gmv": round(gmv, 2),
+         "delivery_fees": round(fees, 2), "store_earnings": round(earnings, 2)}
+        for key, (orders, gmv, fees, earnings) in sorted(rows.items(), key=lambda kv: tuple(str(k) for k in kv[0]))
+        if orders
+    ]
+
+
+if __name__ == "__main__":
+    import sys
+
+    from app.database import SessionLocal
+
+    # python -m app.utils.rollup_utils [START_DAY] [END_DAY]   (YYYY-MM-DD)
+    args = [date.fromisoformat(arg) for arg in sys.argv[1:3]]
+    db = SessionLocal()
+    try:
+        count = backfill_rollups(db, *args)
+        print(f"✅ Sales rollups rebuilt from {count} orders.")
+    finally:
+        db.close()
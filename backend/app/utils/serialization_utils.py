@@ -0,0 +1,355 @@
+from collections import defaultdict
+from typing import Optional
+
+import orjson
+from fastapi import HTTPException
+from sqlalchemy import select, union
+from sqlalchemy.orm import Session
+from starlette.responses import Response
+
+from app import models
+
+# Fast path for hot list endpoints: select only the columns a response needs
+# as plain rows, build dicts shaped like the pydantic schemas and encode them
+# with orjson. Skips ORM hydration and per-object orm_mode validation.
+#
+# List endpoints also take a sparse fieldset, e.g.
+# `?fields=id,name,price,image` or `?fields=id,status,items.quantity,items.product.name`,
+# which narrows both the SELECT and the payload.
+
+
+class FastJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+
+def chunks(values, size: int = 1000):
+    values = list(values)
+    for i in range(0, len(values), size):
+        yield values[i:i + size]
+
+
+# ----------------------
+# Sparse fieldsets
+# ----------------------
+SUBCATEGORY_TREE = dict.fromkeys(("id", "name", "store_id"))
+PRODUCT_TREE = {
+    **dict.fromkeys(("id", "name", "price", "image", "available", "store_id", "subcategory_id")),
+    "subcategory": SUBCATEGORY_TREE,
+    "stock": None,
+}
+STORE_TREE = dict.fromkeys((
+    "id", "name", "image", "category_id", "owner_id", "contact_number",
+    "open_time", "close_time", "latitude", "longitude", "is_open", "status_text",
+))
+USER_TREE = dict.fromkeys(("id", "name", "email", "role"))
+ADDRESS_TREE = dict.fromkeys(("id", "user_id", "address_line", "city", "state", "pincode", "latitude", "longitude"))
+ITEM_TREE = {"id": None, "product": PRODUCT_TREE, "quantity": None, "price": None}
+ORDER_TREE = {
+    **dict.fromkeys((
+        "id", "total_price", "store_earnings", "status", "created_at", "address_id", "store_name",
+        "contact_number", "payment_method", "order_title", "delivery_fee", "version",
+    )),
+    "user": USER_TREE,
+    "address": ADDRESS_TREE,
+    "items": ITEM_TREE,
+}
+
+
+def parse_fields(fields: Optional[str], tree: dict, include: Optional[str] = None) -> Optional[dict]:
+    """
+    Parse `?fields=` (dotted paths) against a schema tree into a nested spec,
+    e.g. {"id": None, "items": {"product": {"name": None}}} where None means
+    "the whole value". Returns None when nothing was narrowed.
+
+    `include` lists which nested objects to embed; when given, the others are
+    left out (scalar fields are unaffected unless `fields` is also given).
+    """
+    if not fields and include is None:
+        return None
+
+    if fields:
+        spec = {}
+        for path in filter(None, (p.strip() for p in fields.split(","))):
+            node, allowed = spec, tree
+            parts = path.split(".")
+            for depth, part in enumerate(parts):
+                if not isinstance(allowed, dict) or part not in allowed:
+                    raise HTTPException(status_code=400, detail=f"Unknown field: {path}")
+                if depth == len(parts) - 1:
+                    node[part] = None
+                elif node.get(part, {}) is None:
+                    break  # already asked for the whole object
+                else:
+                    node = node.setdefault(part, {})
+                allowed = allowed[part]
+        spec["id"] = None
+    else:
+        spec = {name: None for name, sub in tree.items() if sub is None}
+
+    if include is not None:
+        relations = {name for name, sub in tree.items() if sub is not None}
+        wanted = set(filter(None, (r.strip() for r in include.split(","))))
+        unknown = wanted - relations
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown include: {', '.join(sorted(unknown))}")
+        for name in relations - wanted:
+            spec.pop(name, None)
+        for name in wanted:
+            spec.setdefault(name, None)
+    return spec
+
+
+def wants(spec: Optional[dict], name: str) -> bool:
+    return spec is None or name in spec
+
+
+def subspec(spec: Optional[dict], name: str) -> Optional[dict]:
+    return None if spec is None else spec.get(name)
+
+
+def merge_specs(a: Optional[dict], b: Optional[dict]) -> Optional[dict]:
+    if a is None or b is None:
+        return None
+    merged = dict(a)
+    for name, sub in b.items():
+        merged[name] = merge_specs(merged[name], sub) if name in merged else sub
+    return merged
+
+
+def shape(value, spec: Optional[dict]):
+    """Trim a dict (or list of dicts) built from a wider projection down to `spec`."""
+    if spec is None or value is None:
+        return value
+    if isinstance(value, list):
+        return [shape(v, spec) for v in value]
+    return {name: shape(value[name], sub) for name, sub in spec.items() if name in value}
+
+
+def _columns(column_map: dict, spec: Optional[dict], tree: dict) -> list:
+    columns = {}
+    for name in (tree if spec is None else ["id", *spec]):
+        for column in column_map[name]:
+            columns.setdefault(column.key, column)
+    return list(columns.values())
+
+
+# ----------------------
+# Products (shape of schemas.ProductOut)
+# ----------------------
+_products = models.Product.__table__
+_subcategories = models.ProductSubCategory.__table__
+
+_PRODUCT_COLUMNS = {
+    **{name: (_products.c[name],) for name in PRODUCT_TREE if name != "subcategory"},
+    "subcategory": (
+        _products.c.subcategory_id,
+        _subcategories.c.name.label("subcategory_name"),
+        _subcategories.c.store_id.label("subcategory_store_id"),
+    ),
+}
+
+
+def product_query(db: Session, *extra_columns, spec: Optional[dict] = None):
+    """Products (only the columns in `spec`) joined to their subcategory, as rows."""
+    query = db.query(*extra_columns, *_columns(_PRODUCT_COLUMNS, spec, PRODUCT_TREE)).select_from(_products)
+    if wants(spec, "subcategory"):
+        query = query.outerjoin(_subcategories, _subcategories.c.id == _products.c.subcategory_id)
+    return query
+
+
+def product_dict(row, spec: Optional[dict] = None) -> dict:
+    data = {}
+    for name in (PRODUCT_TREE if spec is None else spec):
+        if name == "subcategory":
+            subcategory = None
+            if row.subcategory_id is not None and row.subcategory_name is not None:
+                subcategory = shape({
+                    "id": row.subcategory_id,
+                    "name": row.subcategory_name,
+                    "store_id": row.subcategory_store_id,
+                }, spec and spec["subcategory"])
+            data[name] = subcategory
+        elif name == "available":
+            data[name] = bool(row.available)
+        else:
+            data[name] = getattr(row, name)
+    return data
+
+
+# ----------------------
+# Stores (shape of schemas.StoreOut)
+# ----------------------
+_stores = models.Store.__table__
+
+_STORE_COLUMNS = {
+    **{name: (_stores.c[name],) for name in STORE_TREE if name not in ("is_open", "status_text")},
+    "is_open": (_stores.c.is_closed_today, _stores.c.open_time, _stores.c.close_time),
+    "status_text": (_stores.c.is_closed_today, _stores.c.open_time, _stores.c.close_time),
+}
+
+
+def store_query(db: Session, spec: Optional[dict] = None):
+    return db.query(*_columns(_STORE_COLUMNS, spec, STORE_TREE)).select_from(_stores)
+
+
+def store_dict(row, spec: Optional[dict] = None, get_status=None) -> dict:
+    """`get_status(row)` returns (is_open, status_text), as the routers compute it."""
+    data = {}
+    names = STORE_TREE if spec is None else spec
+    if "is_open" in names or "status_text" in names:
+        data["is_open"], data["status_text"] = get_status(row) if get_status else (None, None)
+    for name in names:
+        if name not in data:
+            data[name] = getattr(row, name)
+    return shape(data, spec)
+
+
+# ----------------------
+# Orders (shape of schemas.OrderOut)
+# ----------------------
+def _by_id(db: Session, table, spec: Optional[dict], tree: dict, ids) -> dict:
+    fields = ["id", *(tree if spec is None else spec)]
+    columns = [table.c[f] for f in dict.fromkeys(fields)]
+    rows = {}
+    for chunk in chunks(set(ids)):
+        for row in db.query(*columns).filter(table.c.id.in_(chunk)):
+            rows[row.id] = dict(row._mapping)
+    return rows
+
+
+def fetch_orders(db: Session, user_id: int = None, store_ids=None, order_ids=None,
+                 limit: int = None, offset: int = 0, spec: Optional[dict] = None,
+                 orders_table=None, items_table=None, include_archive: bool = False) -> list:
+    """
+    Orders newest first as OrderOut-shaped dicts, in at most four flat queries
+    (orders, items+products, users, addresses). `spec` comes from parse_fields;
+    relations that are not asked for are not queried. `include_archive` also
+    reads orders_archive and merges both into one page.
+    """
+    orders_table = orders_table if orders_table is not None else models.Order.__table__
+    items_table = items_table if items_table is not None else models.OrderItem.__table__
+    sources = [(orders_table, items_table)]
+    if include_archive:
+        sources.append((models.ArchivedOrder.__table__, models.ArchivedOrderItem.__table__))
+
+    scalar = [name for name, sub in ORDER_TREE.items()
+              if sub is None and name != "order_title" and wants(spec, name)]
+    if wants(spec, "user"):
+        scalar.append("user_id")
+    if wants(spec, "address") and "address_id" not in scalar:
+        scalar.append("address_id")
+    # Needed to merge sources and to attach items
+    scalar = list(dict.fromkeys(["id", "created_at", *scalar]))
+
+    orders = []
+    for table, source_items in sources:
+        query = db.query(*[table.c[f] for f in scalar])
+        if user_id is not None:
+            query = query.filter(table.c.user_id == user_id)
+        if store_ids is not None:
+            query = query.filter(table.c.store_id.in_(list(store_ids)))
+        if order_ids is not None:
+            query = query.filter(table.c.id.in_(list(order_ids)))
+        query = query.order_by(table.c.created_at.desc(), table.c.id.desc())
+        if len(sources) == 1:
+            if offset:
+                query = query.offset(offset)
+            if limit:
+                query = query.limit(limit)
+        elif limit:
+            # The page may come from either side: take enough of each to cut it after merging
+            query = query.limit(offset + limit)
+        orders.extend({**row._mapping, "_items": source_items} for row in query)
+    if len(sources) > 1:
+        orders.sort(key=lambda o: (o["created_at"], o["id"]), reverse=True)
+        orders = orders[offset:offset + limit] if limit else orders[offset:]
+    if not orders:
+        return []
+
+    # Items are also needed to derive order_title and the store_earnings fallback
+    item_spec = subspec(spec, "items") if wants(spec, "items") else {}
+    if wants(spec, "order_title"):
+        item_spec = merge_specs(item_spec, {"product": {"name": None}})
+    if wants(spec, "store_earnings") and any(o["store_earnings"] is None for o in orders):
+        item_spec = merge_specs(item_spec, {"price": None, "quantity": None})
+
+    items = defaultdict(list)
+    if item_spec is None or item_spec:
+        product_spec = subspec(item_spec, "product") if wants(item_spec, "product") else {}
+        for _, source_items in sources:
+            for chunk in chunks(o["id"] for o in orders if o["_items"] is source_items):
+                rows = (
+                    product_query(db, source_items.c.id.label("item_id"), source_items.c.order_id,
+                                  source_items.c.quantity, source_items.c.price.label("item_price"),
+                                  spec=product_spec)
+                    .join(source_items, source_items.c.product_id == _products.c.id)
+                    .filter(source_items.c.order_id.in_(chunk))
+                    .order_by(source_items.c.id)
+                )
+                for row in rows:
+                    items[row.order_id].append({
+                        "id": row.item_id,
+                        "product": product_dict(row, product_spec),
+                        "quantity": row.quantity,
+                        "price": row.item_price,
+                    })
+
+    users = {}
+    if wants(spec, "user"):
+        users = _by_id(db, models.User.__table__, subspec(spec, "user"), USER_TREE, (o["user_id"] for o in orders))
+    addresses = {}
+    if wants(spec, "address"):
+        addresses = _by_id(db, models.Address.__table__, subspec(spec, "address"), ADDRESS_TREE,
+                           (o["address_id"] for o in orders))
+
+    for order in orders:
+        order_items = items.get(order["id"], [])
+        if wants(spec, "order_title"):
+            if order_items:
+                first_product = order_items[0]["product"]["name"]
+                more = len(order_items) - 1
+                order["order_title"] = f"{first_product} +{more} more" if more else first_product
+            else:
+                order["order_title"] = "Order"
+        if wants(spec, "store_earnings") and order["store_earnings"] is None:
+            order["store_earnings"] = sum(i["price"] * i["quantity"] for i in order_items)
+        if wants(spec, "items"):
+            order["items"] = shape(order_items, subspec(spec, "items"))
+        if wants(spec, "user"):
+            order["user"] = shape(users.get(order["user_id"]), subspec(spec, "user"))
+        if wants(spec, "address"):
+            order["address"] = shape(addresses.get(order["address_id"]), subspec(spec, "address"))
+    names = ORDER_TREE if spec is None else spec
+    return [{name: order[name] for name in names if name in order} for order in orders]
+
+
+def order_etag_sources(criteria=None) -> list:
+    """
+    etag_utils sources for an order list: the orders (hot and archived) and
+    every product, subcategory, user and address their bodies embed, so a
+    restock or a rename changes the ETag as well. `criteria(model)` returns
+    the filters selecting the listed orders of `model`; None means all orders.
+    """
+    pairs = ((models.Order, models.OrderItem), (models.ArchivedOrder, models.ArchivedOrderItem))
+    embedded = (models.Product, models.ProductSubCategory, models.User, models.Address)
+    if criteria is None:
+        return [(orders,) for orders, _ in pairs] + [(model,) for model in embedded]
+
+    sources, product_ids, user_ids, address_ids = [], [], [], []
+    for orders, items in pairs:
+        where = criteria(orders)
+        sources.append((orders, *where))
+        product_ids.append(select(items.product_id).where(items.order_id.in_(select(orders.id).where(*where))))
+        user_ids.append(select(orders.user_id).where(*where))
+        address_ids.append(select(orders.address_id).where(*where))
+    products = models.Product.id.in_(union(*product_ids))
+    subcategory_ids = select(models.Product.subcategory_id).where(products)
+    return sources + [
+        (models.Product, products),
+        (models.ProductSubCategory, models.ProductSubCategory.id.in_(subcategory_ids)),
+        (models.User, models.User.id.in_(union(*user_ids))),
+        (models.Address, models.Address.id.in_(union(*address_ids))),
+    ]
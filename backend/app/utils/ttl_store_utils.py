@@ -0,0 +1,121 @@
+import json
+import threading
+import time
+
+from app.utils.redis_utils import get_redis
+
+
+class MemoryTTLStore:
+    """Small key/value store with per-key expiry, kept in this process."""
+
+    def __init__(self, sweep_every: int = 1000):
+        self._data = {}  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self._ops = 0
+        self.sweep_every = sweep_every
+
+    def _live(self, key, now):
+        item = self._data.get(key)
+        if item is None:
+            return None
+        if item[0] <= now:
+            del self._data[key]
+            return None
+        return item
+
+    def _tick(self, now):
+        self._ops += 1
+        if self._ops >= self.sweep_every:
+            self._ops = 0
+            self._data = {k: v for k, v in self._data.items() if v[0] > now}
+
+    def get(self, key):
+        with self._lock:
+            item = self._live(key, time.monotonic())
+            return item[1] if item else None
+
+    def set(self, key, value, ttl: float):
+        now = time.monotonic()
+        with self._lock:
+            self._data[key] = (now + ttl, value)
+            self._tick(now)
+
+    def add(self, key, value, ttl: float) -> bool:
+        """Set `key` only if it does not exist. Returns True if it was set."""
+        now = time.monotonic()
+        with self._lock:
+            if self._live(key, now):
+                return False
+            self._data[key] = (now + ttl, value)
+            self._tick(now)
+            return True
+
+    def pop(self, key):
+        """Atomically read and delete `key`; only one caller gets the value."""
+        with self._lock:
+            item = self._live(key, time.monotonic())
+            if item is None:
+                return None
+            del self._data[key]
+            return item[1]
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def incr(self, key, ttl: float) -> int:
+        """Increment a counter; `ttl` applies when the counter is created."""
+        now = time.monotonic()
+        with self._lock:
+            item = self._live(key, now)
+            expires_at, value = item if item else (now + ttl, 0)
+            self._data[key] = (expires_at, value + 1)
+            self._tick(now)
+            return value + 1
+
+
+class RedisTTLStore:
+    """Same interface backed by Redis, for state shared between workers."""
+
+    def __init__(self, url: str = None, prefix: str = "ttl:"):
+        self.url = url
+        self.prefix = prefix
+
+    @property
+    def redis(self):
+        return get_redis(self.url)
+
+    def get(self, key):
+        raw = self.redis.get(self.prefix + key)
+        return json.loads(raw) if raw is not None else None
+
+    def set(self, key, value, ttl: float):
+        self.redis.set(self.prefix + key, json.dumps(value), px=int(ttl * 1000))
+
+    def add(self, key, value, ttl: float) -> bool:
+        return bool(self.redis.set(self.prefix + key, json.dumps(value), px=int(ttl * 1000), nx=True))
+
+    def pop(self, key):
+        pipe = self.redis.pipeline()  # MULTI/EXEC, so GET + DEL is atomic
+        pipe.get(self.prefix + key)
+        pipe.delete(self.prefix + key)
+        raw, deleted = pipe.execute()
+        if raw is None or not deleted:
+            return None
+        return json.loads(raw)
+
+    def delete(self, key):
+        self.redis.delete(self.prefix + key)
+
+    def incr(self, key, ttl: float) -> int:
+        value = self.redis.incr(self.prefix + key)
+        if value == 1:
+            self.redis.pexpire(self.prefix + key, int(ttl * 1000))
+        return value
+
+
+def make_ttl_store(backend: str, prefix: str):
+    """Build a store from a backend name ("memory" or "redis")."""
+    if backend == "redis":
+        return RedisTTLStore(prefix=prefix)
+    return MemoryTTLStore()
@@ -0,0 +1,54 @@
+"""
+Standalone job worker.
+
+    python -m app.worker               run queued and periodic jobs until SIGTERM
+    python -m app.worker enqueue NAME  queue a job by hand (e.g. rollups.backfill)
+    python -m app.worker stats         show queue counts
+    python -m app.worker requeue-dead  retry every dead job
+
+Run it next to the API with JOBS_EMBEDDED_WORKER=false so request workers
+only enqueue.
+"""
+import json
+import signal
+import sys
+import threading
+
+from app import jobs
+from app.utils.job_utils import JOB_WORKER_THREADS, enqueue, job_queue, job_worker
+
+
+def run():
+    worker = job_worker
+    worker.periodic = jobs.PERIODIC
+    stopped = threading.Event()
+
+    def shutdown(signum, frame):
+        print("⚠️ Job worker stopping, finishing running jobs...")
+        stopped.set()
+
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+    worker.start()
+    print(f"✅ Job worker started ({JOB_WORKER_THREADS} threads).")
+    while not stopped.wait(1):
+        pass
+    worker.stop()
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "run"
+    if command == "run":
+        run()
+    elif command == "enqueue":
+        # python -m app.worker enqueue rollups.backfill '{"start": "2026-01-01"}'
+        payload = json.loads(sys.argv[3]) if len(sys.argv) > 3 else {}
+        print(f"✅ Queued job {enqueue(sys.argv[2], payload)}.")
+    elif command == "stats":
+        for row in job_queue.stats():
+            print(f"{row['name']:<28} {row['status']:<8} {row['count']}")
+    elif command == "requeue-dead":
+        print(f"✅ Requeued {job_queue.requeue_dead()} dead jobs.")
+    else:
+        print(__doc__)
+        sys.exit(2)
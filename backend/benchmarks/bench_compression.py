@@ -0,0 +1,89 @@
+"""
+Bytes on the wire for the largest JSON responses, uncompressed vs. gzip and
+brotli through CompressionMiddleware.
+
+    python benchmarks/bench_compression.py                   # 2k orders in a temporary SQLite file
+    python benchmarks/bench_compression.py --orders 10000 --mbps 5 --repeat 10
+
+Seeds one store (bench_order_lists.seed), then requests the owner's order
+history, the store's product list and the category list through the full
+app with Accept-Encoding identity, gzip and br. Prints the body size as
+sent, the server time (compression included) and what the transfer alone
+would take at --mbps, the bandwidth of a mobile client. The decoded bodies
+are checked against the identity response. Bodies below COMPRESSION_MIN_SIZE
+are expected to go out uncompressed.
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+os.environ.update(
+    DATABASE_URL=f"sqlite:///{tempfile.mkdtemp(prefix='bench-compression-')}/bench.db",
+    SQL_ECHO="false",
+    FAST_START="true",
+    BACKGROUND_START_DELAY="3600",
+    RATE_LIMIT_ENABLED="0",
+)
+os.environ.setdefault("SMS_PROVIDER", "fake")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app import models  # noqa: E402
+from app.auth import get_current_user  # noqa: E402
+from app.database import SessionLocal, engine  # noqa: E402
+from app.main import app  # noqa: E402
+from app.utils.compression_utils import supported_encodings  # noqa: E402
+from bench_order_lists import seed  # noqa: E402
+
+
+def measure(client, path: str, encoding: str, repeat: int) -> tuple:
+    """(encoding sent, bytes as sent, median server ms, decoded body)."""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        response = client.get(path, headers={"Accept-Encoding": encoding})
+        timings.append(time.perf_counter() - started)
+        assert response.status_code == 200, (path, response.status_code, response.text[:200])
+    sent_as = response.headers.get("content-encoding", "identity")
+    return sent_as, response.num_bytes_downloaded, statistics.median(timings) * 1000, response.content
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--mbps", type=float, default=10, help="client bandwidth for the transfer estimate")
+    args = parser.parse_args()
+
+    models.Base.metadata.create_all(engine)
+    db = SessionLocal()
+    store_id = seed(db, args.orders)
+    owner = db.query(models.User).filter(models.User.role == "store_owner").one()
+    db.expunge(owner)
+    db.close()
+    app.dependency_overrides[get_current_user] = lambda: owner
+
+    paths = ["/catalog/orders", f"/catalog/stores/{store_id}/products", "/catalog/categories/all"]
+    encodings = ["identity", *reversed(supported_encodings())]
+    with TestClient(app) as client:
+        for path in paths:
+            print(f"GET {path}")
+            baseline = None
+            for encoding in encodings:
+                sent_as, sent, server_ms, body = measure(client, path, encoding, args.repeat)
+                if baseline is None:
+                    baseline = (sent, body)
+                assert body == baseline[1], f"{encoding} body differs from identity"
+                transfer_ms = sent * 8 / (args.mbps * 1_000_000) * 1000
+                # Bodies under COMPRESSION_MIN_SIZE go out as they are
+                label = encoding if sent_as == encoding else f"{encoding}->{sent_as}"
+                print(f"  {label:<18} {sent:>11,} bytes  {sent / baseline[0]:6.1%}  "
+                      f"server {server_ms:7.1f} ms  transfer {transfer_ms:8.1f} ms @ {args.mbps:g} Mbit/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Email throughput: one SMTP session per message (before) vs. the pooled,
+batched outbox dispatcher (after), against a local aiosmtpd sink.
+
+    pip install aiosmtpd
+    python benchmarks/bench_email.py                          # 500 messages, 20 ms handshake, 2 ms per message
+    python benchmarks/bench_email.py --messages 2000 --handshake-ms 150 --message-ms 20 --workers 4
+
+"Before" is what the old BackgroundTasks + FastMail path did for every
+verification email: connect, EHLO (+ STARTTLS + AUTH on a real server),
+send, QUIT. "After" queues every message in a temporary outbox and times
+email_utils.EmailDispatcher until the sink has received all of them.
+
+The sink delays each EHLO by --handshake-ms and each DATA by --message-ms
+to stand in for the round trips and TLS/AUTH cost of a remote provider;
+use numbers measured against yours (e.g. `time openssl s_client
+-starttls smtp -connect smtp.gmail.com:587 </dev/null` for the handshake).
+"""
+import argparse
+import asyncio
+import os
+import smtplib
+import sys
+import tempfile
+import threading
+import time
+
+from aiosmtpd.controller import Controller
+
+PORT = int(os.getenv("BENCH_SMTP_PORT", 8025))
+
+# email_utils reads its SMTP settings at import time
+os.environ.update(MAIL_SERVER="127.0.0.1", MAIL_PORT=str(PORT), MAIL_STARTTLS="0", MAIL_SSL_TLS="0",
+                  MAIL_USERNAME="", MAIL_PASSWORD="", MAIL_FROM="bench@example.com",
+                  OUTBOX_PATH=os.path.join(tempfile.mkdtemp(prefix="bench-email-"), "outbox.sqlite3"))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils import email_utils  # noqa: E402
+from app.utils.outbox_utils import Outbox  # noqa: E402
+
+
+class Sink:
+    """aiosmtpd handler that counts deliveries after a simulated provider delay."""
+
+    def __init__(self, handshake: float, per_message: float):
+        self.handshake = handshake
+        self.per_message = per_message
+        self.received = 0
+        self.sessions = 0
+        self.done = threading.Event()
+        self.expected = None
+
+    def reset(self, expected: int):
+        self.received = self.sessions = 0
+        self.expected = expected
+        self.done.clear()
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        self.sessions += 1
+        await asyncio.sleep(self.handshake)
+        session.host_name = hostname
+        return responses
+
+    async def handle_DATA(self, server, session, envelope):
+        await asyncio.sleep(self.per_message)
+        self.received += 1
+        if self.received == self.expected:
+            self.done.set()
+        return "250 Message accepted for delivery"
+
+
+def payload(n: int) -> dict:
+    return {"to": f"user{n}@example.com", "subject": "Your TownDrop Verification OTP",
+            "html": f"<h2>Hello user{n},</h2><h1>{n % 1_000_000:06d}</h1>"}
+
+
+def before(sink: Sink, messages: int) -> float:
+    sink.reset(messages)
+    started = time.perf_counter()
+    for n in range(messages):
+        with smtplib.SMTP("127.0.0.1", PORT, timeout=30) as conn:
+            conn.send_message(email_utils.build_message(payload(n)))
+    sink.done.wait(60)
+    return time.perf_counter() - started
+
+
+def after(sink: Sink, messages: int, workers: int, batch_size: int) -> float:
+    outbox = Outbox("bench")
+    for n in range(messages):
+        outbox.put(payload(n))
+    dispatcher = email_utils.EmailDispatcher(outbox, email_utils.SMTPConnectionPool(size=workers),
+                                             workers=workers, batch_size=batch_size, poll_interval=0.05)
+    sink.reset(messages)
+    started = time.perf_counter()
+    dispatcher.start()
+    finished = sink.done.wait(300)
+    elapsed = time.perf_counter() - started
+    dispatcher.stop()
+    if not finished:
+        raise RuntimeError(f"dispatcher delivered {sink.received} of {messages} messages")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=500)
+    parser.add_argument("--handshake-ms", type=float, default=20)
+    parser.add_argument("--message-ms", type=float, default=2)
+    parser.add_argument("--workers", type=int, default=email_utils.EMAIL_POOL_SIZE)
+    parser.add_argument("--batch-size", type=int, default=email_utils.EMAIL_BATCH_SIZE)
+    args = parser.parse_args()
+
+    sink = Sink(args.handshake_ms / 1000, args.message_ms / 1000)
+    controller = Controller(sink, hostname="127.0.0.1", port=PORT)
+    controller.start()
+    try:
+        print(f"{args.messages} messages, {args.handshake_ms:g} ms handshake, {args.message_ms:g} ms per message")
+        results = {}
+        for name, run in (
+            ("before (session per message)", lambda: before(sink, args.messages)),
+            (f"after (pool of {args.workers}, batches of {args.batch_size})",
+             lambda: after(sink, args.messages, args.workers, args.batch_size)),
+        ):
+            elapsed = run()
+            results[name] = elapsed
+            print(f"{name:<40} {elapsed:7.2f}s  {args.messages / elapsed:8.0f} msg/s  {sink.sessions} SMTP sessions")
+        old, new = results.values()
+        print(f"speed-up x{old / new:.1f}")
+    finally:
+        controller.stop()
+
+
+if __name__ == "__main__":
+    main()
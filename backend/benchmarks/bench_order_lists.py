@@ -0,0 +1,171 @@
+"""
+Order history: ORM + orm_mode (before) vs. projected rows + orjson (after).
+
+    python benchmarks/bench_order_lists.py                      # 10k orders in a temporary SQLite file
+    python benchmarks/bench_order_lists.py --orders 50000 --repeat 5
+    python benchmarks/bench_order_lists.py --database-url mysql+pymysql://... --no-seed
+
+"Before" is the original /catalog/orders handler: selectinload the order
+graph, fill order_title / store_earnings on the ORM objects, validate each
+through schemas.OrderOut (orm_mode) and encode with jsonable_encoder +
+JSONResponse. "After" is serialization_utils.fetch_orders + FastJSONResponse.
+Both render a store owner's full history, the largest list the API serves;
+the script checks that both produce the same JSON before timing.
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+os.environ.setdefault("SQL_ECHO", "false")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+from sqlalchemy import create_engine  # noqa: E402
+from sqlalchemy.orm import selectinload, sessionmaker  # noqa: E402
+
+from app import models, schemas  # noqa: E402
+from app.utils import serialization_utils  # noqa: E402
+
+
+def seed(db, orders: int, users: int = 200, products: int = 50) -> int:
+    """One store with `orders` orders of 1-3 items. Returns the store id."""
+    random.seed(34)
+    owner = models.User(name="owner", email="owner@example.com", role="store_owner", hashed_password="x")
+    category = models.Category(name="Groceries")
+    db.add_all([owner, category])
+    db.flush()
+    store = models.Store(name="Corner Shop", category_id=category.id, owner_id=owner.id)
+    db.add(store)
+    db.flush()
+    db.bulk_insert_mappings(models.Product, [
+        {"id": i, "name": f"Product {i}", "price": round(random.uniform(10, 500), 2), "store_id": store.id}
+        for i in range(1, products + 1)
+    ])
+    db.bulk_insert_mappings(models.User, [
+        {"id": owner.id + i, "name": f"User {i}", "email": f"user{i}@example.com", "role": "user",
+         "hashed_password": "x"}
+        for i in range(1, users + 1)
+    ])
+    db.bulk_insert_mappings(models.Address, [
+        {"id": i, "user_id": owner.id + i, "address_line": f"{i} Main St", "city": "Bengaluru", "state": "KA",
+         "pincode": "560001"}
+        for i in range(1, users + 1)
+    ])
+    start = datetime(2026, 1, 1)
+    order_rows, item_rows = [], []
+    for order_id in range(1, orders + 1):
+        n = random.randint(1, users)
+        lines = [(random.randint(1, products), random.randint(1, 4), round(random.uniform(10, 500), 2))
+                 for _ in range(random.randint(1, 3))]
+        subtotal = sum(q * p for _, q, p in lines)
+        order_rows.append({
+            "id": order_id, "user_id": owner.id + n, "store_id": store.id, "address_id": n,
+            "total_price": subtotal + 20, "store_earnings": subtotal, "delivery_fee": 20,
+            "status": random.choice(["pending", "accepted", "completed", "delivered", "cancelled"]),
+            "store_name": store.name, "payment_method": "COD",
+            "created_at": start + timedelta(minutes=order_id),
+        })
+        item_rows.extend({"order_id": order_id, "product_id": p, "quantity": q, "price": price}
+                         for p, q, price in lines)
+    db.bulk_insert_mappings(models.Order, order_rows)
+    db.bulk_insert_mappings(models.OrderItem, item_rows)
+    db.commit()
+    return store.id
+
+
+def before(db, store_ids) -> bytes:
+    orders = (
+        db.query(models.Order)
+        .options(
+            selectinload(models.Order.items).selectinload(models.OrderItem.product),
+            selectinload(models.Order.user),
+            selectinload(models.Order.address),
+        )
+        .filter(models.Order.store_id.in_(store_ids))
+        .order_by(models.Order.created_at.desc(), models.Order.id.desc())
+        .all()
+    )
+    for order in orders:
+        if order.items:
+            first_product = order.items[0].product.name
+            order.order_title = f"{first_product} +{len(order.items) - 1} more" if len(order.items) > 1 else first_product
+        else:
+            order.order_title = "Order"
+        if order.store_earnings is None:
+            order.store_earnings = sum(item.price * item.quantity for item in order.items)
+    validated = [schemas.OrderOut.from_orm(order) for order in orders]
+    body = JSONResponse(jsonable_encoder(validated)).body
+    db.rollback()  # drop the in-memory order_title edits
+    return body
+
+
+def after(db, store_ids) -> bytes:
+    return serialization_utils.FastJSONResponse(serialization_utils.fetch_orders(db, store_ids=store_ids)).body
+
+
+def timed(fn, session_factory, store_ids, repeat: int) -> list:
+    runs = []
+    for _ in range(repeat):
+        db = session_factory()
+        try:
+            started = time.perf_counter()
+            fn(db, store_ids)
+            runs.append(time.perf_counter() - started)
+        finally:
+            db.close()
+    return runs
+
+
+def normalized(body: bytes):
+    """Parsed JSON with datetimes compared to the second (encoders differ in format only)."""
+    orders = json.loads(body)
+    for order in orders:
+        order["created_at"] = order["created_at"][:19]
+    return orders
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--database-url", help="default: a temporary SQLite file")
+    parser.add_argument("--no-seed", action="store_true", help="use the orders of --store-id as they are")
+    parser.add_argument("--store-id", type=int)
+    args = parser.parse_args()
+
+    url = args.database_url or f"sqlite:///{tempfile.mkdtemp(prefix='bench-orders-')}/bench.db"
+    engine = create_engine(url)
+    session_factory = sessionmaker(bind=engine, autoflush=False)
+    if args.no_seed:
+        store_id = args.store_id
+    else:
+        models.Base.metadata.create_all(engine)
+        db = session_factory()
+        started = time.perf_counter()
+        store_id = seed(db, args.orders)
+        db.close()
+        print(f"Seeded {args.orders:,} orders in {time.perf_counter() - started:.1f}s ({engine.url.get_backend_name()})")
+
+    db = session_factory()
+    old_body, new_body = before(db, [store_id]), after(db, [store_id])
+    db.close()
+    assert normalized(old_body) == normalized(new_body), "before/after responses differ"
+
+    results = {}
+    for name, fn in (("before (ORM + orm_mode)", before), ("after (rows + orjson)", after)):
+        runs = timed(fn, session_factory, [store_id], args.repeat)
+        results[name] = statistics.median(runs)
+        print(f"{name:<26} median {results[name] * 1000:8.0f} ms   best {min(runs) * 1000:8.0f} ms")
+    old, new = results.values()
+    print(f"speed-up x{old / new:.1f}; payload {len(old_body):,} -> {len(new_body):,} bytes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Throughput of the gunicorn profile at 1..N workers.
+
+    python benchmarks/bench_workers.py                       # 1, 2, 4 ... cpu_count workers, GET /healthz
+    python benchmarks/bench_workers.py --workers 1 2 4 8 --path /catalog/categories/all --duration 20
+
+Starts `gunicorn -c gunicorn.conf.py app.main:app` for each worker count,
+drives it with --concurrency keep-alive clients for --duration seconds and
+prints requests/second and the speed-up over one worker. Scaling should be
+near-linear until the cores (or the database, for DB routes) are saturated.
+
+The load generator shares the machine; on small boxes run it from another
+host against a server started by hand with --url. Runs with FAST_START and
+ALLOW_PROCESS_LOCAL_STATE so no Redis is needed, and the fake SMS provider
+unless SMS_PROVIDER is set.
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import signal
+import subprocess
+import sys
+import time
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+async def drive(url: str, concurrency: int, duration: float) -> tuple:
+    """(completed requests, errors) over `duration` seconds."""
+    done = errors = 0
+    deadline = time.monotonic() + duration
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=10) as client:
+        async def loop():
+            nonlocal done, errors
+            while time.monotonic() < deadline:
+                try:
+                    response = await client.get(url)
+                    if response.status_code < 500:
+                        done += 1
+                    else:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+
+        await asyncio.gather(*(loop() for _ in range(concurrency)))
+    return done, errors
+
+
+def wait_ready(base_url: str, timeout: float = 30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"{base_url}/healthz", timeout=1).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"server at {base_url} did not come up")
+
+
+def start_server(workers: int, port: int):
+    env = {
+        **os.environ,
+        "WEB_CONCURRENCY": str(workers),
+        "FAST_START": os.getenv("FAST_START", "true"),
+        "ALLOW_PROCESS_LOCAL_STATE": "true",
+        "RATE_LIMIT_ENABLED": "0",
+        "ACCESS_LOG": "",
+        "MAX_REQUESTS": "0",
+        "SMS_PROVIDER": os.getenv("SMS_PROVIDER", "fake"),
+    }
+    return subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "--bind", f"127.0.0.1:{port}", "app.main:app"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+
+
+def main():
+    cpus = multiprocessing.cpu_count()
+    default_workers = sorted({1, *[n for n in (2, 4, 8, 16, 32) if n <= cpus], cpus})
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=default_workers)
+    parser.add_argument("--path", default="/healthz")
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--url", help="benchmark an already running server instead (one run)")
+    args = parser.parse_args()
+
+    if args.url:
+        done, errors = asyncio.run(drive(args.url, args.concurrency, args.duration))
+        print(f"{args.url}: {done / args.duration:,.0f} req/s ({errors} errors)")
+        return
+
+    base_url = f"http://127.0.0.1:{args.port}"
+    print(f"{cpus} CPUs, GET {args.path}, {args.concurrency} clients, {args.duration:g}s per run")
+    baseline = None
+    for workers in args.workers:
+        server = start_server(workers, args.port)
+        try:
+            wait_ready(base_url)
+            asyncio.run(drive(base_url + args.path, args.concurrency, 1))  # warm up
+            done, errors = asyncio.run(drive(base_url + args.path, args.concurrency, args.duration))
+        finally:
+            server.send_signal(signal.SIGTERM)
+            server.wait(30)
+        rate = done / args.duration
+        baseline = baseline or rate
+        print(f"workers={workers:>3}  {rate:>10,.0f} req/s  x{rate / baseline:.2f}  errors={errors}")
+
+
+if __name__ == "__main__":
+    main()
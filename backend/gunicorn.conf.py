@@ -0,0 +1,112 @@
+"""
+Production server profile:
+
+    gunicorn -c gunicorn.conf.py app.main:app
+
+Uvicorn workers under gunicorn, one per core by default. The app is imported
+once in the master (preload) and forked, so workers share its memory pages
+and boot in milliseconds; each worker then drops the inherited connection
+pool and opens its own.
+
+With more than one worker, state that must be shared between requests has
+to live in Redis, not in each process's memory: an OTP issued by one worker
+would not verify on another, idempotency keys would not be seen across
+workers and rate limits would be N times looser. Set
+
+    REDIS_URL=redis://...
+    OTP_STORE_BACKEND=redis
+    IDEMPOTENCY_STORE_BACKEND=redis
+    RATE_LIMIT_BACKEND=redis
+
+They default to "memory", and so the worker count defaults to 1 until all
+of them are redis; then it is one per core. An explicit WEB_CONCURRENCY > 1
+on memory backends fails at startup unless ALLOW_PROCESS_LOCAL_STATE=true
+(benchmarks, single-user demos).
+"""
+import multiprocessing
+import os
+import sys
+
+from dotenv import load_dotenv
+
+# Load .env file
+load_dotenv()
+
+# Production defaults; anything set in the environment wins
+os.environ.setdefault("SQL_ECHO", "false")
+
+bind = os.getenv("BIND", f"0.0.0.0:{os.getenv('PORT', '8001')}")
+try:
+    import uvicorn_worker  # noqa: F401
+
+    worker_class = "uvicorn_worker.UvicornWorker"
+except ImportError:
+    worker_class = "uvicorn.workers.UvicornWorker"
+
+preload_app = os.getenv("PRELOAD_APP", "true").lower() == "true"
+# Graceful drain: on SIGTERM workers stop accepting, finish in-flight requests
+# and run shutdown hooks (outbox dispatchers, job worker) for up to this long
+graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT", 30))
+timeout = int(os.getenv("WORKER_TIMEOUT", 60))
+keepalive = int(os.getenv("KEEPALIVE", 5))
+# Recycle workers now and then so slow leaks can't build up; jitter avoids all restarting at once
+max_requests = int(os.getenv("MAX_REQUESTS", 10000))
+max_requests_jitter = int(os.getenv("MAX_REQUESTS_JITTER", 1000))
+accesslog = os.getenv("ACCESS_LOG", "-") or None  # empty: no access log
+forwarded_allow_ips = os.getenv("FORWARDED_ALLOW_IPS", "127.0.0.1")
+
+# Per-process backends that break (or silently weaken) with several workers
+SHARED_STATE_BACKENDS = {
+    "OTP_STORE_BACKEND": os.getenv("OTP_STORE_BACKEND", "memory"),
+    "IDEMPOTENCY_STORE_BACKEND": os.getenv("IDEMPOTENCY_STORE_BACKEND", "memory"),
+}
+if os.getenv("RATE_LIMIT_ENABLED", "1") != "0":
+    SHARED_STATE_BACKENDS["RATE_LIMIT_BACKEND"] = os.getenv("RATE_LIMIT_BACKEND", "memory")
+ALLOW_PROCESS_LOCAL_STATE = os.getenv("ALLOW_PROCESS_LOCAL_STATE", "false").lower() == "true"
+
+# Async workers: one per core is enough, blocking endpoints run in each worker's threadpool.
+# On per-process state a single worker is the only safe default.
+_default_workers = 1 if "memory" in SHARED_STATE_BACKENDS.values() else multiprocessing.cpu_count()
+workers = int(os.getenv("WEB_CONCURRENCY", _default_workers))
+
+# Split a database connection budget across workers. Must run before the app
+# is preloaded, because the engine is created at import.
+if os.getenv("DB_MAX_CONNECTIONS"):
+    per_worker = max(2, int(os.getenv("DB_MAX_CONNECTIONS")) // max(workers, 1))
+    os.environ.setdefault("DB_POOL_SIZE", str(max(1, per_worker // 2)))
+    os.environ.setdefault("DB_MAX_OVERFLOW", str(per_worker - per_worker // 2))
+
+
+
+def check_shared_state(log):
+    """Refuse to run several workers on process-local OTP / idempotency / rate-limit state."""
+    local = [name for name, backend in SHARED_STATE_BACKENDS.items() if backend == "memory"]
+    if workers <= 1 or not local:
+        return
+    message = (f"{workers} workers but {', '.join(local)} = memory: state is per process. "
+               f"Set them to redis (with REDIS_URL) or run WEB_CONCURRENCY=1.")
+    if ALLOW_PROCESS_LOCAL_STATE:
+        log.warning(f"⚠️ {message} Continuing because ALLOW_PROCESS_LOCAL_STATE=true.")
+        return
+    log.critical(f"❌ {message}")
+    sys.exit(1)
+
+
+def on_starting(server):
+    check_shared_state(server.log)
+    if "WEB_CONCURRENCY" not in os.environ and workers == 1 and multiprocessing.cpu_count() > 1:
+        server.log.warning("⚠️ Running 1 worker: OTP, idempotency or rate-limit state is in memory. "
+                           "Set the *_BACKEND settings to redis to use every core.")
+    server.log.info(f"✅ Starting {workers} {worker_class} workers on {bind} (preload={preload_app})")
+
+
+def post_fork(server, worker):
+    """Sockets must not be shared across processes: give this worker a fresh pool."""
+    from app.database import dispose_engines
+
+    # close=False: leave the parent's connections alone, just forget them here
+    dispose_engines(close=False)
+
+
+def worker_exit(server, worker):
+    server.log.info(f"Worker {worker.pid} exited")
@@ -0,0 +1,88 @@
+import os
+import tempfile
+
+# The app reads its configuration at import time: point it at throwaway
+# SQLite files before anything under app/ is imported.
+TMP_DIR = tempfile.mkdtemp(prefix="towndrop-tests-")
+PRIMARY_PATH = os.path.join(TMP_DIR, "primary.db")
+REPLICA_PATH = os.path.join(TMP_DIR, "replica.db")
+os.environ.update(
+    DATABASE_URL=f"sqlite:///{PRIMARY_PATH}",
+    REPLICA_URLS=f"sqlite:///{REPLICA_PATH}",
+    SQL_ECHO="false",
+    DB_POOL_SIZE="20",
+    DB_MAX_OVERFLOW="250",
+    JOBS_PATH=os.path.join(TMP_DIR, "jobs.sqlite3"),
+    OUTBOX_PATH=os.path.join(TMP_DIR, "outbox.sqlite3"),
+    JOBS_EMBEDDED_WORKER="false",
+    SMS_PROVIDER="fake",
+)
+
+import pytest  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+
+from app import database, models  # noqa: E402
+
+
+def _serialize_sqlite_writers(engine):
+    """SQLite stand-in for MySQL row locks: every transaction takes the write
+    lock up front (BEGIN IMMEDIATE) and waits for it instead of failing."""
+
+    @event.listens_for(engine, "connect")
+    def _connect(dbapi_conn, record):
+        dbapi_conn.isolation_level = None
+        dbapi_conn.execute("PRAGMA busy_timeout = 60000")
+
+    @event.listens_for(engine, "begin")
+    def _begin(conn):
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+
+for _engine in [database.engine, *database.replica_engines]:
+    _serialize_sqlite_writers(_engine)
+
+
+@pytest.fixture
+def engines():
+    """Fresh schema on the primary and the replica file."""
+    for engine in [database.engine, *database.replica_engines]:
+        models.Base.metadata.drop_all(engine)
+        models.Base.metadata.create_all(engine)
+    database._lag_cache.clear()
+    yield database.engine, database.replica_engines
+    database.dispose_engines()
+
+
+@pytest.fixture
+def db(engines):
+    session = database.SessionLocal()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def store(db):
+    """An owner, a category and a store with coordinates. Returns the store."""
+    owner = models.User(name="owner", email="owner@example.com", role="store_owner", hashed_password="x",
+                        is_verified=True)
+    category = models.Category(name="Groceries")
+    db.add_all([owner, category])
+    db.flush()
+    store = models.Store(name="Corner Shop", category_id=category.id, owner_id=owner.id,
+                         latitude=12.97, longitude=77.59)
+    db.add(store)
+    db.commit()
+    return store
+
+
+def add_customer(db, n: int, latitude: float = 12.98, longitude: float = 77.60):
+    """A verified user with one address. Returns (user, address)."""
+    user = models.User(name=f"user{n}", email=f"user{n}@example.com", role="user", hashed_password="x",
+                       is_verified=True)
+    db.add(user)
+    db.flush()
+    address = models.Address(user_id=user.id, address_line="1 Main St", city="Bengaluru", state="KA",
+                             pincode="560001", latitude=latitude, longitude=longitude)
+    db.add(address)
+    db.flush()
+    return user, address
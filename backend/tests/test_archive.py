@@ -0,0 +1,55 @@
+import json
+from datetime import datetime, timedelta
+
+from starlette.requests import Request
+
+from app import models
+from app.routers import superadmin
+from app.utils import archive_utils
+
+from conftest import add_customer
+
+
+def test_only_terminal_orders_are_archived(db, store):
+    product = models.Product(name="Tea", price=50, store_id=store.id)
+    db.add(product)
+    user, address = add_customer(db, 1)
+    old = datetime.now() - timedelta(days=archive_utils.ARCHIVE_AFTER_DAYS + 10)
+    statuses = ["pending", "accepted", "completed", "rejected", "delivered", "cancelled"]
+    for status in statuses:
+        order = models.Order(user_id=user.id, store_id=store.id, address_id=address.id, total_price=50,
+                             status=status, created_at=old)
+        db.add(order)
+        db.flush()
+        db.add(models.OrderItem(order_id=order.id, product_id=product.id, quantity=1, price=50))
+    db.commit()
+
+    assert archive_utils.archive_orders(db, batch_size=1) == 2
+    assert sorted(status for (status,) in db.query(models.ArchivedOrder.status)) == ["cancelled", "delivered"]
+    assert sorted(status for (status,) in db.query(models.Order.status)) == sorted(set(statuses) - {"cancelled", "delivered"})
+    assert db.query(models.ArchivedOrderItem).count() == 2
+    assert db.query(models.OrderItem).count() == 4
+
+
+def test_superadmin_order_list_pages_and_archive_is_opt_in(db, store):
+    user, address = add_customer(db, 1)
+    admin = models.User(name="admin", email="admin@example.com", role="superadmin", hashed_password="x")
+    db.add(admin)
+    now = datetime.now()
+    for n, status in enumerate(["pending"] * 3 + ["delivered"] * 2):
+        db.add(models.Order(user_id=user.id, store_id=store.id, address_id=address.id, total_price=50, status=status,
+                            created_at=now - timedelta(days=archive_utils.ARCHIVE_AFTER_DAYS + 10 - n)))
+    db.commit()
+    archive_utils.archive_orders(db)
+
+    def ids(**params):
+        query = "&".join(f"{k}={v}" for k, v in params.items()).encode()
+        request = Request({"type": "http", "method": "GET", "path": "/superadmin/orders", "query_string": query,
+                           "headers": []})
+        response = superadmin.get_orders(request, fields="id", include=None, db=db, current_user=admin,
+                                         **{"limit": 50, "offset": 0, "include_archive": False, **params})
+        return [order["id"] for order in json.loads(response.body)]
+
+    assert ids() == [3, 2, 1]
+    assert ids(include_archive=True) == [5, 4, 3, 2, 1]
+    assert ids(include_archive=True, limit=2, offset=1) == [4, 3]
@@ -0,0 +1,35 @@
+import json
+import os
+import subprocess
+import sys
+
+# Budgets for a fast-start boot, measured in a fresh interpreter. Loose
+# enough for a slow CI box; a regression that reintroduces import-time
+# connects, create_all or retry sleeps blows through them.
+IMPORT_BUDGET_SECONDS = float(os.getenv("IMPORT_BUDGET_SECONDS", 3.0))
+STARTUP_BUDGET_SECONDS = float(os.getenv("STARTUP_BUDGET_SECONDS", 0.5))
+
+BOOT_SCRIPT = """
+import json, time
+started = time.perf_counter()
+import app.main
+imported = time.perf_counter()
+from fastapi.testclient import TestClient
+with TestClient(app.main.app) as client:
+    ready = time.perf_counter()
+    status = client.get("/healthz").status_code
+print(json.dumps({"import": imported - started, "startup": ready - imported, "healthz": status}))
+"""
+
+
+def test_fast_start_boot_within_budget():
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = {**os.environ, "FAST_START": "true", "BACKGROUND_START_DELAY": "60", "PYTHONPATH": backend_dir}
+    result = subprocess.run([sys.executable, "-c", BOOT_SCRIPT], cwd=backend_dir, env=env,
+                            capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stderr
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+
+    assert timings["healthz"] == 200
+    assert timings["import"] < IMPORT_BUDGET_SECONDS, timings
+    assert timings["startup"] < STARTUP_BUDGET_SECONDS, timings
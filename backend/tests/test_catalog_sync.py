@@ -0,0 +1,94 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import models
+from app.utils import change_log_utils
+
+
+@pytest.fixture(autouse=True)
+def no_settle(monkeypatch):
+    monkeypatch.setattr(change_log_utils, "SYNC_SETTLE_SECONDS", 0)
+
+
+def logged(db) -> list:
+    return [(row.entity, row.entity_id, row.op) for row in db.query(models.CatalogChange).order_by(models.CatalogChange.id)]
+
+
+def test_changes_are_logged_at_commit_not_at_flush(db, store):
+    cursor = change_log_utils.changes_since(db)["cursor"]
+    product = models.Product(name="Tea", price=50, store_id=store.id)
+    db.add(product)
+    db.flush()
+    product.price = 60
+    db.flush()
+    # Nothing in the log while the transaction is open, so no cursor can pass it
+    assert db.query(models.CatalogChange).filter(models.CatalogChange.id > cursor).count() == 0
+    db.commit()
+
+    page = change_log_utils.changes_since(db, cursor)
+    assert [item["id"] for item in page["products"]["upserts"]] == [product.id]
+    assert page["products"]["upserts"][0]["price"] == 60
+    assert page["cursor"] > cursor
+
+
+def test_rolled_back_changes_are_not_logged(db, store):
+    before = logged(db)
+    db.add(models.Category(name="Dropped"))
+    db.flush()
+    db.rollback()
+    assert logged(db) == before
+
+    with db.begin_nested():
+        kept = models.Category(name="Kept")
+        db.add(kept)
+    db.commit()
+    assert logged(db) == before + [("category", kept.id, "upsert")]
+
+
+def test_bulk_paths_are_logged_with_the_commit(db, store):
+    product = models.Product(name="Rice", price=80, store_id=store.id)
+    db.add(product)
+    db.commit()
+    before = logged(db)
+
+    db.query(models.Product).filter(models.Product.id == product.id).update({"price": 90})
+    change_log_utils.record_changes(db, models.Product, [product.id])
+    assert logged(db) == before
+    db.commit()
+    assert logged(db) == before + [("product", product.id, "upsert")]
+
+
+def test_rolled_back_savepoint_drops_its_changes(db, store):
+    before = logged(db)
+    kept = models.Category(name="Kept")
+    db.add(kept)
+    db.flush()
+    savepoint = db.begin_nested()
+    db.add(models.Category(name="Dropped"))
+    db.flush()
+    savepoint.rollback()
+    db.commit()
+    assert logged(db) == before + [("category", kept.id, "upsert")]
+
+
+def test_pages_stop_at_the_first_unsettled_id(db, store, monkeypatch):
+    monkeypatch.setattr(change_log_utils, "SYNC_SETTLE_SECONDS", 60)
+    products = [models.Product(name=f"P{n}", price=10, store_id=store.id) for n in range(3)]
+    db.add_all(products)
+    db.commit()
+    # Ids in commit order, the middle one still inside the settle window
+    settled, fresh = datetime.utcnow() - timedelta(minutes=5), datetime.utcnow()
+    db.query(models.CatalogChange).delete()
+    db.execute(models.CatalogChange.__table__.insert(), [
+        {"id": 10, "entity": "store", "entity_id": store.id, "op": "upsert", "changed_at": settled},
+        {"id": 11, "entity": "product", "entity_id": products[0].id, "op": "upsert", "changed_at": settled},
+        {"id": 12, "entity": "product", "entity_id": products[1].id, "op": "upsert", "changed_at": fresh},
+        {"id": 13, "entity": "product", "entity_id": products[2].id, "op": "upsert", "changed_at": settled},
+    ])
+    db.commit()
+
+    page = change_log_utils.changes_since(db, 10)
+    assert [item["id"] for item in page["products"]["upserts"]] == [products[0].id]
+    assert page["cursor"] == 11
+    assert change_log_utils.snapshot(db)["cursor"] == 11
@@ -0,0 +1,33 @@
+from app import models, schemas
+from app.routers import catalog
+from app.utils import counter_utils
+
+from conftest import add_customer
+
+
+def test_reconcile_fixes_drift_and_keeps_later_bumps(db, store):
+    product = models.Product(name="Tea", price=50, store_id=store.id)
+    db.add(product)
+    db.flush()
+    counter_utils.count_product(db, store, 1)
+    user, address = add_customer(db, 1)
+    db.add(models.Cart(user_id=user.id, product_id=product.id, quantity=1))
+    db.commit()
+    catalog.place_order(schemas.OrderCreate(address_id=address.id), db, user)
+
+    # Drift one row and lose another entirely
+    db.query(models.StoreCounter).update({"order_count": 7, "product_count": 0})
+    db.query(models.UserCounter).filter(models.UserCounter.user_id == user.id).delete()
+    db.commit()
+
+    assert counter_utils.reconcile_counters(db) == 2  # store and customer
+    db.expire_all()
+    stores = db.query(models.StoreCounter).filter(models.StoreCounter.store_id == store.id).one()
+    assert (stores.order_count, stores.product_count) == (1, 1)
+    assert db.query(models.UserCounter.order_count).filter(models.UserCounter.user_id == user.id).scalar() == 1
+    assert counter_utils.reconcile_counters(db) == 0
+
+    # Increments after a run land on top of the recomputed values
+    counter_utils.bump_store(db, store.id, orders=1)
+    db.commit()
+    assert db.query(models.StoreCounter.order_count).filter(models.StoreCounter.store_id == store.id).scalar() == 2
@@ -0,0 +1,38 @@
+from app import models
+from app.routers import catalog
+from app.utils.job_utils import job_queue
+from conftest import add_customer
+
+
+def queued_fills(address_id):
+    rows = job_queue._conn().execute("SELECT payload FROM jobs WHERE name = 'distances.fill'").fetchall()
+    return sum(f'"address_id": {address_id}' in row[0] for row in rows)
+
+
+def test_quote_prices_one_store_and_does_not_write(db, store):
+    other = models.Store(name="Far Shop", category_id=store.category_id, owner_id=store.owner_id,
+                         latitude=13.05, longitude=77.65)
+    db.add(other)
+    db.flush()
+    tea = models.Product(name="Tea", price=50, store_id=store.id, stock=5)
+    rice = models.Product(name="Rice", price=200, store_id=other.id, stock=5)
+    db.add_all([tea, rice])
+    user, address = add_customer(db, 1)
+    db.flush()
+    db.add_all([models.Cart(user_id=user.id, product_id=tea.id, quantity=2),
+                models.Cart(user_id=user.id, product_id=rice.id, quantity=1)])
+    db.commit()
+    before = queued_fills(address.id)
+
+    quote = catalog.get_delivery_quote(address.id, store_id=other.id, db=db, current_user=user)
+    assert quote["store_id"] == other.id
+    assert quote["subtotal"] == 200
+    assert quote["distance_km"] is not None
+    quote = catalog.get_delivery_quote(address.id, db=db, current_user=user)
+    assert quote["store_id"] == store.id
+    assert quote["subtotal"] == 100
+
+    # The misses were queued for the background fill, not written by the GET
+    db.rollback()
+    assert db.query(models.StoreAddressDistance).count() == 0
+    assert queued_fills(address.id) == before + 2
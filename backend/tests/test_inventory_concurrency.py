@@ -0,0 +1,96 @@
+import threading
+from collections import Counter
+
+from fastapi import HTTPException
+
+from app import database, models, schemas
+from app.routers import catalog
+from app.utils import counter_utils
+
+from conftest import add_customer
+
+CHECKOUTS = 200
+STOCK = 50
+
+
+def test_parallel_checkouts_never_oversell(db, store):
+    tracked = models.Product(name="Last few", price=120, store_id=store.id, stock=STOCK)
+    untracked = models.Product(name="Always there", price=10, store_id=store.id)
+    db.add_all([tracked, untracked])
+    db.flush()
+    customers = []
+    for n in range(CHECKOUTS):
+        user, address = add_customer(db, n)
+        db.add(models.Cart(user_id=user.id, product_id=tracked.id, quantity=1))
+        db.add(models.Cart(user_id=user.id, product_id=untracked.id, quantity=2))
+        customers.append((user.id, address.id))
+    tracked_id, untracked_id = tracked.id, untracked.id
+    db.commit()
+    db.close()
+
+    results, lock = [], threading.Lock()
+    barrier = threading.Barrier(CHECKOUTS)
+
+    def checkout(user_id, address_id):
+        session = database.SessionLocal()
+        try:
+            user = session.get(models.User, user_id)
+            session.expunge(user)
+            session.rollback()
+            barrier.wait()
+            catalog.place_order(schemas.OrderCreate(address_id=address_id), session, user)
+            outcome = "ok"
+        except HTTPException as e:
+            session.rollback()
+            outcome = e.status_code
+        finally:
+            session.close()
+        with lock:
+            results.append(outcome)
+
+    threads = [threading.Thread(target=checkout, args=customer) for customer in customers]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert Counter(results) == {"ok": STOCK, 409: CHECKOUTS - STOCK}
+
+    check = database.SessionLocal()
+    try:
+        product = check.get(models.Product, tracked_id)
+        assert product.stock == 0
+        assert product.available is False
+        assert product.sales_count == STOCK
+        assert check.get(models.Product, untracked_id).sales_count == 2 * STOCK
+        assert check.query(models.Order).count() == STOCK
+        assert check.query(models.OrderItem).count() == 2 * STOCK
+        # Losing checkouts rolled back completely, carts included
+        assert check.query(models.Cart).count() == 2 * (CHECKOUTS - STOCK)
+    finally:
+        check.close()
+
+
+def test_rejected_order_releases_stock_and_leaves_counters(db, store):
+    product = models.Product(name="Single", price=200, store_id=store.id, stock=1)
+    db.add(product)
+    db.flush()
+    user, address = add_customer(db, 1)
+    db.add(models.Cart(user_id=user.id, product_id=product.id, quantity=1))
+    db.commit()
+
+    order_id = catalog.place_order(schemas.OrderCreate(address_id=address.id), db, user)
+    counters = db.query(models.StoreCounter).filter(models.StoreCounter.store_id == store.id).one()
+    assert counters.order_count == 1
+
+    owner = db.get(models.User, store.owner_id)
+    catalog.patch_order(order_id, schemas.OrderPatch(status="rejected"), db=db, current_user=owner)
+    db.expire_all()
+
+    assert db.get(models.Product, product.id).stock == 1
+    assert db.get(models.Product, product.id).available is True
+    assert db.query(models.StoreCounter.order_count).filter(models.StoreCounter.store_id == store.id).scalar() == 0
+    # Nightly reconciliation agrees with the incremental updates
+    counter_utils.reconcile_counters(db)
+    assert db.query(models.StoreCounter.order_count).filter(models.StoreCounter.store_id == store.id).scalar() == 0
+    assert db.query(models.UserCounter.order_count).filter(models.UserCounter.user_id == user.id).scalar() == 0
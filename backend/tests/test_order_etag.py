@@ -0,0 +1,48 @@
+from starlette.requests import Request
+
+from app import models, schemas
+from app.routers import catalog
+
+from conftest import add_customer
+
+
+def get(db, user, etag=None):
+    headers = [(b"if-none-match", etag.encode())] if etag else []
+    request = Request({"type": "http", "method": "GET", "path": "/catalog/orders", "query_string": b"",
+                       "headers": headers})
+    return catalog.get_orders(request, db=db, current_user=user)
+
+
+def test_order_list_etag_follows_embedded_rows(db, store):
+    product = models.Product(name="Tea", price=50, store_id=store.id, stock=5)
+    db.add(product)
+    db.flush()
+    user, address = add_customer(db, 1)
+    db.add(models.Cart(user_id=user.id, product_id=product.id, quantity=1))
+    db.commit()
+    catalog.place_order(schemas.OrderCreate(address_id=address.id), db, user)
+    owner = db.get(models.User, store.owner_id)
+
+    for viewer in (user, owner):
+        etag = get(db, viewer).headers["etag"]
+        assert get(db, viewer, etag).status_code == 304
+
+        for change in (
+            lambda: setattr(db.get(models.Product, product.id), "price", 55),  # repricing
+            lambda: setattr(db.get(models.User, user.id), "name", "Renamed"),
+            lambda: setattr(db.get(models.Address, address.id), "address_line", "2 Main St"),
+        ):
+            change()
+            db.commit()
+            response = get(db, viewer, etag)
+            assert response.status_code == 200
+            etag = response.headers["etag"]
+
+        # Rows the list does not embed leave it alone
+        db.add(models.Product(name="Unrelated", price=10, store_id=store.id))
+        db.commit()
+        assert get(db, viewer, etag).status_code == 304
+        db.get(models.Product, product.id).price = 50
+        db.get(models.User, user.id).name = "user1"
+        db.get(models.Address, address.id).address_line = "1 Main St"
+        db.commit()
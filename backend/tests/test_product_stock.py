@@ -0,0 +1,64 @@
+import pytest
+from fastapi import HTTPException
+
+from app import models, schemas
+from app.routers import catalog
+from app.utils.product_io_utils import ProductImport
+
+
+def state(db, product_id):
+    db.expire_all()
+    product = db.get(models.Product, product_id)
+    return product.stock, product.available
+
+
+@pytest.fixture
+def product(db, store):
+    product = models.Product(name="Tea", price=50, store_id=store.id, stock=5)
+    db.add(product)
+    db.commit()
+    return product
+
+
+def test_every_stock_write_derives_availability(db, store, product):
+    owner = db.get(models.User, store.owner_id)
+
+    catalog.update_product(product.id, schemas.ProductUpdate(stock=0), db=db, current_user=owner)
+    assert state(db, product.id) == (0, False)
+    catalog.update_product(product.id, schemas.ProductUpdate(stock=4), db=db, current_user=owner)
+    assert state(db, product.id) == (4, True)
+
+    catalog.patch_product(product.id, {"stock": 0}, db=db, current_user=owner)
+    assert state(db, product.id) == (0, False)
+    catalog.patch_product(product.id, {"available": True}, db=db, current_user=owner)
+    assert state(db, product.id) == (0, False)  # nothing to sell
+    catalog.patch_product(product.id, {"stock": 3, "available": False}, db=db, current_user=owner)
+    assert state(db, product.id) == (3, False)  # hidden by the owner on purpose
+    catalog.patch_product(product.id, {"available": True, "price": 60}, db=db, current_user=owner)
+    assert state(db, product.id) == (3, True)
+
+    catalog.bulk_patch_products([schemas.ProductBulkPatch(id=product.id, stock=0)], db=db, current_user=owner)
+    assert state(db, product.id) == (0, False)
+    catalog.bulk_patch_products([schemas.ProductBulkPatch(id=product.id, stock=2)], db=db, current_user=owner)
+    assert state(db, product.id) == (2, True)
+
+    report = ProductImport(db, db.get(models.Store, store.id)).run(enumerate([
+        {"name": "Tea", "stock": "0"},
+        {"name": "Coffee", "price": "80", "stock": "0"},
+        {"name": "Sugar", "price": "40"},
+    ], start=2))
+    assert (report["created"], report["updated"], report["failed"]) == (2, 1, 0)
+    assert state(db, product.id) == (0, False)
+    by_name = {p.name: (p.stock, p.available) for p in db.query(models.Product)}
+    assert by_name["Coffee"] == (0, False)
+    assert by_name["Sugar"] == (None, True)
+
+
+def test_patch_rejects_fields_outside_the_whitelist(db, store, product):
+    owner = db.get(models.User, store.owner_id)
+    for data in ({"version": 99}, {"sales_count": 0}, {"updated_at": None}, {"stock": -1}, {"stock": "5"}):
+        with pytest.raises(HTTPException) as error:
+            catalog.patch_product(product.id, data, db=db, current_user=owner)
+        assert error.value.status_code == 400
+    db.rollback()
+    assert state(db, product.id) == (5, True)
@@ -0,0 +1,102 @@
+import time
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from app import database, models
+from app.routers import catalog
+
+# Primary and replica are separate SQLite files with different rows, so every
+# read shows which one served it.
+PRIMARY = ["on-primary"]
+REPLICA = ["on-replica"]
+
+
+@pytest.fixture
+def seeded(engines):
+    primary, replicas = engines
+    for engine, names in ((primary, PRIMARY), (replicas[0], REPLICA)):
+        session = sessionmaker(bind=engine)()
+        session.add_all([models.Category(name=name) for name in names])
+        session.commit()
+        session.close()
+    return replicas[0]
+
+
+def names(db) -> list:
+    return sorted(name for (name,) in db.query(models.Category.name))
+
+
+def lagging(replica, seconds: float):
+    database._lag_cache[replica] = (time.monotonic(), seconds)
+
+
+def read_session(dependency):
+    """The session a route with this read dependency gets."""
+    return next(dependency())
+
+
+def test_default_sessions_stay_on_the_primary(seeded):
+    db = database.SessionLocal()
+    try:
+        assert names(db) == PRIMARY
+    finally:
+        db.close()
+
+
+def test_read_routes_use_the_replica(seeded):
+    db = read_session(catalog.catalog_read_db)
+    try:
+        assert names(db) == REPLICA
+        assert names(db) == REPLICA
+    finally:
+        db.close()
+
+
+def test_lagging_replica_falls_back_per_route_tolerance(seeded):
+    lagging(seeded, 10)
+    catalog_db, orders_db = read_session(catalog.catalog_read_db), read_session(catalog.orders_read_db)
+    try:
+        assert names(catalog_db) == REPLICA  # tolerates 30 s
+        assert names(orders_db) == PRIMARY  # tolerates 2 s
+    finally:
+        catalog_db.close()
+        orders_db.close()
+
+    lagging(seeded, float("inf"))  # unreachable or replication stopped
+    db = read_session(catalog.catalog_read_db)
+    try:
+        assert names(db) == PRIMARY
+    finally:
+        db.close()
+
+
+def test_reads_after_a_flush_go_to_the_primary(seeded):
+    db = read_session(catalog.catalog_read_db)
+    try:
+        assert names(db) == REPLICA
+        db.add(models.Category(name="written"))
+        db.flush()
+        assert names(db) == sorted(PRIMARY + ["written"])
+        db.rollback()
+        # Still pinned after the rollback: the request wrote once
+        assert names(db) == PRIMARY
+    finally:
+        db.close()
+
+
+def test_select_for_update_and_bulk_writes_go_to_the_primary(seeded):
+    db = read_session(catalog.catalog_read_db)
+    try:
+        assert [c.name for c in db.query(models.Category).with_for_update()] == PRIMARY
+        assert names(db) == PRIMARY
+    finally:
+        db.close()
+
+    db = read_session(catalog.catalog_read_db)
+    try:
+        assert db.query(models.Category).update({"image": "x.png"}, synchronize_session=False) == len(PRIMARY)
+        assert [image for (image,) in db.query(models.Category.image)] == ["x.png"]
+        db.rollback()
+    finally:
+        db.close()
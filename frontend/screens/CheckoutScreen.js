@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import {
   View,
   Text,
@@ -27,6 +27,8 @@ export default function CheckoutScreen({ navigation }) {
   const [fetchingLocation, setFetchingLocation] = useState(true);
   const [paymentMethod, setPaymentMethod] = useState(null);
   const [deliveryFee, setDeliveryFee] = useState(0);
+  // One Idempotency-Key per checkout attempt, reused when the same order is retried
+  const attemptRef = useRef(null);
 
   const ALLOWED_CITY = 'Kudachi';
   const ALLOWED_PINCODE = '591311';
@@ -156,21 +158,38 @@ useEffect(() => {
       const storeId = cart[0]?.product?.store_id;
       if (!storeId) throw new Error('Store information missing.');
 
-      const resAddress = await api.post('/catalog/addresses', {
-        address_line: address,
-        city: ALLOWED_CITY,
-        state: 'Karnataka',
-        pincode: ALLOWED_PINCODE,
-      });
-      const addressId = resAddress.data.id;
-
-      const resOrder = await api.post('/catalog/orders', {
-        address_id: addressId,
-        store_id: storeId,
-        payment_method: paymentMethod,
-        contact_number: phone,
-      });
+      const signature = `${address}|${phone}|${paymentMethod}|${storeId}`;
+      if (attemptRef.current?.signature !== signature) {
+        attemptRef.current = {
+          signature,
+          key: `${Date.now()}-${Math.random().toString(36).slice(2)}`,
+          addressId: null,
+        };
+      }
+      const attempt = attemptRef.current;
+
+      if (!attempt.addressId) {
+        const resAddress = await api.post('/catalog/addresses', {
+          address_line: address,
+          city: ALLOWED_CITY,
+          state: 'Karnataka',
+          pincode: ALLOWED_PINCODE,
+        });
+        attempt.addressId = resAddress.data.id;
+      }
+
+      const resOrder = await api.post(
+        '/catalog/orders',
+        {
+          address_id: attempt.addressId,
+          store_id: storeId,
+          payment_method: paymentMethod,
+          contact_number: phone,
+        },
+        { headers: { 'Idempotency-Key': attempt.key } }
+      );
 
+      attemptRef.current = null;
       setCart([]);
       fetchCart();
 